@@ -131,6 +131,44 @@ class AgentAdmin(admin.ModelAdmin):
                 "classes": ("wide",),
             },
         ),
+        (
+            "⚡ Caché de Respuestas",
+            {
+                "fields": (
+                    "response_cache_enabled",
+                    "response_cache_similarity",
+                    "response_cache_ttl",
+                    "response_cache_max_entries",
+                ),
+                "description": "Reutiliza respuestas a preguntas iguales o similares sin ejecutar el modelo",
+                "classes": ("collapse",),
+            },
+        ),
+        (
+            "🔎 Búsqueda Vectorial",
+            {
+                "fields": (
+                    "retrieval_mode",
+                    "vector_search_ef_search",
+                    "vector_search_probes",
+                ),
+                "description": "Modo de búsqueda en el conocimiento y precisión del índice vectorial del tenant (HNSW usa ef_search, IVFFlat usa probes)",
+                "classes": ("collapse",),
+            },
+        ),
+        (
+            "🏅 Reranking",
+            {
+                "fields": (
+                    "rerank_scorer",
+                    "rerank_candidates",
+                    "rerank_top_n",
+                    "rerank_token_budget",
+                ),
+                "description": "Reordena localmente los fragmentos recuperados para acortar el prompt",
+                "classes": ("collapse",),
+            },
+        ),
         (
             "📚 Base de Conocimiento",
             {
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:10
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0007_agentmodel_analize_sentiment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentmodel",
+            name="response_cache_enabled",
+            field=models.BooleanField(
+                default=False,
+                help_text="Reutiliza respuestas a preguntas iguales o muy similares",
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="response_cache_max_entries",
+            field=models.PositiveIntegerField(
+                default=200,
+                help_text="Número máximo de respuestas cacheadas para el agente",
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="response_cache_similarity",
+            field=models.FloatField(
+                default=0.95,
+                help_text="Similitud coseno mínima para reutilizar una respuesta (1.0 = sólo idénticas)",
+                validators=[
+                    django.core.validators.MinValueValidator(0.0),
+                    django.core.validators.MaxValueValidator(1.0),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="response_cache_ttl",
+            field=models.PositiveIntegerField(
+                default=3600,
+                help_text="Segundos que una respuesta cacheada sigue siendo válida",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ResponseCacheEntryModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("knowledge_version", models.CharField(max_length=64)),
+                ("message_hash", models.CharField(max_length=64)),
+                ("message", models.TextField()),
+                ("response", models.TextField()),
+                ("embedding", models.BinaryField(blank=True, null=True)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("last_hit_at", models.DateTimeField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="response_cache_entries",
+                        to="agents.agentmodel",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["agent", "knowledge_version", "message_hash"],
+                        name="agents_resp_agent_i_33d3fa_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:30
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0008_response_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentmodel",
+            name="vector_search_ef_search",
+            field=models.PositiveIntegerField(
+                default=40,
+                help_text="HNSW: candidatos por búsqueda (más = mejor recall y más latencia)",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(1000),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="vector_search_probes",
+            field=models.PositiveIntegerField(
+                default=10,
+                help_text="IVFFlat: listas visitadas por búsqueda (más = mejor recall y más latencia)",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(32768),
+                ],
+            ),
+        ),
+    ]
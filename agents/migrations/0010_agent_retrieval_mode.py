@@ -0,0 +1,26 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0009_agent_vector_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentmodel",
+            name="retrieval_mode",
+            field=models.CharField(
+                choices=[
+                    ("vector", "Vectorial"),
+                    ("hybrid", "Híbrida (vectorial + palabras clave)"),
+                ],
+                default="vector",
+                help_text="Híbrida también encuentra términos exactos (SKU, facturas, IDs de cliente)",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:36
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agents", "0010_agent_retrieval_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentmodel",
+            name="rerank_candidates",
+            field=models.PositiveIntegerField(
+                default=20,
+                help_text="Fragmentos que se recuperan antes de reordenar",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(200),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="rerank_scorer",
+            field=models.CharField(
+                choices=[
+                    ("none", "Sin reranking"),
+                    ("tfidf", "TF-IDF (coseno)"),
+                    ("rapidfuzz", "RapidFuzz (solapamiento de tokens)"),
+                ],
+                default="none",
+                help_text="Reordena localmente los fragmentos recuperados y sólo pasa los mejores al prompt",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="rerank_token_budget",
+            field=models.PositiveIntegerField(
+                default=1500,
+                help_text="Tokens aproximados máximos de los fragmentos en el prompt (0 = sin límite)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="agentmodel",
+            name="rerank_top_n",
+            field=models.PositiveIntegerField(
+                default=3,
+                help_text="Fragmentos máximos que pasan al prompt tras reordenar",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(50),
+                ],
+            ),
+        ),
+    ]
@@ -59,6 +59,69 @@ class AgentModel(AppModel):
         help_text="Agente de análisis de sentimientos asociado al agente",
     )
 
+    response_cache_enabled = models.BooleanField(
+        default=False,
+        help_text="Reutiliza respuestas a preguntas iguales o muy similares",
+    )
+    response_cache_similarity = models.FloatField(
+        default=0.95,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text="Similitud coseno mínima para reutilizar una respuesta (1.0 = sólo idénticas)",
+    )
+    response_cache_ttl = models.PositiveIntegerField(
+        default=3600,
+        help_text="Segundos que una respuesta cacheada sigue siendo válida",
+    )
+    response_cache_max_entries = models.PositiveIntegerField(
+        default=200,
+        help_text="Número máximo de respuestas cacheadas para el agente",
+    )
+
+    retrieval_mode = models.CharField(
+        max_length=10,
+        choices=[
+            ("vector", "Vectorial"),
+            ("hybrid", "Híbrida (vectorial + palabras clave)"),
+        ],
+        default="vector",
+        help_text="Híbrida también encuentra términos exactos (SKU, facturas, IDs de cliente)",
+    )
+    vector_search_ef_search = models.PositiveIntegerField(
+        default=40,
+        validators=[MinValueValidator(1), MaxValueValidator(1000)],
+        help_text="HNSW: candidatos por búsqueda (más = mejor recall y más latencia)",
+    )
+    vector_search_probes = models.PositiveIntegerField(
+        default=10,
+        validators=[MinValueValidator(1), MaxValueValidator(32768)],
+        help_text="IVFFlat: listas visitadas por búsqueda (más = mejor recall y más latencia)",
+    )
+
+    rerank_scorer = models.CharField(
+        max_length=10,
+        choices=[
+            ("none", "Sin reranking"),
+            ("tfidf", "TF-IDF (coseno)"),
+            ("rapidfuzz", "RapidFuzz (solapamiento de tokens)"),
+        ],
+        default="none",
+        help_text="Reordena localmente los fragmentos recuperados y sólo pasa los mejores al prompt",
+    )
+    rerank_candidates = models.PositiveIntegerField(
+        default=20,
+        validators=[MinValueValidator(1), MaxValueValidator(200)],
+        help_text="Fragmentos que se recuperan antes de reordenar",
+    )
+    rerank_top_n = models.PositiveIntegerField(
+        default=3,
+        validators=[MinValueValidator(1), MaxValueValidator(50)],
+        help_text="Fragmentos máximos que pasan al prompt tras reordenar",
+    )
+    rerank_token_budget = models.PositiveIntegerField(
+        default=1500,
+        help_text="Tokens aproximados máximos de los fragmentos en el prompt (0 = sin límite)",
+    )
+
     def __str__(self):
         return self.name
 
@@ -90,3 +153,34 @@ class AgentModel(AppModel):
         """
         self.full_clean()  # Ejecuta las validaciones del modelo
         super().save(*args, **kwargs)
+
+
+class ResponseCacheEntryModel(AppModel):
+    """
+    Respuesta cacheada de un agente.
+
+    `knowledge_version` identifica la configuración del agente y el estado de
+    su conocimiento al generar la respuesta; una entrada sólo se reutiliza
+    mientras esa versión siga vigente.
+    """
+
+    agent = models.ForeignKey(
+        AgentModel, on_delete=models.CASCADE, related_name="response_cache_entries"
+    )
+    knowledge_version = models.CharField(max_length=64)
+    message_hash = models.CharField(max_length=64)
+    message = models.TextField()
+    response = models.TextField()
+    # Embedding del mensaje como float32 (numpy.ndarray.tobytes)
+    embedding = models.BinaryField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["agent", "knowledge_version", "message_hash"]),
+        ]
+
+    def __str__(self):
+        return f"{self.agent.name}: {self.message[:50]}"
@@ -11,6 +11,8 @@ from agents.models import AgentModel
 from knowledge.services.document_knowledge_base_service import (
     DocumentKnowledgeBaseService,
 )
+from main.engines import get_ia_engine
+from main.metrics import timed
 
 
 class AgentFactoryService:
@@ -29,7 +31,12 @@ class AgentFactoryService:
             self.__model = Ollama
         if self._agent_model.tenant.model == "gemini":
             self.__model = Gemini
-        return self.configure(self.__model)
+        with timed(
+            "agent_build",
+            agent=self._agent_model.id,
+            provider=self._agent_model.tenant.model,
+        ):
+            return self.configure(self.__model)
 
     @overload
     def configure(self, model: Gemini) -> Agent: ...
@@ -48,12 +55,17 @@ class AgentFactoryService:
             Agent: Instancia configurada del agente
         """
 
-        db_url = "postgresql+psycopg://ai:ai@localhost:5532/ai"
-        memory = Memory(db=PostgresMemoryDb(table_name="agent_memory", db_url=db_url))
+        # Memoria y sesiones reutilizan el pool compartido contra IA_DB
+        db_engine = get_ia_engine()
+        memory = Memory(
+            db=PostgresMemoryDb(table_name="agent_memory", db_engine=db_engine)
+        )
 
         # Configurar storage para sesiones
         storage = PostgresStorage(
-            table_name="agent_sessions", db_url=db_url, auto_upgrade_schema=True
+            table_name="agent_sessions",
+            db_engine=db_engine,
+            auto_upgrade_schema=True,
         )
 
         ai_model = model(
@@ -66,8 +78,8 @@ class AgentFactoryService:
             model=ai_model,
             description=self._agent_model.description or "Agente de IA",
             instructions=self._agent_model.instructions,
-            session_id=str(self._session_id),
-            user_id=str(self._user_id),
+            session_id=str(self._session_id) if self._session_id else None,
+            user_id=str(self._user_id) if self._user_id else None,
             memory=memory,
             storage=storage,
             enable_user_memories=True,  # Habilita memorias de usuario
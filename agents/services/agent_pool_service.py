@@ -0,0 +1,146 @@
+"""
+Pool de agentes por proceso.
+
+Mantiene instancias de `Agent` ya construidas (modelo, memoria, storage y
+knowledge base) para no reconstruirlas en cada mensaje de chat.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+from agno.agent import Agent
+from asgiref.sync import sync_to_async
+
+from agents.models import AgentModel
+from agents.services.agent_factory_service import AgentFactoryService
+from main.settings import AGENT_POOL_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPoolService:
+    """
+    Pool LRU de agentes listos para usar.
+
+    Las instancias se indexan por (id del agente, updated_at), de modo que
+    cualquier cambio guardado en el AgentModel produce una clave nueva y las
+    instancias anteriores dejan de reutilizarse, incluso en otros procesos.
+    Cada instancia se presta en exclusiva: un `Agent` de agno guarda estado
+    de la ejecución en curso y no puede compartirse entre hilos.
+    """
+
+    max_size = AGENT_POOL_MAX_SIZE
+
+    _idle: "OrderedDict[tuple, list[Agent]]" = OrderedDict()
+    _generations: dict = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(agent_model: AgentModel) -> tuple:
+        return (agent_model.pk, agent_model.updated_at)
+
+    @classmethod
+    def size(cls) -> int:
+        """Número de instancias ociosas en el pool."""
+        with cls._lock:
+            return sum(len(agents) for agents in cls._idle.values())
+
+    @classmethod
+    def acquire(cls, agent_model: AgentModel) -> tuple:
+        """
+        Obtiene un agente del pool o construye uno nuevo.
+
+        Returns:
+            tuple: (Agent, generación) para devolverlo luego con `release`
+        """
+        key = cls._key(agent_model)
+        with cls._lock:
+            generation = cls._generations.get(agent_model.pk, 0)
+            agents = cls._idle.get(key)
+            if agents:
+                agent = agents.pop()
+                if agents:
+                    cls._idle.move_to_end(key)
+                else:
+                    del cls._idle[key]
+                return agent, generation
+
+        logger.debug(f"🏗️ Construyendo nueva instancia del agente {agent_model.name}")
+        agent = AgentFactoryService(agent_model=agent_model).get_agent()
+        return agent, generation
+
+    @classmethod
+    def release(cls, agent_model: AgentModel, agent: Agent, generation: int) -> None:
+        """Devuelve un agente al pool si sigue vigente."""
+        key = cls._key(agent_model)
+        with cls._lock:
+            if cls._generations.get(agent_model.pk, 0) != generation:
+                # El agente fue invalidado mientras estaba prestado
+                return
+
+            # Descartar versiones anteriores del mismo agente
+            for stale_key in [
+                k for k in cls._idle if k[0] == agent_model.pk and k != key
+            ]:
+                del cls._idle[stale_key]
+
+            cls._idle.setdefault(key, []).append(agent)
+            cls._idle.move_to_end(key)
+            cls._evict()
+
+    @classmethod
+    @contextmanager
+    def lease(cls, agent_model: AgentModel):
+        """
+        Presta un agente durante el bloque `with`.
+
+        Si la ejecución falla, la instancia se descarta en lugar de volver
+        al pool.
+        """
+        agent, generation = cls.acquire(agent_model)
+        yield agent
+        cls.release(agent_model, agent, generation)
+
+    @classmethod
+    @asynccontextmanager
+    async def alease(cls, agent_model: AgentModel):
+        """
+        Versión asíncrona de `lease`.
+
+        La construcción de un agente nuevo no usa el ORM de Django, así que
+        se ejecuta en un hilo aparte sin bloquear el event loop.
+        """
+        agent, generation = await sync_to_async(cls.acquire, thread_sensitive=False)(
+            agent_model
+        )
+        yield agent
+        cls.release(agent_model, agent, generation)
+
+    @classmethod
+    def invalidate(cls, agent_id: int) -> None:
+        """Elimina del pool todas las instancias de un agente."""
+        with cls._lock:
+            cls._generations[agent_id] = cls._generations.get(agent_id, 0) + 1
+            for key in [k for k in cls._idle if k[0] == agent_id]:
+                del cls._idle[key]
+
+    @classmethod
+    def clear(cls) -> None:
+        """Vacía el pool completo."""
+        with cls._lock:
+            for agent_id in {k[0] for k in cls._idle}:
+                cls._generations[agent_id] = cls._generations.get(agent_id, 0) + 1
+            cls._idle.clear()
+
+    @classmethod
+    def _evict(cls) -> None:
+        """Expulsa las instancias usadas hace más tiempo (requiere el lock)."""
+        total = sum(len(agents) for agents in cls._idle.values())
+        while total > cls.max_size and cls._idle:
+            key, agents = next(iter(cls._idle.items()))
+            agents.pop(0)
+            if not agents:
+                del cls._idle[key]
+            total -= 1
@@ -1,15 +1,31 @@
 import logging
 import re
 
+from agno.run.response import RunEvent
+
 from agents.models import AgentModel
-from agents.services.agent_factory_service import AgentFactoryService
+from agents.services.agent_pool_service import AgentPoolService
+from agents.services.think_stream_filter import ThinkStreamFilter
+from knowledge.services.document_knowledge_base_service import (
+    DocumentKnowledgeBaseService,
+)
+from main.metrics import set_labels, timed
 from tools.kit.obtener_datos_de_factura import *
 
 logger = logging.getLogger(__name__)
 
 
 class AgentService:
-    def __init__(self, agent_name: str, session_id=None) -> None:
+    def __init__(
+        self, agent_name: str, session_id=None, agent_model: AgentModel = None
+    ) -> None:
+        # Las vistas asíncronas resuelven el agente con el ORM asíncrono
+        if agent_model is not None:
+            self.__agent_model = agent_model
+            self._session_id = session_id
+            self.__set_metric_labels()
+            return
+
         # Obtener el agente directamente de la base de datos
         try:
             self.__agent_model = AgentModel.objects.select_related("tenant").get(
@@ -18,27 +34,97 @@ class AgentService:
         except AgentModel.DoesNotExist:
             raise AgentModel.DoesNotExist(f"Agent {agent_name} not found")
 
-        agent_factory = AgentFactoryService(
-            agent_model=self.__agent_model,
-            session_id=session_id,
-            user_id=session_id,
+        self._session_id = session_id
+        self.__set_metric_labels()
+
+    def __set_metric_labels(self) -> None:
+        tenant = self.__agent_model.tenant
+        set_labels(
+            agent=self.__agent_model.id,
+            tenant=tenant.id if tenant else None,
+            provider=tenant.model if tenant else None,
         )
-        self._agent = agent_factory.get_agent()
 
     def send_message(
         self, message: str, session_id: str, clean_respose: bool = True
     ) -> str:
         """Send a message to the agent and get a response."""
-        response = self._agent.run(
-            message, session_id=str(session_id), user_id=str(session_id)
-        )
+        # El agente se toma prestado del pool del proceso en lugar de
+        # construirse (modelo, memoria, storage, knowledge) en cada mensaje
+        with AgentPoolService.lease(self.__agent_model) as agent:
+            with timed("model"):
+                response = agent.run(
+                    message,
+                    stream=False,
+                    session_id=str(session_id),
+                    user_id=str(session_id),
+                )
+        content = response.content
+        if clean_respose:
+            with timed("think_cleanup"):
+                content = self.__clean_response(content)
+        return content, response.session_id
+
+    async def asend_message(
+        self, message: str, session_id: str, clean_respose: bool = True
+    ) -> str:
+        """Send a message to the agent without blocking the event loop."""
+        async with AgentPoolService.alease(self.__agent_model) as agent:
+            with timed("model"):
+                response = await agent.arun(
+                    message,
+                    stream=False,
+                    session_id=str(session_id),
+                    user_id=str(session_id),
+                )
+        content = response.content
         if clean_respose:
-            response = self.__clean_response(response.content), response.session_id
-        return response[0], response[1]
+            with timed("think_cleanup"):
+                content = self.__clean_response(content)
+        return content, response.session_id
+
+    def stream_message(self, message: str, session_id: str):
+        """
+        Send a message to the agent and yield the response as it is generated.
+
+        Los bloques <think> se eliminan de forma incremental.
+        """
+        think_filter = ThinkStreamFilter()
+        with AgentPoolService.lease(self.__agent_model) as agent, timed("model"):
+            for event in agent.run(
+                message,
+                stream=True,
+                session_id=str(session_id),
+                user_id=str(session_id),
+            ):
+                if event.event == RunEvent.run_error:
+                    raise RuntimeError(event.content)
+                if event.event != RunEvent.run_response_content:
+                    continue
+                if not isinstance(event.content, str):
+                    continue
+
+                delta = think_filter.feed(event.content)
+                if delta:
+                    yield delta
+
+        tail = think_filter.flush()
+        if tail:
+            yield tail
 
     def __clean_response(self, response: str) -> str:
         return re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
 
+    def get_knowledge_status(self) -> str:
+        """Estado del índice de conocimiento del agente ("ready" o "indexing")."""
+        with timed("knowledge_status"):
+            return DocumentKnowledgeBaseService(self.__agent_model).get_status()
+
+    async def aget_knowledge_status(self) -> str:
+        """Versión asíncrona de `get_knowledge_status`."""
+        with timed("knowledge_status"):
+            return await DocumentKnowledgeBaseService(self.__agent_model).aget_status()
+
     def get_agent_model(self) -> Agent:
         """Get the agent instance."""
         return self.__agent_model
@@ -0,0 +1,212 @@
+"""
+Caché de respuestas por agente.
+
+Evita ejecutar el modelo cuando un agente ya respondió la misma pregunta (o
+una muy parecida) con la misma configuración y el mismo conocimiento.
+
+Los agentes guardan historial, memorias y resúmenes por sesión (su `user_id`
+es la sesión), así que la respuesta a un mensaje depende de los turnos
+anteriores. La caché sólo se consulta y se llena con el primer mensaje de una
+sesión nueva, cuando el agente aún no tiene contexto de ella.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+from agno.embedder.google import GeminiEmbedder
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from agents.models import AgentModel, ResponseCacheEntryModel
+from knowledge.services.document_knowledge_base_service import (
+    DocumentKnowledgeBaseService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheService:
+    """
+    Caché opcional (`AgentModel.response_cache_enabled`) de respuestas.
+
+    La búsqueda se hace primero por hash exacto del mensaje normalizado y,
+    si falla, por similitud coseno entre embeddings contra el umbral
+    `response_cache_similarity`. Las entradas se asocian a una versión que
+    combina la configuración del agente (incluidas sus instrucciones) y su
+    conocimiento vinculado, y caducan por TTL y por número máximo de entradas.
+
+    Con `new_session=False` (un mensaje de una sesión con turnos previos) la
+    caché queda desactivada: `get` devuelve None y `set` no guarda nada.
+    """
+
+    def __init__(self, agent_model: AgentModel, new_session: bool = False) -> None:
+        self.agent_model = agent_model
+        self.new_session = new_session
+        self._version = None
+        self._embedding = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.agent_model.response_cache_enabled and self.new_session
+
+    @property
+    def semantic(self) -> bool:
+        """La búsqueda por similitud sólo se usa con un umbral menor a 1.0."""
+        return self.agent_model.response_cache_similarity < 1.0
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        return " ".join(message.lower().split())
+
+    @classmethod
+    def hash_message(cls, message: str) -> str:
+        return hashlib.sha256(cls.normalize(message).encode("utf-8")).hexdigest()
+
+    def get_version(self) -> str:
+        """Versión vigente del agente: configuración, instrucciones y conocimiento."""
+        if self._version is None:
+            knowledge_version = DocumentKnowledgeBaseService(
+                self.agent_model
+            ).get_version()
+            # updated_at cambia con cualquier cambio del agente o de sus relaciones
+            updated_at = self.agent_model.updated_at.isoformat()
+            digest = hashlib.sha256()
+            digest.update(f"{self.agent_model.pk}:{updated_at}:".encode())
+            digest.update(self.agent_model.instructions.encode("utf-8"))
+            digest.update(knowledge_version.encode())
+            self._version = digest.hexdigest()
+        return self._version
+
+    def _entries(self):
+        return ResponseCacheEntryModel.objects.filter(
+            agent=self.agent_model,
+            knowledge_version=self.get_version(),
+            expires_at__gt=timezone.now(),
+        )
+
+    def get(self, message: str) -> Optional[str]:
+        """
+        Busca una respuesta cacheada para el mensaje.
+
+        Returns:
+            str | None: Respuesta cacheada o None si no hay coincidencia
+        """
+        if not self.enabled:
+            return None
+
+        entries = self._entries()
+        match = (
+            entries.filter(message_hash=self.hash_message(message))
+            .values_list("id", "response")
+            .first()
+        )
+        if match is None and self.semantic:
+            match = self._find_similar(entries, message)
+        if match is None:
+            return None
+
+        entry_id, response = match
+        ResponseCacheEntryModel.objects.filter(pk=entry_id).update(
+            hits=F("hits") + 1, last_hit_at=timezone.now()
+        )
+        logger.debug(f"🎯 Respuesta cacheada para el agente {self.agent_model.name}")
+        return response
+
+    def set(self, message: str, response: str) -> None:
+        """Guarda la respuesta del agente y aplica los límites de la caché."""
+        if not self.enabled or not response:
+            return
+
+        now = timezone.now()
+        embedding = self._get_embedding(message) if self.semantic else None
+        ResponseCacheEntryModel.objects.create(
+            agent=self.agent_model,
+            knowledge_version=self.get_version(),
+            message_hash=self.hash_message(message),
+            message=message,
+            response=response,
+            embedding=embedding.tobytes() if embedding is not None else None,
+            expires_at=now + timedelta(seconds=self.agent_model.response_cache_ttl),
+        )
+        self._evict(now)
+
+    @staticmethod
+    def invalidate(*agent_ids: int) -> None:
+        """Elimina todas las respuestas cacheadas de los agentes indicados."""
+        ResponseCacheEntryModel.objects.filter(agent_id__in=agent_ids).delete()
+
+    def _find_similar(self, entries, message: str) -> Optional[tuple]:
+        candidates = list(
+            entries.exclude(embedding=None).values_list("id", "embedding", "response")
+        )
+        if not candidates:
+            return None
+
+        query = self._get_embedding(message)
+        if query is None:
+            return None
+
+        vectors = [np.frombuffer(bytes(row[1]), dtype=np.float32) for row in candidates]
+        index = self.best_match(
+            query, vectors, self.agent_model.response_cache_similarity
+        )
+        if index is None:
+            return None
+        return candidates[index][0], candidates[index][2]
+
+    @staticmethod
+    def best_match(query: np.ndarray, vectors: list, threshold: float) -> Optional[int]:
+        """
+        Índice del vector más similar a `query` si supera el umbral.
+
+        Los vectores de otra dimensión (p. ej. de un embedder anterior) se
+        ignoran.
+        """
+        rows = [i for i, vector in enumerate(vectors) if vector.shape == query.shape]
+        if not rows:
+            return None
+
+        matrix = np.vstack([vectors[i] for i in rows])
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return rows[best]
+
+    def _get_embedding(self, message: str) -> Optional[np.ndarray]:
+        """Embedding del mensaje; se reutiliza entre `get` y `set`."""
+        message_hash = self.hash_message(message)
+        if self._embedding is not None and self._embedding[0] == message_hash:
+            return self._embedding[1]
+
+        try:
+            embedder = GeminiEmbedder(api_key=self.agent_model.tenant.ai_token)
+            values = embedder.get_embedding(self.normalize(message))
+        except Exception as e:
+            logger.warning(f"No se pudo calcular el embedding para la caché: {e}")
+            return None
+        if not values:
+            return None
+
+        embedding = np.asarray(values, dtype=np.float32)
+        self._embedding = (message_hash, embedding)
+        return embedding
+
+    def _evict(self, now) -> None:
+        """Elimina entradas caducadas, de versiones anteriores y las que sobran."""
+        entries = ResponseCacheEntryModel.objects.filter(agent=self.agent_model)
+        entries.exclude(knowledge_version=self.get_version()).delete()
+        entries.filter(expires_at__lte=now).delete()
+
+        overflow = list(
+            entries.order_by(Coalesce("last_hit_at", "created_at").desc()).values_list(
+                "id", flat=True
+            )[self.agent_model.response_cache_max_entries :]
+        )
+        if overflow:
+            ResponseCacheEntryModel.objects.filter(id__in=overflow).delete()
@@ -0,0 +1,78 @@
+"""
+Filtro incremental de bloques <think>...</think> para respuestas en streaming.
+"""
+
+
+class ThinkStreamFilter:
+    """
+    Elimina los bloques <think>...</think> de una respuesta que llega por
+    fragmentos.
+
+    Las etiquetas pueden quedar partidas entre dos fragmentos, por lo que el
+    filtro retiene el final del buffer que todavía podría ser el comienzo de
+    una etiqueta hasta recibir el siguiente fragmento.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._inside = False
+        self._started = False
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        """Longitud del sufijo de `text` que es prefijo de `tag`."""
+        for size in range(min(len(text), len(tag) - 1), 0, -1):
+            if text.endswith(tag[:size]):
+                return size
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        """
+        Procesa un fragmento y retorna el texto visible que ya puede emitirse.
+        """
+        self._buffer += chunk
+        visible = []
+
+        while self._buffer:
+            if self._inside:
+                index = self._buffer.find(self.CLOSE_TAG)
+                if index < 0:
+                    keep = self._partial_tag_length(self._buffer, self.CLOSE_TAG)
+                    self._buffer = self._buffer[len(self._buffer) - keep :]
+                    break
+                self._buffer = self._buffer[index + len(self.CLOSE_TAG) :]
+                self._inside = False
+            else:
+                index = self._buffer.find(self.OPEN_TAG)
+                if index < 0:
+                    keep = self._partial_tag_length(self._buffer, self.OPEN_TAG)
+                    visible.append(self._buffer[: len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep :]
+                    break
+                visible.append(self._buffer[:index])
+                self._buffer = self._buffer[index + len(self.OPEN_TAG) :]
+                self._inside = True
+
+        return self._emit("".join(visible))
+
+    def flush(self) -> str:
+        """
+        Retorna el texto retenido al finalizar el stream.
+
+        Un bloque <think> sin cerrar se descarta.
+        """
+        remaining = "" if self._inside else self._buffer
+        self._buffer = ""
+        self._inside = False
+        return self._emit(remaining)
+
+    def _emit(self, text: str) -> str:
+        # Igual que la limpieza no incremental, se omiten los espacios
+        # iniciales que suelen quedar tras el bloque <think>
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
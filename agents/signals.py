@@ -2,7 +2,15 @@
 
 import logging
 
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from agents.services.agent_pool_service import AgentPoolService
+from agents.services.response_cache_service import ResponseCacheService
+from knowledge.models import KnowledgeModel
 from main.signals import track_model_changes
+from tenants.models import TenantModel
 
 from .models import AgentModel
 
@@ -67,3 +75,82 @@ def log_agent_changes(sender, instance, created, updated_fields, change_type, **
             )
         else:
             logger.info(f"💾 {model_name} guardado sin cambios: {instance}")
+
+
+@track_model_changes(AgentModel)
+def invalidate_agent_pool(
+    sender, instance, created, updated_fields, change_type, **kwargs
+):
+    """
+    Descarta las instancias del agente guardadas en el pool del proceso.
+    """
+    if not created:
+        AgentPoolService.invalidate(instance.pk)
+
+
+@track_model_changes(TenantModel)
+def invalidate_tenant_agents_pool(
+    sender, instance, created, updated_fields, change_type, **kwargs
+):
+    """
+    El proveedor y el token de IA viven en el tenant: al cambiar, se renuevan
+    los agentes del tenant en todos los procesos actualizando su updated_at.
+    """
+    if created:
+        return
+
+    agent_ids = list(instance.agents.values_list("id", flat=True))
+    AgentModel.objects.filter(id__in=agent_ids).update(updated_at=timezone.now())
+    for agent_id in agent_ids:
+        AgentPoolService.invalidate(agent_id)
+
+
+@receiver(m2m_changed, sender=AgentModel.knoledge_text_models.through)
+@receiver(m2m_changed, sender=AgentModel.api_call_models.through)
+def invalidate_agent_pool_on_relations(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Los cambios en relaciones M2M no modifican updated_at, así que se
+    actualiza explícitamente para invalidar el pool en todos los procesos.
+    """
+    if not reverse:
+        if action not in ("post_add", "post_remove", "post_clear"):
+            return
+        agent_ids = [instance.pk]
+    elif action in ("post_add", "post_remove"):
+        agent_ids = list(pk_set or [])
+    elif action == "pre_clear":
+        # Desde el lado inverso sólo se conocen los agentes antes de limpiar
+        agent_ids = list(instance.agentmodel_set.values_list("id", flat=True))
+    else:
+        return
+
+    AgentModel.objects.filter(id__in=agent_ids).update(updated_at=timezone.now())
+    for agent_id in agent_ids:
+        AgentPoolService.invalidate(agent_id)
+
+
+@track_model_changes(AgentModel)
+def invalidate_response_cache(
+    sender, instance, created, updated_fields, change_type, **kwargs
+):
+    """
+    Elimina las respuestas cacheadas al cambiar el agente (p. ej. sus
+    instrucciones); ya no coinciden con la versión vigente.
+    """
+    if not created and updated_fields:
+        ResponseCacheService.invalidate(instance.pk)
+
+
+@track_model_changes(KnowledgeModel)
+def invalidate_response_cache_on_knowledge(
+    sender, instance, created, updated_fields, change_type, **kwargs
+):
+    """Elimina las respuestas cacheadas de los agentes que usan el conocimiento."""
+    if created:
+        return
+
+    agent_ids = list(instance.agentmodel_set.values_list("id", flat=True))
+    if agent_ids:
+        ResponseCacheService.invalidate(*agent_ids)
@@ -0,0 +1,82 @@
+"""
+Tests unitarios para AgentPoolService.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from agents.services.agent_pool_service import AgentPoolService
+
+
+class AgentPoolServiceTestCase(SimpleTestCase):
+    """Tests del pool LRU de agentes."""
+
+    def setUp(self):
+        AgentPoolService.clear()
+        self.updated_at = datetime(2025, 1, 1)
+        self.agent_model = SimpleNamespace(
+            pk=1, name="agente", updated_at=self.updated_at
+        )
+        patcher = patch("agents.services.agent_pool_service.AgentFactoryService")
+        self.factory = patcher.start()
+        self.factory.side_effect = lambda agent_model: Mock(
+            get_agent=Mock(return_value=Mock(name="agent"))
+        )
+        self.addCleanup(patcher.stop)
+        self.addCleanup(AgentPoolService.clear)
+
+    def test_reuses_released_agent(self):
+        with AgentPoolService.lease(self.agent_model) as first:
+            pass
+        with AgentPoolService.lease(self.agent_model) as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(self.factory.call_count, 1)
+
+    def test_concurrent_leases_get_different_agents(self):
+        with AgentPoolService.lease(self.agent_model) as first:
+            with AgentPoolService.lease(self.agent_model) as second:
+                self.assertIsNot(first, second)
+
+        self.assertEqual(AgentPoolService.size(), 2)
+
+    def test_updated_at_change_builds_new_agent(self):
+        with AgentPoolService.lease(self.agent_model) as first:
+            pass
+
+        self.agent_model.updated_at = self.updated_at + timedelta(seconds=1)
+        with AgentPoolService.lease(self.agent_model) as second:
+            pass
+
+        self.assertIsNot(first, second)
+        # La versión anterior se descarta al devolver la nueva
+        self.assertEqual(AgentPoolService.size(), 1)
+
+    def test_invalidate_discards_leased_agent(self):
+        with AgentPoolService.lease(self.agent_model):
+            AgentPoolService.invalidate(self.agent_model.pk)
+
+        self.assertEqual(AgentPoolService.size(), 0)
+
+    def test_failed_run_is_not_returned_to_pool(self):
+        with self.assertRaises(RuntimeError):
+            with AgentPoolService.lease(self.agent_model):
+                raise RuntimeError("fallo del modelo")
+
+        self.assertEqual(AgentPoolService.size(), 0)
+
+    def test_evicts_least_recently_used(self):
+        other = SimpleNamespace(pk=2, name="otro", updated_at=self.updated_at)
+        with patch.object(AgentPoolService, "max_size", 1):
+            with AgentPoolService.lease(self.agent_model):
+                pass
+            with AgentPoolService.lease(other) as kept:
+                pass
+
+            self.assertEqual(AgentPoolService.size(), 1)
+            with AgentPoolService.lease(other) as reused:
+                self.assertIs(kept, reused)
@@ -0,0 +1,47 @@
+"""
+Tests unitarios para ResponseCacheService.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from agents.services.response_cache_service import ResponseCacheService
+
+
+class ResponseCacheServiceTestCase(SimpleTestCase):
+    """Tests de la normalización y la búsqueda por similitud."""
+
+    def test_hash_ignores_case_and_whitespace(self):
+        self.assertEqual(
+            ResponseCacheService.hash_message("¿Qué  hay en el MENÚ?"),
+            ResponseCacheService.hash_message("¿qué hay en el menú? "),
+        )
+
+    def test_best_match_returns_most_similar_above_threshold(self):
+        query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        vectors = [
+            np.array([0.0, 1.0, 0.0], dtype=np.float32),
+            np.array([0.99, 0.05, 0.0], dtype=np.float32),
+        ]
+        self.assertEqual(ResponseCacheService.best_match(query, vectors, 0.95), 1)
+
+    def test_best_match_below_threshold(self):
+        query = np.array([1.0, 0.0], dtype=np.float32)
+        vectors = [np.array([0.6, 0.8], dtype=np.float32)]
+        self.assertIsNone(ResponseCacheService.best_match(query, vectors, 0.95))
+
+    def test_best_match_skips_other_dimensions(self):
+        query = np.array([1.0, 0.0], dtype=np.float32)
+        vectors = [np.array([1.0, 0.0, 0.0], dtype=np.float32)]
+        self.assertIsNone(ResponseCacheService.best_match(query, vectors, 0.5))
+
+    def test_cache_only_applies_to_new_sessions(self):
+        agent = SimpleNamespace(response_cache_enabled=True, name="menu")
+
+        self.assertTrue(ResponseCacheService(agent, new_session=True).enabled)
+        existing = ResponseCacheService(agent, new_session=False)
+        self.assertFalse(existing.enabled)
+        self.assertIsNone(existing.get("¿Qué hay en el menú?"))
+        existing.set("¿Qué hay en el menú?", "Pizza")
@@ -0,0 +1,41 @@
+"""
+Tests unitarios para ThinkStreamFilter.
+"""
+
+from django.test import SimpleTestCase
+
+from agents.services.think_stream_filter import ThinkStreamFilter
+
+
+class ThinkStreamFilterTestCase(SimpleTestCase):
+    """Tests del filtro incremental de bloques <think>."""
+
+    def _run(self, chunks):
+        think_filter = ThinkStreamFilter()
+        output = [think_filter.feed(chunk) for chunk in chunks]
+        output.append(think_filter.flush())
+        return "".join(output)
+
+    def test_text_without_think_passes_through(self):
+        self.assertEqual(self._run(["Hola ", "mundo"]), "Hola mundo")
+
+    def test_removes_think_block_in_single_chunk(self):
+        self.assertEqual(
+            self._run(["<think>razonando</think>\n\nRespuesta"]), "Respuesta"
+        )
+
+    def test_removes_think_block_split_across_chunks(self):
+        chunks = ["<thi", "nk>razo", "nando</th", "ink>", " Respuesta ", "final"]
+        self.assertEqual(self._run(chunks), "Respuesta final")
+
+    def test_keeps_text_around_think_block(self):
+        chunks = ["Antes <think>", "oculto", "</think> después"]
+        self.assertEqual(self._run(chunks), "Antes  después")
+
+    def test_partial_tag_is_released_when_not_a_tag(self):
+        think_filter = ThinkStreamFilter()
+        self.assertEqual(think_filter.feed("a <th"), "a ")
+        self.assertEqual(think_filter.feed("is"), "<this")
+
+    def test_unclosed_think_block_is_dropped(self):
+        self.assertEqual(self._run(["Hola <think>sin cerrar"]), "Hola ")
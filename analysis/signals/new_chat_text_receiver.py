@@ -1,5 +1,8 @@
+from django.dispatch import receiver
+
 from analysis.tasks import run_sentiment_analysis
-from chats.models import ContentChatModel
+from chats.models import ChatModel, ContentChatModel
+from chats.signals.content_chat_emit import transcript_flushed
 from main.signals import track_model_changes
 
 
@@ -17,3 +20,28 @@ def handle_new_chat_text(
             timestamp=instance.created_at,
             sentiment_model=instance.chat.agent.analize_sentiment_id,
         )
+
+
+@receiver(transcript_flushed)
+def handle_flushed_chat_texts(sender, contents, **kwargs):
+    """
+    Handler para los mensajes persistidos en lote por ChatTranscriptWriter.
+
+    `bulk_create` no emite post_save, así que el análisis de sentimiento se
+    despacha aquí. El modelo de sentimiento de cada sesión se resuelve en una
+    sola consulta para todo el lote.
+    """
+    sentiment_models = {
+        str(session_id): sentiment_model
+        for session_id, sentiment_model in ChatModel.objects.filter(
+            session_id__in={content.chat_id for content in contents}
+        ).values_list("session_id", "agent__analize_sentiment_id")
+    }
+    for content in contents:
+        run_sentiment_analysis.delay(
+            message=content.request,
+            session_id=str(content.chat_id),
+            timestamp=content.created_at,
+            sentiment_model=sentiment_models.get(str(content.chat_id)),
+            content_id=content.pk,
+        )
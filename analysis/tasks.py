@@ -7,8 +7,13 @@ from chats.models import ContentChatModel
 
 
 @shared_task
-def run_sentiment_analysis(message, session_id, timestamp, sentiment_model=None):
-    content = ContentChatModel.objects.get(chat=session_id, created_at=timestamp)
+def run_sentiment_analysis(
+    message, session_id, timestamp, sentiment_model=None, content_id=None
+):
+    if content_id is not None:
+        content = ContentChatModel.objects.get(pk=content_id)
+    else:
+        content = ContentChatModel.objects.get(chat=session_id, created_at=timestamp)
 
     if not sentiment_model:
         SentimentChatModel.objects.create(content_chat=content)
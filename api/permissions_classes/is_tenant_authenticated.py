@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission
 
-from tenants.models import TenantModel
+from main.metrics import set_labels, timed
+from tenants.services import TenantTokenCacheService
 
 
 class IsTenantAuthenticated(BasePermission):
@@ -9,6 +10,8 @@ class IsTenantAuthenticated(BasePermission):
 
     Checks if the cwu_token in request headers corresponds to a valid tenant.
     If valid, adds the tenant_id to request headers for use in views.
+    Tenants are resolved through TenantTokenCacheService, so a valid token
+    usually costs no database round trip.
     """
 
     def has_permission(self, request, view):
@@ -18,25 +21,26 @@ class IsTenantAuthenticated(BasePermission):
         if not cwu_token:
             return False
 
-        try:
-            # Buscar el tenant por el token
-            tenant = TenantModel.objects.get(cwu_token=cwu_token)
-
-            # Agregar el tenant_id a los headers de la request para uso posterior
-            if hasattr(request, "_request"):
-                # Para DRF Request objects
-                request._request.META["HTTP_TENANT_ID"] = str(tenant.id)
-                request._request.META["HTTP_TENANT_NAME"] = tenant.name
-            else:
-                # Para Django Request objects
-                request.META["HTTP_TENANT_ID"] = str(tenant.id)
-                request.META["HTTP_TENANT_NAME"] = tenant.name
-
-            # También agregar como atributo del request para fácil acceso
-            request.tenant = tenant
-            request.tenant_id = tenant.id
-
-            return True
-
-        except TenantModel.DoesNotExist:
+        # Buscar el tenant por el token (caché local -> Redis -> BD)
+        with timed("auth"):
+            tenant = TenantTokenCacheService.resolve(cwu_token)
+            if tenant is not None:
+                set_labels(tenant=tenant.id, provider=tenant.model)
+        if tenant is None:
             return False
+
+        # Agregar el tenant_id a los headers de la request para uso posterior
+        if hasattr(request, "_request"):
+            # Para DRF Request objects
+            request._request.META["HTTP_TENANT_ID"] = str(tenant.id)
+            request._request.META["HTTP_TENANT_NAME"] = tenant.name
+        else:
+            # Para Django Request objects
+            request.META["HTTP_TENANT_ID"] = str(tenant.id)
+            request.META["HTTP_TENANT_NAME"] = tenant.name
+
+        # También agregar como atributo del request para fácil acceso
+        request.tenant = tenant
+        request.tenant_id = tenant.id
+
+        return True
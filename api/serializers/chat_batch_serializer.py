@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from api.serializers.chat_serializer import ChatSerializer
+from main.settings import CHAT_BATCH_MAX_ITEMS
+
+
+class ChatBatchSerializer(serializers.Serializer):
+    """
+    Lote de mensajes independientes para `/api/v1/chat/batch`.
+
+    Cada item se valida con ChatSerializer sin crear sesiones: la vista crea
+    las que falten en una sola operación.
+    """
+
+    items = ChatSerializer(many=True, min_length=1, max_length=CHAT_BATCH_MAX_ITEMS)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.context["create_session"] = False
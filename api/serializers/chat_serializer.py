@@ -10,7 +10,8 @@ class ChatSerializer(serializers.Serializer):
     agent_id = serializers.UUIDField(required=False)
 
     def validate(self, attrs):
-        if "session_id" not in attrs:
+        # Las vistas asíncronas crean la sesión con el ORM asíncrono
+        if "session_id" not in attrs and self.context.get("create_session", True):
             attrs["session_id"] = ChatService.new(attrs["agent"])
             attrs["new"] = True
 
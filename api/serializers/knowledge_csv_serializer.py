@@ -15,48 +15,61 @@ class KnowledgeCSVSerializer(serializers.Serializer):
     )
 
     def validate_content(self, value):
-        """Validar que el contenido tenga formato CSV válido."""
-        try:
-            # Crear un StringIO para simular un archivo
-            csv_file = io.StringIO(value)
+        """
+        Validar que el contenido tenga formato CSV válido.
 
-            # Intentar leer el CSV
-            reader = csv.reader(csv_file)
-            rows = list(reader)
+        Se lee en una sola pasada y se corta en la primera fila inválida o al
+        superar `KNOWKEDGE_CSV_MAX_ROWS`. Las celdas leídas se guardan por
+        columnas para que `get_csv_rows` las entregue al formateador sin
+        volver a parsear el texto.
+        """
+        max_rows = KNOWKEDGE_CSV_MAX_ROWS
+        try:
+            reader = csv.reader(io.StringIO(value))
 
-            # Validaciones adicionales
-            if not rows:
+            headers = next(reader, None)
+            if headers is None:
                 raise serializers.ValidationError(
                     "El archivo CSV no puede estar vacío."
                 )
 
-            # Verificar que todas las filas tengan el mismo número de columnas
-            if len(rows) > 1:
-                header_columns = len(rows[0])
-                for i, row in enumerate(rows[1:], start=2):
-                    if len(row) != header_columns:
-                        raise serializers.ValidationError(
-                            f"La fila {i} tiene {len(row)} columnas, pero se esperaban {header_columns} "
-                            f"columnas (basado en el encabezado)."
-                        )
-
             # Verificar que el encabezado no tenga columnas vacías
-            if rows and any(not column.strip() for column in rows[0]):
+            if any(not column.strip() for column in headers):
                 raise serializers.ValidationError(
                     "El encabezado del CSV no puede contener columnas vacías."
                 )
 
-            # Limitar el número de filas para evitar archivos excesivamente grandes
-            max_rows = KNOWKEDGE_CSV_MAX_ROWS
-            if len(rows) > max_rows:
-                raise serializers.ValidationError(
-                    f"El CSV no puede tener más de {max_rows:,} filas. "
-                    f"Actualmente tiene {len(rows):,} filas."
-                )
+            header_columns = len(headers)
+            columns = [[] for _ in headers]
+            for i, row in enumerate(reader, start=2):
+                # Limitar el número de filas para evitar archivos excesivamente grandes
+                if i > max_rows:
+                    raise serializers.ValidationError(
+                        f"El CSV no puede tener más de {max_rows:,} filas."
+                    )
+
+                # Verificar que todas las filas tengan el mismo número de columnas
+                if len(row) != header_columns:
+                    raise serializers.ValidationError(
+                        f"La fila {i} tiene {len(row)} columnas, pero se esperaban {header_columns} "
+                        f"columnas (basado en el encabezado)."
+                    )
 
-            return value
+                for column, cell in zip(columns, row):
+                    column.append(cell)
 
+        except serializers.ValidationError:
+            raise
         except csv.Error as e:
             raise serializers.ValidationError(f"Formato CSV inválido: {str(e)}")
         except Exception as e:
             raise serializers.ValidationError(f"Error al procesar el CSV: {str(e)}")
+
+        self._csv_headers = headers
+        self._csv_columns = columns
+        return value
+
+    def get_csv_rows(self):
+        """Filas validadas (encabezado incluido) sin volver a parsear el CSV."""
+        yield self._csv_headers
+        yield from zip(*self._csv_columns)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from main.settings import CRAWLER_MAX_DEPTH, CRAWLER_MAX_LINKS
+
 
 class KnowledgeWebScrapingSerializer(serializers.Serializer):
     """Serializer para la vista de web scraping de conocimiento."""
@@ -9,10 +11,14 @@ class KnowledgeWebScrapingSerializer(serializers.Serializer):
     max_depth = serializers.IntegerField(
         required=False,
         default=1,
+        min_value=1,
+        max_value=CRAWLER_MAX_DEPTH,
         help_text="Profundidad máxima de scraping, por defecto 1",
     )
     max_links = serializers.IntegerField(
         required=False,
         default=1,
+        min_value=1,
+        max_value=CRAWLER_MAX_LINKS,
         help_text="Número máximo de enlaces a seguir, por defecto 1",
     )
@@ -1,3 +1,93 @@
-from django.test import TestCase
+import json
+from unittest.mock import patch
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from agents.models import AgentModel
+from api.serializers.knowledge_csv_serializer import KnowledgeCSVSerializer
+from api.serializers.knowledge_web_scraping_serializer import (
+    KnowledgeWebScrapingSerializer,
+)
+from api.views.chat_batch_view import ChatBatchView
+from knowledge.services.content_formatter_service import ContentFormatterService
+
+
+class ChatBatchViewTestCase(SimpleTestCase):
+    """Tests del streaming NDJSON del chat por lotes."""
+
+    @staticmethod
+    def _run_item(semaphore, agent_model, item, session_id):
+        with semaphore:
+            return item["message"].upper(), session_id, False
+
+    @patch("api.views.chat_batch_view.ChatService.append_contents")
+    def test_streams_one_line_per_item_and_persists_once(self, append_contents):
+        agents = {"menu": AgentModel(id=1, name="menu")}
+        items = [
+            {"agent": "menu", "message": "hola"},
+            {"agent": "otro", "message": "chau"},
+            {"agent": "menu", "message": "precio"},
+        ]
+        sessions = ["s1", None, "s3"]
+
+        with patch.object(ChatBatchView, "_run_item", staticmethod(self._run_item)):
+            lines = [
+                json.loads(line)
+                for line in ChatBatchView()._stream_results(1, items, agents, sessions)
+            ]
+
+        by_index = {line["index"]: line for line in lines}
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(by_index[0]["response"], "HOLA")
+        self.assertIn("error", by_index[1])
+        self.assertEqual(by_index[2]["session_id"], "s3")
+        append_contents.assert_called_once()
+        self.assertEqual(len(append_contents.call_args.args[0]), 2)
+
+
+class KnowledgeCSVSerializerTestCase(SimpleTestCase):
+    """Tests de la validación del CSV en una sola pasada."""
+
+    def test_validated_rows_feed_the_formatter_without_reparsing(self):
+        content = 'id,nombre,precio\n7,Agua,"1,5"\n8,Té,2\n'
+        serializer = KnowledgeCSVSerializer(
+            data={"name": "Bebidas", "content": content}
+        )
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with patch("knowledge.services.content_formatter_service.csv.reader") as reader:
+            markdown = ContentFormatterService.csv_to_markdown(
+                serializer.get_csv_rows(), "Bebidas"
+            )
+
+        reader.assert_not_called()
+        self.assertEqual(
+            markdown, ContentFormatterService.csv_to_markdown(content, "Bebidas")
+        )
+
+    @patch("api.serializers.knowledge_csv_serializer.KNOWKEDGE_CSV_MAX_ROWS", 2)
+    def test_stops_at_the_first_invalid_row_or_the_row_limit(self):
+        bad_row = KnowledgeCSVSerializer(data={"name": "x", "content": "a,b\n3\n"})
+        too_long = KnowledgeCSVSerializer(
+            data={"name": "x", "content": "a,b\n1,2\n3,4\n"}
+        )
+
+        self.assertFalse(bad_row.is_valid())
+        self.assertIn("La fila 2 tiene 1 columnas", str(bad_row.errors["content"]))
+        self.assertFalse(too_long.is_valid())
+        self.assertIn("más de 2 filas", str(too_long.errors["content"]))
+
+
+class KnowledgeWebScrapingSerializerTestCase(SimpleTestCase):
+    def test_crawl_limits_are_capped(self):
+        serializer = KnowledgeWebScrapingSerializer(
+            data={
+                "name": "ayuda",
+                "url": "https://ayuda.ejemplo.com",
+                "max_depth": 40000,
+                "max_links": 10**9,
+            }
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors), {"max_depth", "max_links"})
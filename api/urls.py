@@ -2,6 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views.agents_view import AgentModelViewSet
+from api.views.async_chat_view import AsyncChatView
+from api.views.chat_batch_view import ChatBatchView
 from api.views.chat_view import ChatView
 from api.views.knowledge_crud_view import KnowledgeViewSet
 
@@ -11,6 +13,8 @@ router.register(r"agents", AgentModelViewSet, basename="agents")
 
 urlpatterns = [
     path("v1/chat", ChatView.as_view(), name="api-chat"),
+    path("v1/chat/batch", ChatBatchView.as_view(), name="api-chat-batch"),
+    path("v1/async/chat", AsyncChatView.as_view(), name="api-chat-async"),
     path("v1/analysis/", include("analysis.urls")),
     path("v1/", include(router.urls)),
     path("v1/", include("documents.urls")),  # Agregar URLs de documentos
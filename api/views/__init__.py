@@ -7,6 +7,8 @@ Todas las vistas implementan IsTenantAuthenticated para control de acceso basado
 Vistas disponibles:
 - AgentModelViewSet: CRUD para modelos de agentes IA
 - ChatView: Endpoint para interacciones de chat
+- AsyncChatView: Endpoint de chat asíncrono para despliegues ASGI
+- ChatBatchView: Endpoint de chat por lotes con respuesta NDJSON
 - KnowledgeViewSet: CRUD para modelos de conocimiento
 - AnalysisView: (Futuro) Análisis de sentimientos
 - TenantsView: (Futuro) Gestión de tenants
@@ -14,11 +16,15 @@ Vistas disponibles:
 """
 
 from .agents_view import AgentModelViewSet
+from .async_chat_view import AsyncChatView
+from .chat_batch_view import ChatBatchView
 from .chat_view import ChatView
 from .knowledge_crud_view import KnowledgeViewSet
 
 __all__ = [
     "AgentModelViewSet",
     "ChatView",
+    "AsyncChatView",
+    "ChatBatchView",
     "KnowledgeViewSet",
 ]
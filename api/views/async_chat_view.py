@@ -0,0 +1,110 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from agents.models import AgentModel
+from agents.services.agent_service import AgentService
+from agents.services.response_cache_service import ResponseCacheService
+from api.serializers.chat_serializer import ChatSerializer
+from chats.services import ChatService
+from main.metrics import set_labels, timed
+from tenants.services import TenantTokenCacheService
+
+logger = logging.getLogger(__name__)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncChatView(View):
+    """
+    Versión asíncrona de ChatView para servir bajo ASGI.
+
+    Resuelve tenant, agente y sesión con el ORM asíncrono, ejecuta el modelo
+    con `agent.arun` y persiste la conversación sin ocupar un hilo del
+    worker mientras se espera la respuesta del proveedor de IA.
+    """
+
+    async def post(self, request):
+        tenant = await self._authenticate(request)
+        if tenant is None:
+            return JsonResponse(
+                {"error": "Token de tenant inválido o ausente"}, status=403
+            )
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "El cuerpo debe ser JSON válido"}, status=400)
+
+        serializer = ChatSerializer(data=data, context={"create_session": False})
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        message = serializer.validated_data["message"]
+        session_id = serializer.validated_data.get("session_id")
+        agent = serializer.validated_data["agent"]
+
+        try:
+            agent_model = await AgentModel.objects.select_related("tenant").aget(
+                name=agent
+            )
+        except AgentModel.DoesNotExist:
+            return JsonResponse({"error": f"Agent {agent} not found"}, status=404)
+
+        # Verificar que el agente pertenezca al tenant autenticado
+        if agent_model.tenant_id != tenant.id:
+            return JsonResponse(
+                {"error": "El agente no pertenece al tenant autenticado"}, status=403
+            )
+
+        new_session = session_id is None
+        if new_session:
+            session_id = await ChatService.anew(agent_model)
+        elif not await ChatService.aexists(session_id, agent_model):
+            return JsonResponse({"error": "Sesión de chat no encontrada"}, status=404)
+
+        agent_service = AgentService(agent, session_id, agent_model=agent_model)
+        response_cache = ResponseCacheService(agent_model, new_session=new_session)
+        with timed("response_cache"):
+            cached_text = await sync_to_async(response_cache.get)(message)
+        if cached_text is not None:
+            text = cached_text
+        else:
+            text, session_id = await agent_service.asend_message(message, session_id)
+            await sync_to_async(response_cache.set)(message, text)
+        await ChatService.aappend_content(
+            session_id=session_id, request=message, response=text
+        )
+
+        return JsonResponse(
+            {
+                "agent": agent,
+                "message": message,
+                "session_id": session_id,
+                "response": text,
+                "cached": cached_text is not None,
+                "knowledge_status": await agent_service.aget_knowledge_status(),
+            },
+            status=200,
+        )
+
+    async def _authenticate(self, request):
+        """Equivalente asíncrono de IsTenantAuthenticated."""
+        cwu_token = request.headers.get("X-Cwu-Token")
+        if not cwu_token:
+            return None
+
+        with timed("auth"):
+            tenant = await TenantTokenCacheService.aresolve(cwu_token)
+            if tenant is not None:
+                set_labels(tenant=tenant.id, provider=tenant.model)
+        if tenant is None:
+            return None
+
+        request.tenant = tenant
+        request.tenant_id = tenant.id
+        return tenant
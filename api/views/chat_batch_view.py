@@ -0,0 +1,198 @@
+import contextvars
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from agents.models import AgentModel
+from agents.services.agent_service import AgentService
+from agents.services.response_cache_service import ResponseCacheService
+from api.permissions_classes.is_tenant_authenticated import IsTenantAuthenticated
+from api.serializers.chat_batch_serializer import ChatBatchSerializer
+from chats.models import ChatModel
+from chats.services import ChatService
+from main.settings import CHAT_BATCH_TENANT_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBatchView(APIView):
+    """
+    Chat por lotes: varios mensajes independientes en una sola petición.
+
+    Recibe `{"items": [{"agent", "message", "session_id"?}, ...]}` y responde
+    en NDJSON (una línea por item, con su `index` en el lote) a medida que
+    cada item termina. Los agentes se resuelven una sola vez, las sesiones
+    que faltan se crean juntas y los items se ejecutan en paralelo con un
+    máximo de `CHAT_BATCH_TENANT_CONCURRENCY` ejecuciones simultáneas por
+    tenant en cada proceso. Las transcripciones se persisten en un solo lote.
+    """
+
+    permission_classes = [IsTenantAuthenticated]
+
+    _semaphores: dict = {}
+    _semaphores_lock = threading.Lock()
+
+    def post(self, request):
+        serializer = ChatBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+
+        items = serializer.validated_data["items"]
+        agents = self._resolve_agents(request.tenant, items)
+        sessions = self._resolve_sessions(items, agents)
+
+        response = StreamingHttpResponse(
+            self._stream_results(request.tenant.id, items, agents, sessions),
+            content_type="application/x-ndjson",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def _resolve_agents(tenant, items) -> dict:
+        """Agentes del tenant usados en el lote, por nombre, en una consulta."""
+        names = {item["agent"] for item in items}
+        return {
+            agent.name: agent
+            for agent in AgentModel.objects.select_related("tenant").filter(
+                name__in=names, tenant=tenant
+            )
+        }
+
+    @staticmethod
+    def _resolve_sessions(items, agents) -> list:
+        """
+        Sesión de cada item (None si no es válida).
+
+        Valida las sesiones existentes con una consulta y crea las que faltan
+        con un único `bulk_create`.
+        """
+        requested = [
+            item["session_id"]
+            for item in items
+            if "session_id" in item and item["agent"] in agents
+        ]
+        existing = set(
+            ChatModel.objects.filter(
+                session_id__in=requested, agent__in=agents.values()
+            ).values_list("session_id", "agent__name")
+        )
+
+        sessions = []
+        new_chats = []
+        for item in items:
+            agent_model = agents.get(item["agent"])
+            if agent_model is None:
+                sessions.append(None)
+            elif "session_id" in item:
+                key = (item["session_id"], agent_model.name)
+                sessions.append(item["session_id"] if key in existing else None)
+            else:
+                chat = ChatModel(agent=agent_model)
+                new_chats.append(chat)
+                sessions.append(chat.session_id)
+
+        ChatModel.objects.bulk_create(new_chats)
+        return sessions
+
+    @classmethod
+    def _get_semaphore(cls, tenant_id) -> threading.BoundedSemaphore:
+        with cls._semaphores_lock:
+            if tenant_id not in cls._semaphores:
+                cls._semaphores[tenant_id] = threading.BoundedSemaphore(
+                    CHAT_BATCH_TENANT_CONCURRENCY
+                )
+            return cls._semaphores[tenant_id]
+
+    def _stream_results(self, tenant_id, items, agents, sessions):
+        """Ejecuta los items en paralelo y emite cada resultado al terminar."""
+        semaphore = self._get_semaphore(tenant_id)
+        turns = []
+        executor = ThreadPoolExecutor(
+            max_workers=min(CHAT_BATCH_TENANT_CONCURRENCY, len(items)),
+            thread_name_prefix="chat-batch",
+        )
+        try:
+            futures = {}
+            for index, (item, session_id) in enumerate(zip(items, sessions)):
+                agent_model = agents.get(item["agent"])
+                if agent_model is None:
+                    error = f"Agent {item['agent']} not found"
+                    yield self._line({"index": index, "error": error})
+                elif session_id is None:
+                    error = "Sesión de chat no encontrada"
+                    yield self._line({"index": index, "error": error})
+                else:
+                    # Cada item hereda las etiquetas de métricas de la request
+                    future = executor.submit(
+                        contextvars.copy_context().run,
+                        self._run_item,
+                        semaphore,
+                        agent_model,
+                        item,
+                        session_id,
+                    )
+                    futures[future] = index
+
+            for future in as_completed(futures):
+                index = futures[future]
+                item = items[index]
+                try:
+                    text, session_id, cached = future.result()
+                except Exception as e:
+                    logger.error(f"Error en el item {index} del lote: {e}")
+                    yield self._line({"index": index, "error": str(e)})
+                    continue
+
+                turns.append((session_id, item["message"], text))
+                yield self._line(
+                    {
+                        "index": index,
+                        "agent": item["agent"],
+                        "message": item["message"],
+                        "session_id": session_id,
+                        "response": text,
+                        "cached": cached,
+                    }
+                )
+        finally:
+            # Si el cliente se desconecta no se ejecutan los items pendientes
+            executor.shutdown(wait=False, cancel_futures=True)
+            ChatService.append_contents(turns)
+
+    @staticmethod
+    def _run_item(semaphore, agent_model, item, session_id):
+        """Ejecuta un item en un hilo del pool respetando el límite del tenant."""
+        with semaphore:
+            try:
+                # Sólo los items sin sesión previa pueden usar la caché
+                response_cache = ResponseCacheService(
+                    agent_model, new_session="session_id" not in item
+                )
+                text = response_cache.get(item["message"])
+                if text is not None:
+                    return text, session_id, True
+
+                agent_service = AgentService(
+                    agent_model.name, session_id, agent_model=agent_model
+                )
+                text, session_id = agent_service.send_message(
+                    item["message"], session_id
+                )
+                response_cache.set(item["message"], text)
+                return text, session_id, False
+            finally:
+                # Los hilos del pool no pasan por el ciclo de request de Django
+                connections.close_all()
+
+    @staticmethod
+    def _line(data) -> str:
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
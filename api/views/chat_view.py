@@ -1,13 +1,34 @@
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from agents.services.agent_service import AgentService
+from agents.services.response_cache_service import ResponseCacheService
 from api.permissions_classes.is_tenant_authenticated import IsTenantAuthenticated
 from api.serializers.chat_serializer import ChatSerializer
 from chats.services import ChatService
+from main.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 
 class ChatView(APIView):
+    """
+    Chat con un agente.
+
+    Con `?stream=1` la respuesta se envía como Server-Sent Events: un evento
+    `token` por fragmento generado y un evento final `done` con la respuesta
+    completa (o `error` si la ejecución falla).
+
+    Si el agente tiene la caché de respuestas activada, la sesión es nueva y
+    hay una respuesta cacheada, se devuelve sin ejecutar el modelo
+    (`"cached": true`).
+    """
+
     permission_classes = [IsTenantAuthenticated]
 
     def post(self, request):
@@ -25,18 +46,97 @@ class ChatView(APIView):
                         status=403,
                     )
 
-            text, session_id = agent_service.send_message(message, session_id)
+            # El turno se persiste en segundo plano: una sesión inexistente o de
+            # otro agente se rechaza antes de ejecutar el modelo
+            if not serializer.validated_data.get("new") and not ChatService.exists(
+                session_id, agent_service.get_agent_model()
+            ):
+                return Response({"error": "Sesión de chat no encontrada"}, status=404)
+
+            # Sólo el primer mensaje de una sesión no depende de su historial
+            response_cache = ResponseCacheService(
+                agent_service.get_agent_model(),
+                new_session=serializer.validated_data.get("new", False),
+            )
+            with timed("response_cache"):
+                cached_text = response_cache.get(message)
+
+            if request.query_params.get("stream") in ("1", "true"):
+                response = StreamingHttpResponse(
+                    self._stream_events(
+                        agent_service,
+                        response_cache,
+                        cached_text,
+                        agent,
+                        message,
+                        session_id,
+                    ),
+                    content_type="text/event-stream",
+                )
+                response["Cache-Control"] = "no-cache"
+                # Evita que nginx acumule la respuesta antes de enviarla
+                response["X-Accel-Buffering"] = "no"
+                return response
+
+            if cached_text is not None:
+                text = cached_text
+            else:
+                text, session_id = agent_service.send_message(message, session_id)
+                response_cache.set(message, text)
             response = {
                 "agent": agent,
                 "message": message,
                 "session_id": session_id,
                 "response": text,
+                "cached": cached_text is not None,
+                # "indexing" mientras el conocimiento del agente se reindexa
+                "knowledge_status": agent_service.get_knowledge_status(),
             }
 
-            chat_service = ChatService(session_id)
-            chat_service.append_content(
+            ChatService.append_content(
                 session_id=session_id, request=message, response=response["response"]
             )
             return Response(response, status=200)
         else:
             return Response(serializer.errors, status=400)
+
+    def _stream_events(
+        self, agent_service, response_cache, cached_text, agent, message, session_id
+    ):
+        """Relaya la respuesta del agente como eventos SSE y la persiste al final."""
+        if cached_text is not None:
+            text = cached_text
+            yield self._sse("token", {"content": text})
+        else:
+            chunks = []
+            try:
+                for delta in agent_service.stream_message(message, session_id):
+                    chunks.append(delta)
+                    yield self._sse("token", {"content": delta})
+            except Exception as e:
+                logger.error(f"Error en el streaming del agente {agent}: {e}")
+                yield self._sse("error", {"error": str(e)})
+                return
+
+            text = "".join(chunks).strip()
+            response_cache.set(message, text)
+
+        ChatService.append_content(
+            session_id=session_id, request=message, response=text
+        )
+        yield self._sse(
+            "done",
+            {
+                "agent": agent,
+                "message": message,
+                "session_id": session_id,
+                "response": text,
+                "cached": cached_text is not None,
+                "knowledge_status": agent_service.get_knowledge_status(),
+            },
+        )
+
+    @staticmethod
+    def _sse(event, data):
+        payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return f"event: {event}\ndata: {payload}\n\n"
@@ -115,9 +115,9 @@ class KnowledgeViewSet(viewsets.ModelViewSet):
                 )
 
             elif knowledge_type == "csv":
-                # Convertir el contenido CSV a formato Markdown usando el servicio
+                # Convertir a Markdown las filas ya leídas al validar el CSV
                 markdown_content = ContentFormatterService.csv_to_markdown(
-                    validated_data["content"], validated_data["name"]
+                    serializer.get_csv_rows(), validated_data["name"]
                 )
                 knowledge_data["text"] = markdown_content
                 knowledge_data["description"] = (
@@ -129,10 +129,9 @@ class KnowledgeViewSet(viewsets.ModelViewSet):
                 knowledge_data["description"] = (
                     f"Web scraping de: {validated_data['url']}"
                 )
-                # Aquí podrías agregar lógica de scraping
-                knowledge_data["text"] = (
-                    f"Configuración de scraping - URL: {validated_data['url']}, Max depth: {validated_data.get('max_depth', 1)}, Max links: {validated_data.get('max_links', 1)}"
-                )
+                # Las páginas se descargan con el crawler al indexar el conocimiento
+                knowledge_data["max_depth"] = validated_data["max_depth"]
+                knowledge_data["max_links"] = validated_data["max_links"]
 
             # Crear el modelo
             knowledge = KnowledgeModel.objects.create(**knowledge_data)
@@ -179,19 +178,20 @@ class KnowledgeViewSet(viewsets.ModelViewSet):
                 instance.text = markdown_content
 
             elif knowledge_type == "csv" and "content" in validated_data:
-                # Convertir el contenido CSV a formato Markdown usando el servicio
+                # Convertir a Markdown las filas ya leídas al validar el CSV
                 markdown_content = ContentFormatterService.csv_to_markdown(
-                    validated_data["content"], validated_data.get("name", instance.name)
+                    serializer.get_csv_rows(), validated_data.get("name", instance.name)
                 )
                 instance.text = markdown_content
 
             elif knowledge_type == "web-scraping":
-                if "url" in validated_data:
-                    instance.url = validated_data["url"]
-                # Actualizar configuración de scraping
-                max_depth = validated_data.get("max_depth", 1)
-                max_links = validated_data.get("max_links", 1)
-                instance.text = f"Configuración de scraping - URL: {instance.url}, Max depth: {max_depth}, Max links: {max_links}"
+                # Actualizar configuración de scraping; si cambia se vuelve a rastrear
+                for field in ("url", "max_depth", "max_links"):
+                    if field in validated_data and (
+                        getattr(instance, field) != validated_data[field]
+                    ):
+                        setattr(instance, field, validated_data[field])
+                        instance.recreate = True
 
             instance.save()
 
@@ -245,6 +245,8 @@ class KnowledgeViewSet(viewsets.ModelViewSet):
         elif knowledge_type == "web-scraping":
             response_data["url"] = instance.url
             response_data["description"] = instance.description
+            response_data["max_depth"] = instance.max_depth
+            response_data["max_links"] = instance.max_links
 
         return Response(response_data)
 
@@ -1,5 +1,7 @@
 from agents.models import AgentModel
-from chats.models import ChatModel, ContentChatModel
+from chats.models import ChatModel
+from chats.transcript_writer import ChatTranscriptWriter
+from main.metrics import set_labels, timed
 
 
 class ChatService:
@@ -8,9 +10,39 @@ class ChatService:
 
     @staticmethod
     def new(agent_name: str) -> str:
-        agent: AgentModel = AgentModel.objects.get(name=agent_name)
-        return ChatModel.objects.create(agent=agent).pk
+        with timed("session_create"):
+            agent: AgentModel = AgentModel.objects.get(name=agent_name)
+            set_labels(agent=agent.id)
+            return ChatModel.objects.create(agent=agent).pk
 
-    def append_content(self, session_id: str, request: str, response: str) -> None:
-        chat: ChatModel = ChatModel.objects.get(session_id=session_id)
-        ContentChatModel.objects.create(chat=chat, request=request, response=response)
+    @staticmethod
+    async def anew(agent: AgentModel) -> str:
+        with timed("session_create", agent=agent.id):
+            chat: ChatModel = await ChatModel.objects.acreate(agent=agent)
+        return chat.pk
+
+    @staticmethod
+    def exists(session_id: str, agent: AgentModel) -> bool:
+        return ChatModel.objects.filter(session_id=session_id, agent=agent).exists()
+
+    @staticmethod
+    async def aexists(session_id: str, agent: AgentModel) -> bool:
+        return await ChatModel.objects.filter(
+            session_id=session_id, agent=agent
+        ).aexists()
+
+    @staticmethod
+    def append_content(session_id: str, request: str, response: str) -> None:
+        """Encola el turno; ChatTranscriptWriter lo persiste en lote."""
+        with timed("persist"):
+            ChatTranscriptWriter.append(session_id, request, response)
+
+    @staticmethod
+    def append_contents(turns) -> None:
+        """Persiste en un solo lote varios turnos (session_id, request, response)."""
+        ChatTranscriptWriter.extend(turns)
+
+    @staticmethod
+    async def aappend_content(session_id: str, request: str, response: str) -> None:
+        with timed("persist"):
+            ChatTranscriptWriter.append(session_id, request, response)
@@ -2,7 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from chats.models import ContentChatModel
-from chats.signals.content_chat_emit import NewChatTextSignal
+from chats.signals.content_chat_emit import NewChatTextSignal, transcript_flushed
 
 
 @receiver(post_save, sender=ContentChatModel)
@@ -14,3 +14,15 @@ def handler(sender, instance, created, **kwargs):
             session_id=instance.chat.session_id,
             timestamp=instance.created_at,
         )
+
+
+@receiver(transcript_flushed)
+def flushed_handler(sender, contents, **kwargs):
+    # bulk_create no emite post_save: se notifica cada turno persistido
+    for content in contents:
+        NewChatTextSignal.emit(
+            "content_chat",
+            message=content.request,
+            session_id=content.chat_id,
+            timestamp=content.created_at,
+        )
@@ -3,6 +3,10 @@ from django.dispatch import Signal
 # Definir un signal personalizado
 new_chat_text = Signal()
 
+# Se emite tras persistir un lote de turnos (ChatTranscriptWriter), con
+# `contents`: lista de ContentChatModel ya guardados
+transcript_flushed = Signal()
+
 
 class NewChatTextSignal:
     @staticmethod
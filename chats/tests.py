@@ -1,3 +1,144 @@
-from django.test import TestCase
+import json
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import IntegrityError, OperationalError
+from django.test import SimpleTestCase
+
+from chats.models import ContentChatModel
+from chats.transcript_writer import ChatTranscriptWriter
+
+SESSION_ID = "5f0c6d1e-8a34-4f4e-9d2b-0c1e2f3a4b5c"
+
+
+@patch.object(ChatTranscriptWriter, "get_spool", return_value=None)
+@patch.object(ChatTranscriptWriter, "_ensure_thread")
+@patch("chats.transcript_writer.close_old_connections")
+@patch("chats.transcript_writer.transaction.atomic")
+@patch("chats.transcript_writer.transcript_flushed")
+@patch.object(ContentChatModel.objects, "bulk_create")
+class ChatTranscriptWriterTestCase(SimpleTestCase):
+    """Tests de la escritura diferida de transcripciones."""
+
+    def tearDown(self):
+        with ChatTranscriptWriter._lock:
+            ChatTranscriptWriter._buffer.clear()
+
+    def test_append_buffers_without_writing(self, bulk_create, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "hola", "buenas")
+
+        self.assertEqual(ChatTranscriptWriter.pending(), 1)
+        bulk_create.assert_not_called()
+
+    def test_flush_writes_batch_and_notifies(self, bulk_create, flushed, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "hola", "buenas")
+        ChatTranscriptWriter.append(SESSION_ID, "chau", "adiós")
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 2)
+        self.assertEqual(bulk_create.call_count, 1)
+        self.assertEqual(ChatTranscriptWriter.pending(), 0)
+        contents = flushed.send_robust.call_args.kwargs["contents"]
+        self.assertEqual([c.request for c in contents], ["hola", "chau"])
+
+    def test_invalid_rows_are_dropped(self, bulk_create, flushed, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "ok", "ok")
+        ChatTranscriptWriter.append("no-existe", "mal", "mal")
+        bulk_create.side_effect = [IntegrityError("lote"), None, IntegrityError("fk")]
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 1)
+        self.assertEqual(ChatTranscriptWriter.pending(), 0)
+
+    def test_rows_are_requeued_when_database_is_down(self, bulk_create, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "hola", "buenas")
+        bulk_create.side_effect = OperationalError("sin conexión")
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 0)
+        self.assertEqual(ChatTranscriptWriter.pending(), 1)
+
+
+class FakeSpool:
+    """Lista de Redis en memoria con las operaciones que usa el spool."""
+
+    def __init__(self):
+        self.items = []
+
+    def rpush(self, key, *values):
+        self.items.extend(v.encode() for v in values)
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.items.insert(0, value.encode())
+
+    def lrange(self, key, start, end):
+        return self.items[start : end + 1]
+
+    def lrem(self, key, count, value):
+        value = value if isinstance(value, bytes) else value.encode()
+        if value in self.items:
+            self.items.remove(value)
+            return 1
+        return 0
+
+    def pipeline(self, transaction=True):
+        spool, results = self, []
+
+        class Pipeline:
+            def lrem(self, *args):
+                results.append(spool.lrem(*args))
+
+            def execute(self):
+                return results
+
+        return Pipeline()
+
+
+@patch.object(ChatTranscriptWriter, "_ensure_thread")
+@patch("chats.transcript_writer.close_old_connections")
+@patch("chats.transcript_writer.transaction.atomic")
+@patch("chats.transcript_writer.transcript_flushed")
+@patch.object(ContentChatModel.objects, "bulk_create")
+class ChatTranscriptSpoolTestCase(SimpleTestCase):
+    """Tests del spool en Redis de las transcripciones."""
+
+    def setUp(self):
+        self.spool = FakeSpool()
+        patcher = patch.object(
+            ChatTranscriptWriter, "get_spool", return_value=self.spool
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        with ChatTranscriptWriter._lock:
+            ChatTranscriptWriter._buffer.clear()
+
+    def test_written_turns_leave_the_spool(self, bulk_create, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "hola", "buenas")
+        self.assertEqual(len(self.spool.items), 1)
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 1)
+        self.assertEqual(self.spool.items, [])
+
+    def test_database_outage_spills_to_the_spool(self, bulk_create, *mocks):
+        ChatTranscriptWriter.append(SESSION_ID, "hola", "buenas")
+        ChatTranscriptWriter.append(SESSION_ID, "chau", "adiós")
+        bulk_create.side_effect = OperationalError("sin conexión")
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 0)
+        self.assertEqual(ChatTranscriptWriter.pending(), 0)
+        requests = [json.loads(raw)["request"] for raw in self.spool.items]
+        self.assertEqual(requests, ["hola", "chau"])
+
+        # Con la base de datos de vuelta, el siguiente flush los recupera
+        bulk_create.side_effect = None
+        self.assertEqual(ChatTranscriptWriter.flush(), 2)
+        self.assertEqual(self.spool.items, [])
+
+    def test_turns_of_a_dead_process_are_recovered(self, bulk_create, *mocks):
+        entry = {"id": "x", "ts": 1, "chat_id": SESSION_ID}
+        entry.update({"request": "hola", "response": "buenas"})
+        self.spool.rpush("spool", json.dumps(entry))
+
+        self.assertEqual(ChatTranscriptWriter.flush(), 1)
+        content = bulk_create.call_args[0][0][0]
+        self.assertEqual((content.request, content.response), ("hola", "buenas"))
+        self.assertEqual(self.spool.items, [])
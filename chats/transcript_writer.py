@@ -0,0 +1,405 @@
+"""
+Escritura diferida (write-behind) de las transcripciones de chat.
+
+Los turnos se acumulan en memoria y un hilo de fondo los persiste con
+`bulk_create` en lotes, en lugar de un INSERT (y toda la maquinaria de
+señales pre_save/post_save) por cada mensaje. Después de cada escritura se
+emite `transcript_flushed` para que el análisis de sentimiento y el resto de
+los consumidores procesen los turnos persistidos.
+
+Cada turno se anota además en un spool de Redis al encolarse. Un turno que
+un proceso no llegó a escribir (SIGKILL, OOM, despliegue, base de datos
+caída) queda en el spool y lo escribe cualquier otro proceso pasado
+`CHAT_TRANSCRIPT_SPOOL_GRACE`.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import redis
+from django.db import (
+    DatabaseError,
+    IntegrityError,
+    close_old_connections,
+    transaction,
+)
+
+from chats.models import ContentChatModel
+from chats.signals.content_chat_emit import transcript_flushed
+from main.settings import (
+    CHAT_TRANSCRIPT_BATCH_SIZE,
+    CHAT_TRANSCRIPT_FLUSH_INTERVAL,
+    CHAT_TRANSCRIPT_MAX_BUFFER,
+    CHAT_TRANSCRIPT_SPOOL_GRACE,
+    CHAT_TRANSCRIPT_SPOOL_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+SPOOL_RETRY_DELAY = 30
+
+
+@dataclass(eq=False)
+class _Turn:
+    content: ContentChatModel
+    # Entrada serializada del spool; `spooled` indica si sigue en Redis
+    raw: str
+    spooled: bool = False
+
+
+class ChatTranscriptWriter:
+    """
+    Buffer por proceso de turnos de chat pendientes de persistir.
+
+    El buffer se vacía cuando alcanza `batch_size` turnos o cada
+    `flush_interval` segundos, y también al terminar el proceso. Si el lote
+    falla se reintenta fila a fila: las filas inválidas (p. ej. una sesión
+    inexistente) se descartan y, si la base de datos no está disponible, los
+    turnos vuelven al spool para el siguiente intento.
+
+    Antes de escribir un turno se saca del spool (`LREM`): sólo lo escribe
+    quien lo retira, así que un turno recuperado por otro proceso no se
+    duplica. Sin Redis el buffer sólo vive en memoria, limitado a
+    `max_buffer` turnos.
+    """
+
+    batch_size = CHAT_TRANSCRIPT_BATCH_SIZE
+    flush_interval = CHAT_TRANSCRIPT_FLUSH_INTERVAL
+    max_buffer = CHAT_TRANSCRIPT_MAX_BUFFER
+    spool_key = "chats:transcripts:spool"
+    spool_grace = CHAT_TRANSCRIPT_SPOOL_GRACE
+
+    _buffer: list = []
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+    _spool = None
+    # Tras un error de Redis no se vuelve a intentar hasta este instante
+    _spool_retry_at = 0.0
+
+    @classmethod
+    def get_spool(cls):
+        """
+        Cliente Redis del spool.
+
+        None si `CHAT_TRANSCRIPT_SPOOL_URL` está vacío o Redis falló hace
+        menos de `SPOOL_RETRY_DELAY` segundos: un Redis caído no debe sumar
+        un timeout a cada turno.
+        """
+        if not CHAT_TRANSCRIPT_SPOOL_URL or time.monotonic() < cls._spool_retry_at:
+            return None
+        if cls._spool is None:
+            cls._spool = redis.Redis.from_url(
+                CHAT_TRANSCRIPT_SPOOL_URL, socket_timeout=1, socket_connect_timeout=1
+            )
+        return cls._spool
+
+    @classmethod
+    def append(cls, session_id: str, request: str, response: str) -> None:
+        """Encola un turno de chat. No accede a la base de datos."""
+        turns = cls._new_turns([(session_id, request, response)])
+        with cls._lock:
+            cls._buffer.extend(turns)
+            cls._trim()
+            full = len(cls._buffer) >= cls.batch_size
+
+        cls._ensure_thread()
+        if full:
+            cls._wakeup.set()
+
+    @classmethod
+    def extend(cls, turns) -> None:
+        """
+        Encola varios turnos y solicita su escritura inmediata en un solo lote.
+
+        Args:
+            turns: Iterable de tuplas (session_id, request, response)
+        """
+        turns = cls._new_turns(turns)
+        if not turns:
+            return
+        with cls._lock:
+            cls._buffer.extend(turns)
+            cls._trim()
+
+        cls._ensure_thread()
+        cls._wakeup.set()
+
+    @classmethod
+    def pending(cls) -> int:
+        """Número de turnos pendientes de persistir en este proceso."""
+        with cls._lock:
+            return len(cls._buffer)
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Persiste los turnos pendientes y los abandonados en el spool.
+
+        Returns:
+            int: Número de turnos escritos
+        """
+        with cls._flush_lock:
+            with cls._lock:
+                batch = cls._buffer[:]
+                cls._buffer.clear()
+            batch = cls._claim(batch) + cls._recover()
+            if not batch:
+                return 0
+            written = cls._write(batch)
+
+        if written:
+            for receiver, result in transcript_flushed.send_robust(
+                sender=ContentChatModel, contents=written
+            ):
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"Error en {receiver.__name__} tras el flush: {result}"
+                    )
+        return len(written)
+
+    @classmethod
+    def _new_turns(cls, turns) -> list:
+        """Crea los turnos y los anota en el spool con un solo RPUSH."""
+        new_turns = []
+        for session_id, request, response in turns:
+            entry = {
+                "id": uuid.uuid4().hex,
+                "ts": time.time(),
+                "chat_id": str(session_id),
+                "request": request,
+                "response": response,
+            }
+            new_turns.append(
+                _Turn(
+                    ContentChatModel(
+                        chat_id=session_id, request=request, response=response
+                    ),
+                    json.dumps(entry, ensure_ascii=False),
+                )
+            )
+
+        spool = cls.get_spool()
+        if spool is not None and new_turns:
+            try:
+                spool.rpush(cls.spool_key, *(turn.raw for turn in new_turns))
+            except redis.RedisError as e:
+                cls._spool_failed(e)
+            else:
+                for turn in new_turns:
+                    turn.spooled = True
+        return new_turns
+
+    @classmethod
+    def _claim(cls, batch: list) -> list:
+        """
+        Retira del spool los turnos del lote antes de escribirlos.
+
+        Los que ya no están los recuperó otro proceso y se omiten. Si Redis no
+        responde se escriben igualmente (pueden quedar duplicados).
+        """
+        spooled = [turn for turn in batch if turn.spooled]
+        spool = cls.get_spool()
+        if not spooled or spool is None:
+            return batch
+        try:
+            pipe = spool.pipeline(transaction=False)
+            for turn in spooled:
+                pipe.lrem(cls.spool_key, 1, turn.raw)
+            removed = pipe.execute()
+        except redis.RedisError as e:
+            cls._spool_failed(e)
+            removed = [1] * len(spooled)
+
+        skipped = {id(turn) for turn, count in zip(spooled, removed) if not count}
+        for turn in spooled:
+            turn.spooled = False
+        return [turn for turn in batch if id(turn) not in skipped]
+
+    @classmethod
+    def _recover(cls) -> list:
+        """Retira del spool los turnos más antiguos que `spool_grace`."""
+        spool = cls.get_spool()
+        if spool is None:
+            return []
+        try:
+            # El spool es FIFO: los turnos abandonados están al principio
+            raws = spool.lrange(cls.spool_key, 0, cls.batch_size - 1)
+            deadline = time.time() - cls.spool_grace
+            orphans, invalid = [], []
+            for raw in raws:
+                try:
+                    entry = json.loads(raw)
+                    abandoned = entry["ts"] < deadline
+                except (ValueError, KeyError, TypeError):
+                    invalid.append(raw)
+                    continue
+                if abandoned:
+                    orphans.append((raw, entry))
+            if not orphans and not invalid:
+                return []
+            pipe = spool.pipeline(transaction=False)
+            for raw in [raw for raw, _ in orphans] + invalid:
+                pipe.lrem(cls.spool_key, 1, raw)
+            removed = pipe.execute()
+        except redis.RedisError as e:
+            cls._spool_failed(e)
+            return []
+        if invalid:
+            logger.error(f"Se descartan {len(invalid)} entradas inválidas del spool")
+
+        recovered = [
+            _Turn(
+                ContentChatModel(
+                    chat_id=entry["chat_id"],
+                    request=entry["request"],
+                    response=entry["response"],
+                ),
+                raw.decode() if isinstance(raw, bytes) else raw,
+            )
+            for (raw, entry), count in zip(orphans, removed)
+            if count
+        ]
+        if recovered:
+            logger.info(f"Recuperados {len(recovered)} turnos del spool")
+        return recovered
+
+    @classmethod
+    def _write(cls, batch: list) -> list:
+        """Escribe un lote y devuelve los turnos efectivamente persistidos."""
+        close_old_connections()
+        contents = [turn.content for turn in batch]
+        try:
+            with transaction.atomic():
+                ContentChatModel.objects.bulk_create(
+                    contents, batch_size=cls.batch_size
+                )
+            return contents
+        except DatabaseError as e:
+            logger.warning(f"Falló la escritura en lote de transcripciones: {e}")
+
+        written = []
+        for index, turn in enumerate(batch):
+            content = turn.content
+            # Un lote revertido puede haber asignado pk a algunas filas
+            content.pk = None
+            try:
+                ContentChatModel.objects.bulk_create([content])
+                written.append(content)
+            except IntegrityError as e:
+                logger.error(f"Se descarta un turno del chat {content.chat_id}: {e}")
+            except DatabaseError as e:
+                logger.error(f"Base de datos no disponible, se reintentará: {e}")
+                cls._spill(batch[index:])
+                break
+        return written
+
+    @classmethod
+    def _spill(cls, turns: list) -> None:
+        """
+        Devuelve los turnos al principio del spool, o al buffer sin Redis.
+
+        Se marcan como abandonados (`ts` 0) para que el siguiente flush de
+        cualquier proceso los reintente sin esperar `spool_grace`.
+        """
+        spool = cls.get_spool()
+        if spool is not None:
+            raws = []
+            for turn in turns:
+                entry = json.loads(turn.raw)
+                entry["ts"] = 0
+                raws.append(json.dumps(entry, ensure_ascii=False))
+            try:
+                # LPUSH invierte el orden: se empujan del último al primero
+                spool.lpush(cls.spool_key, *reversed(raws))
+                return
+            except redis.RedisError as e:
+                cls._spool_failed(e)
+        cls._requeue(turns)
+
+    @classmethod
+    def _spool_failed(cls, error) -> None:
+        logger.warning(f"Spool de transcripciones no disponible: {error}")
+        cls._spool_retry_at = time.monotonic() + SPOOL_RETRY_DELAY
+
+    @classmethod
+    def _requeue(cls, turns: list) -> None:
+        with cls._lock:
+            cls._buffer[:0] = turns
+            cls._trim()
+
+    @classmethod
+    def _trim(cls) -> None:
+        """Saca del buffer los turnos más antiguos por encima de `max_buffer` (con lock)."""
+        overflow = len(cls._buffer) - cls.max_buffer
+        if overflow <= 0:
+            return
+        lost = sum(not turn.spooled for turn in cls._buffer[:overflow])
+        del cls._buffer[:overflow]
+        if lost:
+            logger.error(f"Buffer de transcripciones lleno: se descartan {lost} turnos")
+        if overflow > lost:
+            logger.warning(
+                f"Buffer de transcripciones lleno: {overflow - lost} turnos quedan "
+                f"en el spool"
+            )
+
+    @classmethod
+    def _ensure_thread(cls) -> None:
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(
+                    target=cls._run, name="chat-transcript-writer", daemon=True
+                )
+                cls._thread.start()
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            cls._wakeup.wait(cls.flush_interval)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            except Exception as e:
+                logger.error(f"Error al persistir transcripciones: {e}")
+
+    @classmethod
+    def _shutdown(cls) -> None:
+        # Un proceso que no encoló turnos (migraciones, comandos) no toca Redis
+        if cls._thread is None:
+            return
+        try:
+            cls.flush()
+        except Exception as e:
+            logger.error(f"No se pudieron persistir los turnos al salir: {e}")
+        with cls._lock:
+            lost = sum(not turn.spooled for turn in cls._buffer)
+        if lost:
+            logger.error(f"Se pierden {lost} turnos que no están en el spool")
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # El hijo no hereda el hilo de escritura y no debe duplicar los turnos
+        # pendientes del proceso padre
+        cls._buffer = []
+        cls._lock = threading.Lock()
+        cls._flush_lock = threading.Lock()
+        cls._wakeup = threading.Event()
+        cls._thread = None
+        cls._spool = None
+        cls._spool_retry_at = 0.0
+
+
+atexit.register(ChatTranscriptWriter._shutdown)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=ChatTranscriptWriter._after_fork)
@@ -52,6 +52,7 @@ class DocumentModelAdmin(admin.ModelAdmin):
         "processed_at",
         "file_info_display",
         "file_preview",
+        "indexing_progress_display",
     ]
 
     fieldsets = (
@@ -70,7 +71,17 @@ class DocumentModelAdmin(admin.ModelAdmin):
                 "description": "El tipo de documento se detecta automáticamente. Solo especifique uno si desea sobreescribir la detección automática.",
             },
         ),
-        ("Estado", {"fields": ("is_active", "is_processed", "processed_at")}),
+        (
+            "Estado",
+            {
+                "fields": (
+                    "is_active",
+                    "is_processed",
+                    "processed_at",
+                    "indexing_progress_display",
+                )
+            },
+        ),
         (
             "Metadatos (Solo lectura)",
             {
@@ -100,6 +111,14 @@ class DocumentModelAdmin(admin.ModelAdmin):
     file_size_display.short_description = "Tamaño"
     file_size_display.admin_order_field = "file_size"
 
+    def indexing_progress_display(self, obj):
+        """Páginas indexadas del PDF respecto al total"""
+        if not obj.page_count:
+            return "-"
+        return f"{obj.indexed_pages} / {obj.page_count} páginas"
+
+    indexing_progress_display.short_description = "Progreso de indexación"
+
     def file_link(self, obj):
         """Crea un enlace para descargar el archivo"""
         if obj.file:
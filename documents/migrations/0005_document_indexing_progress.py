@@ -0,0 +1,40 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0004_alter_documentmodel_document_type_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentmodel",
+            name="indexed_pages",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="Páginas ya indexadas del PDF"
+            ),
+        ),
+        migrations.AddField(
+            model_name="documentmodel",
+            name="indexed_source_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Huella del archivo al que corresponde el progreso de indexación",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="documentmodel",
+            name="page_count",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Número de páginas del PDF",
+                null=True,
+            ),
+        ),
+    ]
@@ -155,6 +155,20 @@ class DocumentModel(AppModel):
         blank=True, null=True, help_text="Fecha y hora en que se procesó el documento"
     )
 
+    # Progreso de la indexación por páginas (PDF)
+    page_count = models.PositiveIntegerField(
+        blank=True, null=True, editable=False, help_text="Número de páginas del PDF"
+    )
+    indexed_pages = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Páginas ya indexadas del PDF"
+    )
+    indexed_source_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="Huella del archivo al que corresponde el progreso de indexación",
+    )
+
     class Meta:
         verbose_name = "Documento"
         verbose_name_plural = "Documentos"
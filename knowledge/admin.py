@@ -45,7 +45,7 @@ class KnowledgeAdmin(admin.ModelAdmin):
         (
             "🌐 Contenido Web",
             {
-                "fields": ("url",),
+                "fields": ("url", "max_depth", "max_links"),
                 "description": "Para contenido web o scraping",
             },
         ),
@@ -10,4 +10,5 @@ class KnowledgeConfig(AppConfig):
         Importar signals cuando la aplicación está lista.
         Esto asegura que los signals estén correctamente registrados.
         """
+        import knowledge.checks
         import knowledge.signals
@@ -0,0 +1,32 @@
+"""Comprobaciones de configuración de la app knowledge."""
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Backends cuya caché vive en cada proceso: `cache.add` no es un lock
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_index_lock_cache(app_configs, **kwargs):
+    """
+    El lock de ingesta por tenant de `index_agent_knowledge` usa
+    `cache.add`: sin una caché compartida (Redis) cada worker tiene la suya
+    y dos ingestas del mismo tenant pueden ejecutarse a la vez.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "La caché por defecto no es compartida entre procesos.",
+            hint=(
+                "El lock de indexación por tenant (knowledge.tasks) necesita "
+                "una caché compartida: configura CACHES con Redis (REDIS_URL)."
+            ),
+            id="knowledge.W001",
+        )
+    ]
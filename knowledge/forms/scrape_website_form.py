@@ -6,7 +6,9 @@ from django import forms
 from django.utils.text import slugify
 
 from knowledge.models import KnowledgeModel
+from knowledge.services.web_crawler_service import WebCrawlerService
 from knowledge.services.web_scraper_service import WebScraperService
+from main.settings import CRAWLER_MAX_DEPTH, CRAWLER_MAX_LINKS
 
 
 class ScrapeWebsiteForm(forms.Form):
@@ -37,6 +39,24 @@ class ScrapeWebsiteForm(forms.Form):
         ),
     )
 
+    max_depth = forms.IntegerField(
+        label="Profundidad máxima",
+        initial=1,
+        min_value=1,
+        max_value=CRAWLER_MAX_DEPTH,
+        help_text="Niveles de enlaces a seguir desde la URL (1 = sólo la página indicada)",
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+
+    max_links = forms.IntegerField(
+        label="Páginas máximas",
+        initial=1,
+        min_value=1,
+        max_value=CRAWLER_MAX_LINKS,
+        help_text="Número máximo de páginas del sitio a extraer",
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+
     description = forms.CharField(
         label="Descripción",
         required=False,
@@ -89,14 +109,26 @@ class ScrapeWebsiteForm(forms.Form):
 
             tenant = TenantModel.objects.get(pk=tenant_id)
 
-        # Usar el servicio de scraping para obtener el contenido
-        scraped_content = WebScraperService.scrape_website(url)
+        max_depth = self.cleaned_data["max_depth"]
+        max_links = self.cleaned_data["max_links"]
+
+        # Descargar las páginas en paralelo y convertir cada una a markdown
+        crawler = WebCrawlerService(url, max_depth=max_depth, max_links=max_links)
+        try:
+            scraped_content = "\n\n".join(
+                WebScraperService.html_to_markdown(page.html, page.url)
+                for page in crawler.iter_pages()
+            )
+        except Exception as e:
+            raise Exception(f"Error al scrapear la URL {url}: {str(e)}")
 
         # Crear el modelo de conocimiento
         knowledge = KnowledgeModel.objects.create(
             name=name,
             description=description,
             url=url,
+            max_depth=max_depth,
+            max_links=max_links,
             text=scraped_content,
             category="website",  # Categoría específica para sitios web
             tenant=tenant,
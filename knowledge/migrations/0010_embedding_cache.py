@@ -0,0 +1,41 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0009_remove_knowledgemodel_path_knowledgemodel_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmbeddingCacheModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("embedder_id", models.CharField(max_length=255)),
+                ("dimensions", models.PositiveIntegerField()),
+                ("content_hash", models.CharField(max_length=64)),
+                ("embedding", models.BinaryField()),
+                ("last_used_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="embeddingcachemodel",
+            constraint=models.UniqueConstraint(
+                fields=("embedder_id", "dimensions", "content_hash"),
+                name="unique_embedding_cache_key",
+            ),
+        ),
+    ]
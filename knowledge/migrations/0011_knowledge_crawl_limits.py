@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:44
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0010_embedding_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knowledgemodel",
+            name="max_depth",
+            field=models.PositiveSmallIntegerField(
+                default=3,
+                help_text="Profundidad máxima del crawl de la URL (1 = sólo la página)",
+                validators=[django.core.validators.MinValueValidator(1)],
+            ),
+        ),
+        migrations.AddField(
+            model_name="knowledgemodel",
+            name="max_links",
+            field=models.PositiveIntegerField(
+                default=10,
+                help_text="Número máximo de páginas a extraer del sitio",
+                validators=[django.core.validators.MinValueValidator(1)],
+            ),
+        ),
+    ]
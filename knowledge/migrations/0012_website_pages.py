@@ -0,0 +1,49 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0011_knowledge_crawl_limits"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebsitePageModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("url", models.URLField(max_length=2048)),
+                ("etag", models.CharField(blank=True, max_length=255)),
+                ("last_modified", models.CharField(blank=True, max_length=64)),
+                ("simhash", models.CharField(max_length=16)),
+                ("checked_at", models.DateTimeField()),
+                (
+                    "knowledge",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="website_pages",
+                        to="knowledge.knowledgemodel",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="websitepagemodel",
+            constraint=models.UniqueConstraint(
+                fields=("knowledge", "url"), name="unique_website_page_url"
+            ),
+        ),
+    ]
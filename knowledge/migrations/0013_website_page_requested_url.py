@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0012_website_pages"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="websitepagemodel",
+            name="requested_url",
+            field=models.URLField(blank=True, max_length=2048),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.core.validators import MinValueValidator
+
 from documents.models import DocumentModel
 from main.models import AppModel, models
 
@@ -13,6 +15,16 @@ class KnowledgeModel(AppModel):
 
     name = models.CharField(max_length=255, unique=True)
     url = models.URLField(blank=True)
+    max_depth = models.PositiveSmallIntegerField(
+        default=3,
+        validators=[MinValueValidator(1)],
+        help_text="Profundidad máxima del crawl de la URL (1 = sólo la página)",
+    )
+    max_links = models.PositiveIntegerField(
+        default=10,
+        validators=[MinValueValidator(1)],
+        help_text="Número máximo de páginas a extraer del sitio",
+    )
     document = models.ForeignKey(
         DocumentModel,
         on_delete=models.SET_NULL,
@@ -40,3 +52,62 @@ class KnowledgeModel(AppModel):
 
     def __str__(self):
         return self.name
+
+
+class EmbeddingCacheModel(AppModel):
+    """
+    Embedding persistido de un fragmento de texto.
+
+    Se identifica por el embedder (`embedder_id` y `dimensions`) y el sha256
+    del texto, así que se reutiliza entre agentes, tablas y reindexaciones.
+    """
+
+    embedder_id = models.CharField(max_length=255)
+    dimensions = models.PositiveIntegerField()
+    content_hash = models.CharField(max_length=64)
+    # Embedding como float32 (numpy.ndarray.tobytes)
+    embedding = models.BinaryField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["embedder_id", "dimensions", "content_hash"],
+                name="unique_embedding_cache_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.embedder_id}/{self.dimensions}: {self.content_hash[:12]}"
+
+
+class WebsitePageModel(AppModel):
+    """
+    Página de un conocimiento de categoría website vista por el refresco.
+
+    Guarda los validadores HTTP de la última respuesta, para pedirla de forma
+    condicional, y la huella simhash de su texto visible.
+    """
+
+    knowledge = models.ForeignKey(
+        KnowledgeModel, on_delete=models.CASCADE, related_name="website_pages"
+    )
+    url = models.URLField(max_length=2048)
+    # URL pedida antes de seguir redirecciones (la del conocimiento en la
+    # página inicial)
+    requested_url = models.URLField(max_length=2048, blank=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    # Simhash de 64 bits en hexadecimal
+    simhash = models.CharField(max_length=16)
+    checked_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["knowledge", "url"], name="unique_website_page_url"
+            )
+        ]
+
+    def __str__(self):
+        return self.url
@@ -5,119 +5,296 @@ Convierte datos JSON y CSV a formato Markdown estructurado.
 
 import csv
 import io
+import itertools
 import json
+from collections.abc import Iterator
+
+from main.settings import KNOWLEDGE_JSON_CHUNK_SIZE, KNOWLEDGE_JSON_INCLUDE_RAW
+
+# Marca de lista vacía al leer el primer elemento de un iterador
+_MISSING = object()
 
 
 class ContentFormatterService:
     """Servicio para formatear contenido en diferentes formatos a Markdown."""
 
     @staticmethod
-    def json_to_markdown(json_data, title):
+    def json_to_markdown(json_data, title, include_raw=None):
         """Convertir datos JSON a formato Markdown."""
-        markdown = f"# {title}\n\n"
+        output = io.StringIO()
+        ContentFormatterService.write_json_markdown(
+            json_data, title, output, include_raw=include_raw
+        )
+        return output.getvalue()
+
+    @staticmethod
+    def write_json_markdown(json_source, title, output, include_raw=None):
+        """
+        Escribir el Markdown de un JSON en `output` sección a sección.
+
+        Args:
+            json_source: Datos ya parseados o archivo de texto con el JSON; si
+                el documento es un array se parsea elemento a elemento
+            title: Título del documento
+            output: Destino con método `write` (StringIO, archivo, storage)
+            include_raw: Añadir una copia del JSON original al final. Por
+                defecto `KNOWLEDGE_JSON_INCLUDE_RAW` (desactivado)
+
+        Returns:
+            dict: `items` (elementos procesados)
+        """
+        if include_raw is None:
+            include_raw = KNOWLEDGE_JSON_INCLUDE_RAW
+        if hasattr(json_source, "read"):
+            json_source = ContentFormatterService.parse_json_stream(json_source)
+
+        # La copia original sólo se retiene en memoria si se pide
+        raw_items = None
+        if include_raw and isinstance(json_source, Iterator):
+            raw_items = []
+            json_source = ContentFormatterService._collect(json_source, raw_items)
+
+        stats = {"items": 0}
+        for part in ContentFormatterService.iter_json_markdown(
+            json_source, title, stats
+        ):
+            output.write(part)
+
+        if include_raw:
+            raw_data = raw_items if raw_items is not None else json_source
+            output.write(
+                f"\n---\n\n### Datos originales en JSON:\n\n```json\n"
+                f"{json.dumps(raw_data, indent=2, ensure_ascii=False)}\n```\n"
+            )
+        return stats
+
+    @staticmethod
+    def _collect(items, collected):
+        for item in items:
+            collected.append(item)
+            yield item
 
-        if isinstance(json_data, list):
-            if json_data and isinstance(json_data[0], dict):
+    @staticmethod
+    def iter_json_markdown(json_data, title, stats=None):
+        """
+        Generar el Markdown de datos JSON por partes.
+
+        Args:
+            json_data: Valor JSON; las listas pueden ser cualquier iterador
+                (p. ej. el de `parse_json_stream`)
+            title: Título del documento
+            stats: Dict opcional donde se deja `items`
+        """
+        stats = stats if stats is not None else {}
+        stats["items"] = 0
+        yield f"# {title}\n\n"
+
+        if isinstance(json_data, dict):
+            # Si es un objeto, crear sección estructurada con ID
+            stats["items"] = 1
+            fields = "".join(f"- {key}: {value}\n" for key, value in json_data.items())
+            yield f"### ID:1\n{fields}\n"
+        elif isinstance(json_data, (list, Iterator)):
+            items = iter(json_data)
+            first = next(items, _MISSING)
+            if first is not _MISSING:
+                items = itertools.chain([first], items)
+
+            if isinstance(first, dict):
                 # Si es una lista de objetos, crear formato con IDs autogenerados
-                markdown += ContentFormatterService._json_list_to_formatted_sections(
-                    json_data
-                )
+                for i, item in enumerate(items, 1):
+                    stats["items"] = i
+                    if isinstance(item, dict):
+                        yield ContentFormatterService._json_object_section(item, i)
             else:
                 # Si es una lista simple, crear lista con viñetas
-                markdown += "### Lista de elementos:\n\n"
-                for i, item in enumerate(json_data, 1):
-                    markdown += f"{i}. {item}\n"
-        elif isinstance(json_data, dict):
-            # Si es un objeto, crear sección estructurada con ID
-            markdown += f"### ID:1\n"
-            for key, value in json_data.items():
-                markdown += f"- {key}: {value}\n"
-            markdown += "\n"
+                yield "### Lista de elementos:\n\n"
+                if first is not _MISSING:
+                    for i, item in enumerate(items, 1):
+                        stats["items"] = i
+                        yield f"{i}. {item}\n"
         else:
             # Si es un valor simple
-            markdown += f"**Valor:** {json_data}\n"
-
-        markdown += f"\n---\n\n### Datos originales en JSON:\n\n```json\n{json.dumps(json_data, indent=2, ensure_ascii=False)}\n```\n"
-
-        return markdown
+            stats["items"] = 1
+            yield f"**Valor:** {json_data}\n"
 
     @staticmethod
-    def _json_list_to_formatted_sections(json_list):
-        """Convertir lista de objetos JSON a formato con IDs autogenerados."""
-        markdown = ""
-
-        for i, item in enumerate(json_list, 1):
-            if isinstance(item, dict):
-                # Buscar si el objeto ya tiene un campo 'id' o 'ID'
-                item_id = item.get("id") or item.get("ID") or i
+    def parse_json_stream(stream, chunk_size=None):
+        """
+        Parsear un JSON desde un archivo de texto.
+
+        Si el documento es un array devuelve un iterador que lee y parsea sus
+        elementos de a uno; cualquier otro valor se parsea completo.
+        """
+        chunk_size = chunk_size or KNOWLEDGE_JSON_CHUNK_SIZE
+        buffer = ""
+        while True:
+            chunk = stream.read(chunk_size)
+            buffer = (buffer + chunk).lstrip()
+            if buffer or not chunk:
+                break
+        if not buffer.startswith("["):
+            return json.loads(buffer + stream.read())
+        return ContentFormatterService._iter_json_array(stream, buffer[1:], chunk_size)
 
-                markdown += f"### ID:{item_id}\n"
+    @staticmethod
+    def _iter_json_array(stream, buffer, chunk_size):
+        """Elementos de un array JSON cuyo '[' ya se consumió."""
+        decoder = json.JSONDecoder()
+        eof = False
+        # "first": tras '['; "value": tras ','; "next": tras un elemento
+        expect = "first"
+        while True:
+            buffer = buffer.lstrip()
+            while not buffer and not eof:
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer = chunk.lstrip()
+            if not buffer:
+                raise json.JSONDecodeError("Array JSON sin cerrar", buffer, 0)
+
+            if expect != "value" and buffer[0] == "]":
+                rest = buffer[1:] + stream.read()
+                if rest.strip():
+                    raise json.JSONDecodeError(
+                        "Datos adicionales tras el array", rest, 0
+                    )
+                return
+            if expect == "next":
+                if buffer[0] != ",":
+                    raise json.JSONDecodeError("Se esperaba ',' o ']'", buffer, 0)
+                buffer = buffer[1:]
+                expect = "value"
+                continue
+
+            # Decodificar el siguiente elemento, leyendo más si está incompleto.
+            # Un número cortado por el bloque se decodifica igual ("1." -> 1):
+            # sólo se acepta el elemento cuando ya se ve el ',' o ']' que lo
+            # cierra
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                    rest = buffer[end:].lstrip()
+                    if eof or (rest and rest[0] in ",]"):
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                # Leer al menos lo que ya hay en el buffer mantiene el coste lineal
+                chunk = stream.read(max(chunk_size, len(buffer)))
+                eof = not chunk
+                buffer += chunk
+
+            yield item
+            buffer = buffer[end:]
+            expect = "next"
 
-                # Agregar cada campo como item de lista
-                for key, value in item.items():
-                    # Omitir el campo id/ID si ya lo usamos
-                    if key.lower() != "id":
-                        markdown += f"- {key}: {value}\n"
+    @staticmethod
+    def _json_object_section(item, index):
+        """Sección Markdown de un objeto JSON de una lista."""
+        # Buscar si el objeto ya tiene un campo 'id' o 'ID'
+        item_id = item.get("id") or item.get("ID") or index
 
-                markdown += "\n"
+        # Agregar cada campo como item de lista, omitiendo el id/ID ya usado
+        fields = "".join(
+            f"- {key}: {value}\n" for key, value in item.items() if key.lower() != "id"
+        )
+        return f"### ID:{item_id}\n{fields}\n"
 
-        return markdown
+    @staticmethod
+    def _json_list_to_formatted_sections(json_list):
+        """Convertir lista de objetos JSON a formato con IDs autogenerados."""
+        return "".join(
+            ContentFormatterService._json_object_section(item, i)
+            for i, item in enumerate(json_list, 1)
+            if isinstance(item, dict)
+        )
 
     @staticmethod
     def csv_to_markdown(csv_content, title):
-        """Convertir contenido CSV a formato Markdown."""
-        markdown = f"# {title}\n\n"
-
+        """Convertir contenido CSV (texto o filas ya parseadas) a formato Markdown."""
+        output = io.StringIO()
         try:
-            # Parsear el CSV
-            csv_file = io.StringIO(csv_content)
-            reader = csv.reader(csv_file)
-            rows = list(reader)
-
-            if not rows:
-                return markdown + "No hay datos para mostrar.\n"
-
-            headers = rows[0]
-            data_rows = rows[1:]
-
-            # Crear formato con IDs autogenerados para cada fila
-            for i, row in enumerate(data_rows, 1):
-                # Buscar si hay una columna 'id' o 'ID' en los headers
-                id_value = i  # Por defecto usar el índice
-
-                # Verificar si existe columna ID
-                id_column_index = None
-                for idx, header in enumerate(headers):
-                    if header.lower() == "id":
-                        id_column_index = idx
-                        break
-
-                if id_column_index is not None and len(row) > id_column_index:
-                    id_value = row[id_column_index] or i
-
-                markdown += f"### ID:{id_value}\n"
-
-                # Agregar cada campo como item de lista
-                for j, (header, cell) in enumerate(zip(headers, row)):
-                    # Omitir la columna ID si ya la usamos
-                    if j != id_column_index:
-                        # Asegurar que tenemos valor para la celda
-                        cell_value = cell if j < len(row) else ""
-                        markdown += f"- {header}: {cell_value}\n"
-
-                markdown += "\n"
-
-            # Agregar estadísticas
-            markdown += f"### Estadísticas\n\n"
-            markdown += f"- **Total de filas:** {len(data_rows)}\n"
-            markdown += f"- **Total de columnas:** {len(headers)}\n"
-            markdown += f"- **Columnas:** {', '.join(headers)}\n\n"
-
+            ContentFormatterService.write_csv_markdown(csv_content, title, output)
         except Exception as e:
+            markdown = f"# {title}\n\n"
             markdown += f"Error al procesar CSV: {str(e)}\n\n"
-            markdown += f"### Contenido original:\n\n```\n{csv_content}\n```\n"
+            if isinstance(csv_content, str):
+                markdown += f"### Contenido original:\n\n```\n{csv_content}\n```\n"
+            return markdown
+        return output.getvalue()
 
-        return markdown
+    @staticmethod
+    def write_csv_markdown(csv_source, title, output):
+        """
+        Escribir el Markdown de un CSV en `output` leyéndolo fila a fila.
+
+        Args:
+            csv_source: Contenido CSV (str), archivo de texto abierto con
+                `newline=""` o filas ya parseadas (encabezado incluido)
+            title: Título del documento
+            output: Destino con método `write` (StringIO, archivo, storage)
+
+        Returns:
+            dict: `rows` (filas de datos) y `columns` (columnas del encabezado)
+        """
+        if isinstance(csv_source, str):
+            csv_source = io.StringIO(csv_source)
+        rows = csv.reader(csv_source) if hasattr(csv_source, "read") else csv_source
+        stats = {"rows": 0, "columns": 0}
+        for part in ContentFormatterService.iter_csv_markdown(rows, title, stats):
+            output.write(part)
+        return stats
+
+    @staticmethod
+    def iter_csv_markdown(rows, title, stats=None):
+        """
+        Generar el Markdown de filas CSV por partes, sin materializarlas.
+
+        Args:
+            rows: Iterable de filas (listas de celdas); la primera es el encabezado
+            title: Título del documento
+            stats: Dict opcional donde se dejan `rows` y `columns`
+        """
+        stats = stats if stats is not None else {}
+        yield f"# {title}\n\n"
+
+        rows = iter(rows)
+        headers = next(rows, None)
+        if headers is None:
+            yield "No hay datos para mostrar.\n"
+            return
+
+        # La columna 'id' o 'ID' se busca una sola vez
+        id_column_index = next(
+            (idx for idx, header in enumerate(headers) if header.lower() == "id"),
+            None,
+        )
+        stats["columns"] = len(headers)
+        stats["rows"] = 0
+
+        # Crear formato con IDs autogenerados para cada fila
+        for i, row in enumerate(rows, 1):
+            stats["rows"] = i
+            id_value = i  # Por defecto usar el índice
+            if id_column_index is not None and len(row) > id_column_index:
+                id_value = row[id_column_index] or i
+
+            # Cada campo como item de lista, omitiendo la columna ID
+            fields = "".join(
+                f"- {header}: {cell}\n"
+                for j, (header, cell) in enumerate(zip(headers, row))
+                if j != id_column_index
+            )
+            yield f"### ID:{id_value}\n{fields}\n"
+
+        # Agregar estadísticas
+        yield (
+            f"### Estadísticas\n\n"
+            f"- **Total de filas:** {stats['rows']}\n"
+            f"- **Total de columnas:** {len(headers)}\n"
+            f"- **Columnas:** {', '.join(headers)}\n\n"
+        )
 
     @staticmethod
     def json_list_to_table(json_list):
@@ -1,8 +1,8 @@
-from agno.embedder.google import GeminiEmbedder
 from agno.knowledge.csv import CSVKnowledgeBase
-from agno.vectordb.pgvector import PgVector
 
-from main.settings import IA_DB, IA_MODEL
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from main.settings import IA_MODEL
 
 
 class CSVDocumentService:
@@ -30,10 +30,11 @@ class CSVDocumentService:
             knowledge_collection.append(
                 CSVKnowledgeBase(
                     path=path,
-                    vector_db=PgVector(
-                        table_name=f"ia_csv_documents_{agent_model.name}",
-                        db_url=IA_DB,
-                        embedder=GeminiEmbedder(api_key=ia_token),
+                    vector_db=KnowledgeVectorDb.for_tenant(
+                        agent_model.tenant,
+                        EmbeddingCacheService.get_embedder(
+                            ia_token, agent_model.tenant
+                        ),
                     ),
                 )
             )
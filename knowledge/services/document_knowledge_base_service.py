@@ -1,102 +1,246 @@
+import hashlib
+import logging
+from typing import Optional
+
 from agno.embedder.google import GeminiEmbedder
 from agno.embedder.ollama import OllamaEmbedder
 from agno.knowledge.combined import CombinedKnowledgeBase
-from agno.vectordb.pgvector import PgVector
 
 from agents.models import AgentModel
-from knowledge.services.document_service_factory import DocumentServiceFactory
-from knowledge.services.plain_document_service import PlainDocumentService
-from knowledge.services.website_service import WebsiteService
-from main.settings import IA_DB, IA_MODEL_EMBEDDING
+from knowledge.models import KnowledgeModel
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.knowledge_index_service import (
+    KnowledgeIndexError,
+    KnowledgeIndexService,
+)
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from knowledge.services.local_reranker import LocalReranker
+from knowledge.services.retrieval_cache_service import RetrievalCacheService
+from knowledge.services.vector_index_service import VectorIndexService
+from main.metrics import set_labels, timed
+from main.settings import IA_MODEL_EMBEDDING, RETRIEVAL_CACHE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+
+class TimedCombinedKnowledgeBase(CombinedKnowledgeBase):
+    """
+    Registra la duración de cada búsqueda del agente como fase `retrieval`.
+
+    Con `retrieval_cache`, las consultas repetidas se responden desde la
+    caché sin embeber la consulta ni buscar en la vector DB.
+    """
+
+    retrieval_cache: Optional[RetrievalCacheService] = None
+
+    def search(self, query, num_documents=None, filters=None):
+        with timed("retrieval"):
+            if self.retrieval_cache is not None:
+                documents = self.retrieval_cache.get(query, num_documents, filters)
+                if documents is not None:
+                    return documents
+            documents = super().search(
+                query=query, num_documents=num_documents, filters=filters
+            )
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.set(query, num_documents, filters, documents)
+            return documents
+
+    async def async_search(self, query, num_documents=None, filters=None):
+        with timed("retrieval"):
+            if self.retrieval_cache is not None:
+                documents = await self.retrieval_cache.aget(
+                    query, num_documents, filters
+                )
+                if documents is not None:
+                    return documents
+            documents = await super().async_search(
+                query=query, num_documents=num_documents, filters=filters
+            )
+            if self.retrieval_cache is not None:
+                await self.retrieval_cache.aset(
+                    query, num_documents, filters, documents
+                )
+            return documents
 
 
 class DocumentKnowledgeBaseService:
 
-    def __init__(self, agent: str):
-        self.agent_model = AgentModel.objects.get(name=agent)
+    STATUS_READY = "ready"
+    STATUS_INDEXING = "indexing"
+
+    def __init__(self, agent):
+        if isinstance(agent, AgentModel):
+            self.agent_model = agent
+        else:
+            self.agent_model = AgentModel.objects.select_related("tenant").get(
+                name=agent
+            )
+
+    def _get_vector_db(self, cached_embeddings: bool = False, knowledge_ids=None):
+        """
+        Vector DB compartida del tenant del agente, para lectura e ingesta.
+
+        Args:
+            cached_embeddings: Usa la caché persistente de embeddings (ingesta)
+            knowledge_ids: Conocimientos entre los que se busca (None = todos)
+        """
+        ai_token = self.agent_model.tenant.ai_token
+        return KnowledgeVectorDb.for_tenant(
+            self.agent_model.tenant,
+            # embedder=OllamaEmbedder(id=IA_MODEL_EMBEDDING, dimensions=3072),
+            embedder=(
+                EmbeddingCacheService.get_embedder(ai_token, self.agent_model.tenant)
+                if cached_embeddings
+                else GeminiEmbedder(api_key=ai_token)
+            ),
+            knowledge_ids=knowledge_ids,
+            agent=self.agent_model,
+        )
+
+    def get_tenant_knowledge(self):
+        """
+        Conocimientos indexados en la vector DB del tenant: los vinculados a
+        cualquiera de sus agentes.
+        """
+        return KnowledgeModel.objects.filter(
+            agentmodel__tenant=self.agent_model.tenant_id
+        ).distinct()
 
     def get_knowledge_base(self):
         """
-        Obtiene una base de conocimiento combinada de todas las fuentes disponibles.
+        Obtiene un handle de solo lectura sobre el índice ya construido.
+
+        No lee fuentes ni genera embeddings: la ingesta se ejecuta en la
+        tarea `knowledge.tasks.index_agent_knowledge`. Las búsquedas se
+        limitan a los conocimientos vinculados al agente, se reordenan con
+        el reranker local si el agente lo usa y, con `RETRIEVAL_CACHE_ENABLED`,
+        se cachean por consulta.
 
         Returns:
-            CombinedKnowledgeBase: Base de conocimiento combinada
+            CombinedKnowledgeBase: Base de conocimiento sin fuentes asociadas
         """
-        # Verificar si algún modelo de conocimiento necesita recreación
-        recreate = self.agent_model.knoledge_text_models.filter(recreate=True).exists()
-
-        # Agrupar archivos por extensión para usar el factory
-        files_by_extension = {}
-        plain_texts = []
-        website_urls = []
-
-        # Categorizar los modelos de conocimiento
-        for knowledge in self.agent_model.knoledge_text_models.all():
-            if knowledge.category == "plain_document":
-                plain_texts.append(knowledge.text)
-            elif knowledge.category == "website":
-                website_urls.append(knowledge.url)
-            elif (
-                knowledge.category == "document"
-                and knowledge.document
-                and knowledge.document.file
-            ):
-                file_path = knowledge.document.file.path
-                file_ext = knowledge.document.file.name.split(".")[-1].lower()
-
-                # Agrupar archivos por extensión
-                if file_ext not in files_by_extension:
-                    files_by_extension[file_ext] = []
-                files_by_extension[file_ext].append(file_path)
-
-        # Obtener bases de conocimiento usando factories y servicios específicos
-        knowledge_sources = []
-
-        # Documentos de texto plano (usando servicio específico)
-        if plain_texts:
-            knowledge_base_plain = PlainDocumentService.get_knowledge_base(
-                self.agent_model, plain_texts
-            )
-            knowledge_sources.append(knowledge_base_plain)
+        knowledge_ids = list(
+            self.agent_model.knoledge_text_models.values_list("id", flat=True)
+        )
+        vector_db = self._get_vector_db(knowledge_ids=knowledge_ids)
+        vector_db.reranker = LocalReranker.for_agent(self.agent_model)
+        retrieval_cache = None
+        if RETRIEVAL_CACHE_ENABLED:
+            # La configuración del agente (modo de búsqueda, reranking) también
+            # cambia los resultados: updated_at forma parte de la versión
+            version = hashlib.sha256(
+                f"{self.get_version()}:{self.agent_model.updated_at}".encode()
+            ).hexdigest()
+            retrieval_cache = RetrievalCacheService(self.agent_model.pk, version)
+        knowledge_base = TimedCombinedKnowledgeBase(
+            sources=[], vector_db=vector_db, retrieval_cache=retrieval_cache
+        )
+        if vector_db.reranker is not None:
+            # Se recuperan más candidatos de los que llegan al prompt
+            knowledge_base.num_documents = self.agent_model.rerank_candidates
+        return knowledge_base
 
-        # Sitios web (usando servicio específico)
-        if website_urls:
-            knowledge_base_web = WebsiteService.get_knowledge_base(
-                self.agent_model, website_urls, self.agent_model.tenant.ai_token
-            )
-            if knowledge_base_web:  # WebsiteService puede devolver None si no hay URLs
-                knowledge_sources.append(knowledge_base_web)
+    def get_status(self) -> str:
+        """
+        Estado del índice del agente.
 
-        # Procesar archivos usando el DocumentServiceFactory
-        if files_by_extension:
-            document_knowledge_sources = DocumentServiceFactory.process_files_by_type(
-                self.agent_model, files_by_extension
-            )
-            knowledge_sources.extend(document_knowledge_sources)
-
-        # Combinar todas las bases de conocimiento
-        combined_knowledge = CombinedKnowledgeBase(
-            sources=knowledge_sources,
-            vector_db=PgVector(
-                table_name=f"ia_combined_documents_{self.agent_model.name}",
-                db_url=IA_DB,
-                # embedder=OllamaEmbedder(id=IA_MODEL_EMBEDDING, dimensions=3072),
-                embedder=GeminiEmbedder(api_key=self.agent_model.tenant.ai_token),
-            ),
+        Returns:
+            str: "indexing" si hay conocimiento pendiente de indexar, si no "ready"
+        """
+        if self.agent_model.knoledge_text_models.filter(recreate=True).exists():
+            return self.STATUS_INDEXING
+        return self.STATUS_READY
+
+    async def aget_status(self) -> str:
+        """Versión asíncrona de `get_status`."""
+        if await self.agent_model.knoledge_text_models.filter(recreate=True).aexists():
+            return self.STATUS_INDEXING
+        return self.STATUS_READY
+
+    def get_version(self) -> str:
+        """
+        Huella del conocimiento vinculado al agente.
+
+        Cambia cuando se vincula, desvincula o modifica cualquiera de sus
+        KnowledgeModel (los cambios de documentos los marcan para recrear).
+
+        Returns:
+            str: Hash sha256 en hexadecimal
+        """
+        rows = self.agent_model.knoledge_text_models.order_by("id").values_list(
+            "id", "updated_at"
         )
+        digest = hashlib.sha256()
+        for knowledge_id, updated_at in rows:
+            digest.update(f"{knowledge_id}:{updated_at.isoformat()};".encode())
+        return digest.hexdigest()
 
-        # Cargar la base de conocimiento
-        if (
-            not combined_knowledge.vector_db.search(
-                "ia_combined_documents_GeminiTestAgent", limit=1
-            )
-            or recreate
-        ):
-            combined_knowledge.load(recreate=recreate)
+    def load_knowledge_base(self, recreate: bool = False) -> None:
+        """
+        Indexa de forma incremental el conocimiento del tenant del agente en
+        su vector DB compartida.
+
+        Se ejecuta fuera del request de chat, desde la tarea de Celery. Sólo
+        se embeben los fragmentos nuevos; ver `KnowledgeIndexService`.
+
+        Args:
+            recreate: Borra el índice del tenant y lo reconstruye desde cero
 
-        # Usa este código para que se emitan las señales:
-        for knowledge in self.agent_model.knoledge_text_models.filter(recreate=True):
-            knowledge.recreate = False
-            knowledge.save()
+        Raises:
+            KnowledgeIndexError: Si alguna fuente no se pudo indexar, una vez
+                indexadas las demás (sólo éstas dejan de estar pendientes)
+        """
+        knowledge_models = self.get_tenant_knowledge()
+        # Capturar los modelos pendientes antes de empezar: si alguno vuelve a
+        # marcarse durante la ingesta, su propia tarea lo volverá a indexar
+        pending = list(knowledge_models.filter(recreate=True))
+
+        tenant = self.agent_model.tenant
+        set_labels(
+            agent=self.agent_model.id,
+            tenant=tenant.id if tenant else None,
+            provider=tenant.model if tenant else None,
+        )
+        with timed("knowledge_load"):
+            vector_db = self._get_vector_db(cached_embeddings=True)
+            if recreate:
+                vector_db.drop()
+            index_service = KnowledgeIndexService(self.agent_model, vector_db)
+            stats = index_service.sync(
+                knowledge_models.select_related("document"),
+                refresh={knowledge.id for knowledge in pending},
+            )
+            logger.info(
+                f"📚 Conocimiento del tenant {tenant} indexado "
+                f"(recreate={recreate}): {stats}"
+            )
+            if recreate or stats["inserted"] or stats["deleted"]:
+                # Las búsquedas cacheadas pueden haber quedado obsoletas
+                RetrievalCacheService.invalidate(
+                    AgentModel.objects.filter(tenant=tenant).values_list(
+                        "id", flat=True
+                    )
+                )
+            try:
+                # Crea el índice ANN si falta (p. ej. tras recrear la tabla)
+                VectorIndexService(vector_db).create_exclusive(tenant.id)
+            except Exception as e:
+                logger.error(f"No se pudo crear el índice vectorial: {e}")
+
+        # Usa este código para que se emitan las señales. Sólo se limpian los
+        # modelos que se indexaron y no se modificaron mientras se indexaba.
+        for knowledge in pending:
+            if knowledge.id in index_service.failures:
+                continue
+            current = (
+                type(knowledge)
+                .objects.filter(pk=knowledge.pk, updated_at=knowledge.updated_at)
+                .first()
+            )
+            if current:
+                current.recreate = False
+                current.save()
 
-        return combined_knowledge
+        if index_service.failures:
+            raise KnowledgeIndexError(index_service.failures)
@@ -0,0 +1,239 @@
+"""
+Caché persistente de embeddings.
+
+Los embeddings se guardan en `EmbeddingCacheModel` por (embedder,
+dimensiones, sha256 del texto): el mismo fragmento sólo se envía al
+proveedor una vez, aunque lo indexen varios agentes o se recree el índice.
+
+El límite de entradas lo aplica una tarea periódica (`evict_embedding_cache`)
+y `last_used_at` sólo se reescribe si tiene más de
+`EMBEDDING_CACHE_TOUCH_INTERVAL` segundos: las lecturas de la ingesta no
+generan una escritura por embedding.
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.embedder.base import Embedder
+from agno.embedder.google import GeminiEmbedder
+from django.utils import timezone
+
+from knowledge.models import EmbeddingCacheModel
+from knowledge.services.embedding_scheduler_service import EmbeddingScheduler
+from main.settings import (
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_TOUCH_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hashes por consulta en las búsquedas masivas
+LOOKUP_BATCH_SIZE = 1000
+# Entradas por DELETE al desalojar
+EVICT_BATCH_SIZE = 10000
+
+
+class EmbeddingCacheService:
+    """Lectura, escritura y desalojo (LRU por número de entradas) de la caché."""
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_embedder_id(embedder: Embedder) -> str:
+        """Identidad del embedder: clase, modelo y tipo de tarea si lo tiene."""
+        parts = [type(embedder).__name__, str(getattr(embedder, "id", ""))]
+        task_type = getattr(embedder, "task_type", None)
+        if task_type:
+            parts.append(task_type)
+        return ":".join(parts)
+
+    @staticmethod
+    def get_embedder(api_key: Optional[str] = None, tenant=None) -> "CachedEmbedder":
+        """
+        Embedder de Gemini con caché, para la ingesta de conocimiento.
+
+        Args:
+            tenant: Tenant cuyo límite de embeddings se aplica
+        """
+        embedder = GeminiEmbedder(api_key=api_key)
+        return CachedEmbedder(
+            embedder=embedder,
+            scheduler=EmbeddingScheduler.for_tenant(embedder, tenant),
+        )
+
+    @staticmethod
+    def get_many(embedder_id: str, dimensions: int, hashes: list) -> dict:
+        """
+        Busca embeddings guardados y marca los encontrados como usados.
+
+        Sólo se actualizan las entradas marcadas hace más de
+        `EMBEDDING_CACHE_TOUCH_INTERVAL` segundos.
+
+        Returns:
+            dict: Hash -> embedding (list[float]) de los encontrados
+        """
+        found = {}
+        now = timezone.now()
+        stale = now - timedelta(seconds=EMBEDDING_CACHE_TOUCH_INTERVAL)
+        for i in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            batch = hashes[i : i + LOOKUP_BATCH_SIZE]
+            entries = EmbeddingCacheModel.objects.filter(
+                embedder_id=embedder_id, dimensions=dimensions, content_hash__in=batch
+            )
+            rows = list(
+                entries.values_list("id", "content_hash", "embedding", "last_used_at")
+            )
+            for _, content_hash, embedding, _ in rows:
+                vector = np.frombuffer(bytes(embedding), dtype=np.float32)
+                found[content_hash] = vector.tolist()
+            touched = [row[0] for row in rows if row[3] < stale]
+            if touched:
+                EmbeddingCacheModel.objects.filter(id__in=touched).update(
+                    last_used_at=now
+                )
+        return found
+
+    @staticmethod
+    def set_many(embedder_id: str, dimensions: int, embeddings: dict) -> None:
+        """Guarda embeddings (hash -> list[float])."""
+        if not embeddings:
+            return
+        now = timezone.now()
+        EmbeddingCacheModel.objects.bulk_create(
+            [
+                EmbeddingCacheModel(
+                    embedder_id=embedder_id,
+                    dimensions=dimensions,
+                    content_hash=content_hash,
+                    embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+                    last_used_at=now,
+                )
+                for content_hash, embedding in embeddings.items()
+            ],
+            batch_size=LOOKUP_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def evict(max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES) -> int:
+        """
+        Elimina los embeddings usados hace más tiempo por encima del límite.
+
+        Sólo recorre el índice de `last_used_at` si el recuento supera el
+        límite, y borra por lotes de `EVICT_BATCH_SIZE`.
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        excess = EmbeddingCacheModel.objects.count() - max_entries
+        deleted = 0
+        while excess > 0:
+            ids = list(
+                EmbeddingCacheModel.objects.order_by("last_used_at").values_list(
+                    "id", flat=True
+                )[: min(excess, EVICT_BATCH_SIZE)]
+            )
+            if not ids:
+                break
+            count, _ = EmbeddingCacheModel.objects.filter(id__in=ids).delete()
+            deleted += count
+            excess -= len(ids)
+        return deleted
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """
+    Envuelve un embedder de agno y sólo le envía los textos no cacheados.
+
+    `get_embeddings` resuelve un lote con una búsqueda masiva y deja los
+    resultados en memoria, de modo que el `Document.embed` que hace después
+    la vector DB de agno no vuelve a consultar ni la caché ni el proveedor.
+    Los textos no cacheados se piden al proveedor con `scheduler` (rate limit
+    y reintentos), también los sueltos. Si la caché no está disponible se
+    piden todos.
+    """
+
+    embedder: Optional[Embedder] = None
+    scheduler: Optional[EmbeddingScheduler] = None
+    _prefetched: Dict[str, List[float]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self.dimensions = self.embedder.dimensions
+        self.id = EmbeddingCacheService.get_embedder_id(self.embedder)
+        if self.scheduler is None:
+            self.scheduler = EmbeddingScheduler(self.embedder)
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        content_hash = EmbeddingCacheService.hash_text(text)
+        prefetched = self._prefetched.pop(content_hash, None)
+        if prefetched is not None:
+            return prefetched, None
+
+        cached = self._cache_get([content_hash])
+        if content_hash in cached:
+            return cached[content_hash], None
+
+        # agno embebe así cada documento que no se resolvió en el lote
+        embedding = self.scheduler.embed([text])[0]
+        if not embedding:
+            raise ValueError("El proveedor no devolvió el embedding del texto")
+        self._cache_set({content_hash: embedding})
+        return embedding, None
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings de un lote de textos; sólo los no cacheados van al proveedor.
+
+        Returns:
+            list: Un embedding por texto, en el mismo orden ([] si falló)
+        """
+        # Sólo se conservan en memoria los del último lote
+        self._prefetched = {}
+        hashes = [EmbeddingCacheService.hash_text(text) for text in texts]
+        embeddings = self._cache_get(list(set(hashes)))
+
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in embeddings and content_hash not in missing:
+                missing[content_hash] = text
+
+        computed = {}
+        results = self.scheduler.embed(list(missing.values())) if missing else []
+        for content_hash, embedding in zip(missing, results):
+            if embedding:
+                computed[content_hash] = embedding
+        self._cache_set(computed)
+        embeddings.update(computed)
+
+        for content_hash in hashes:
+            if content_hash in embeddings:
+                self._prefetched[content_hash] = embeddings[content_hash]
+        return [embeddings.get(content_hash, []) for content_hash in hashes]
+
+    def _cache_get(self, hashes: list) -> dict:
+        if not EMBEDDING_CACHE_ENABLED:
+            return {}
+        try:
+            return EmbeddingCacheService.get_many(self.id, self.dimensions, hashes)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché de embeddings: {e}")
+            return {}
+
+    def _cache_set(self, embeddings: dict) -> None:
+        if not EMBEDDING_CACHE_ENABLED or not embeddings:
+            return
+        try:
+            EmbeddingCacheService.set_many(self.id, self.dimensions, embeddings)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en la caché de embeddings: {e}")
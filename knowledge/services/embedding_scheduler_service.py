@@ -0,0 +1,268 @@
+"""
+Planificador de peticiones de embeddings.
+
+Agrupa los textos en lotes del tamaño que admite el proveedor, mantiene
+varios lotes en vuelo a la vez, reintenta con backoff exponencial y limita
+el ritmo por tenant con un token bucket en Redis, compartido por todos los
+workers. Si Redis no está disponible se usa un bucket por proceso.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import redis
+from agno.embedder.google import GeminiEmbedder
+from tenacity import (
+    Retrying,
+    before_sleep_log,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from main.settings import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_IN_FLIGHT,
+    EMBEDDING_RATE_LIMIT_URL,
+    EMBEDDING_RETRY_ATTEMPTS,
+    EMBEDDING_RETRY_BACKOFF,
+    EMBEDDING_TENANT_RATE_PER_MINUTE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket bloqueante y seguro entre hilos (un token por texto)."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Espera hasta disponer de `tokens` y los consume.
+
+        Returns:
+            float: Segundos esperados
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated_at
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RedisTokenBucket:
+    """
+    Token bucket compartido entre procesos, guardado en un hash de Redis.
+
+    Cada `acquire` reserva los tokens en un script Lua atómico (el saldo
+    puede quedar negativo) y duerme lo que falte para cubrirlos: las
+    peticiones de todos los workers se reparten el ritmo por orden de
+    llegada. Si Redis falla se usa `fallback`.
+    """
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local requested = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+    tokens = tokens - requested
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 60)
+    if tokens >= 0 then
+        return '0'
+    end
+    return tostring(-tokens / rate)
+    """
+
+    def __init__(
+        self, client, key: str, rate: float, capacity: float, fallback: TokenBucket
+    ) -> None:
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.fallback = fallback
+        self._script = client.register_script(self.SCRIPT)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Reserva `tokens` y espera hasta que estén disponibles.
+
+        Returns:
+            float: Segundos esperados
+        """
+        tokens = min(tokens, self.capacity)
+        try:
+            delay = float(
+                self._script(keys=[self.key], args=[self.rate, self.capacity, tokens])
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit de embeddings sin Redis, por proceso: {e}")
+            return self.fallback.acquire(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class EmbeddingScheduler:
+    """
+    Calcula embeddings por lotes concurrentes con reintentos y rate limiting.
+
+    Funciona con cualquier embedder de agno: si expone `get_embeddings`
+    se le pasa el lote entero, los de Gemini usan una sola petición por lote
+    y el resto se resuelve texto a texto dentro de cada lote.
+    """
+
+    _buckets: dict = {}
+    _buckets_lock = threading.Lock()
+    _redis = None
+
+    def __init__(
+        self,
+        embedder,
+        bucket: Optional[TokenBucket] = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+        attempts: int = EMBEDDING_RETRY_ATTEMPTS,
+        backoff: float = EMBEDDING_RETRY_BACKOFF,
+    ) -> None:
+        self.embedder = embedder
+        self.bucket = bucket
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.attempts = attempts
+        self.backoff = backoff
+
+    @classmethod
+    def for_tenant(cls, embedder, tenant) -> "EmbeddingScheduler":
+        """Planificador que comparte el token bucket del tenant."""
+        return cls(embedder, bucket=cls.get_bucket(tenant))
+
+    @staticmethod
+    def get_rate(tenant) -> float:
+        """Textos por segundo del tenant (su límite o el global)."""
+        per_minute = getattr(tenant, "embedding_rate_per_minute", None)
+        return (per_minute or EMBEDDING_TENANT_RATE_PER_MINUTE) / 60
+
+    @classmethod
+    def get_redis(cls):
+        """Cliente Redis de los buckets (None si `EMBEDDING_RATE_LIMIT_URL` está vacío)."""
+        if cls._redis is None and EMBEDDING_RATE_LIMIT_URL:
+            cls._redis = redis.Redis.from_url(
+                EMBEDDING_RATE_LIMIT_URL, socket_timeout=1, socket_connect_timeout=1
+            )
+        return cls._redis
+
+    @classmethod
+    def get_bucket(cls, tenant):
+        """
+        Token bucket del tenant: en Redis si está configurado y, como
+        respaldo, uno por proceso.
+        """
+        tenant_id = getattr(tenant, "id", None)
+        rate = cls.get_rate(tenant)
+        capacity = EMBEDDING_BATCH_SIZE * EMBEDDING_MAX_IN_FLIGHT
+        with cls._buckets_lock:
+            local = cls._buckets.get(tenant_id)
+            if local is None or local.rate != rate:
+                local = cls._buckets[tenant_id] = TokenBucket(
+                    rate=rate, capacity=capacity
+                )
+        client = cls.get_redis()
+        if client is None:
+            return local
+        return RedisTokenBucket(
+            client,
+            key=f"embeddings:rate:tenant:{tenant_id}",
+            rate=rate,
+            capacity=capacity,
+            fallback=local,
+        )
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings de los textos, en el mismo orden.
+
+        Un lote que falla tras agotar los reintentos devuelve [] para cada
+        uno de sus textos.
+        """
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) <= 1 or self.max_in_flight <= 1:
+            results = [self._run_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_in_flight, len(batches)),
+                thread_name_prefix="embeddings",
+            ) as executor:
+                results = list(executor.map(self._run_batch, batches))
+        return [embedding for batch in results for embedding in batch]
+
+    def _run_batch(self, batch: List[str]) -> List[List[float]]:
+        if self.bucket is not None:
+            self.bucket.acquire(len(batch))
+        retrying = Retrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_exponential(multiplier=self.backoff, max=60),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        )
+        try:
+            embeddings = retrying(self._embed_batch, batch)
+        except Exception as e:
+            logger.error(f"No se pudo embeber un lote de {len(batch)} textos: {e}")
+            return [[] for _ in batch]
+        if len(embeddings) != len(batch):
+            logger.error("El proveedor devolvió un número distinto de embeddings")
+            return [[] for _ in batch]
+        return embeddings
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        if hasattr(self.embedder, "get_embeddings"):
+            return self.embedder.get_embeddings(batch)
+        if isinstance(self.embedder, GeminiEmbedder):
+            return self._embed_gemini_batch(batch)
+        return [self._embed_one(text) for text in batch]
+
+    def _embed_one(self, text: str) -> List[float]:
+        embedding = self.embedder.get_embedding(text)
+        if not embedding:
+            # agno devuelve [] ante errores: se reintenta el lote
+            raise ValueError("Embedding vacío")
+        return embedding
+
+    def _embed_gemini_batch(self, batch: List[str]) -> List[List[float]]:
+        """Una petición `embed_content` con todos los textos del lote."""
+        embedder = self.embedder
+        config = {}
+        if embedder.dimensions:
+            config["output_dimensionality"] = embedder.dimensions
+        if embedder.task_type:
+            config["task_type"] = embedder.task_type
+        response = embedder.client.models.embed_content(
+            model=embedder.id.split("/")[-1], contents=batch, config=config or None
+        )
+        return [embedding.values or [] for embedding in response.embeddings or []]
@@ -0,0 +1,93 @@
+"""
+Locks por tenant de la ingesta y del índice vectorial.
+
+Se toman con `cache.add` sobre la caché por defecto (Redis, ver `CACHES`;
+`knowledge.W001` avisa si no es compartida). El valor de cada lock es un
+token de quien lo tomó y sólo ése lo libera.
+"""
+
+import logging
+import uuid
+from typing import Optional
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCacheClient
+
+logger = logging.getLogger(__name__)
+
+# Borra la clave sólo si sigue guardando el token de quien la libera
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class IndexLockService:
+    """
+    Lock con caducidad sobre la caché por defecto.
+
+    Si el lock caducó mientras su dueño seguía trabajando y otro worker lo
+    tomó, la liberación del primero no borra el del segundo: en Redis la
+    comprobación del token y el borrado se hacen en un script Lua atómico.
+    """
+
+    @staticmethod
+    def index_key(tenant_id) -> str:
+        """Lock de la ingesta de conocimiento del tenant."""
+        return f"knowledge:index:tenant:{tenant_id}"
+
+    @staticmethod
+    def vector_index_key(tenant_id) -> str:
+        """Lock de la construcción del índice ANN del tenant."""
+        return f"knowledge:vector_index:tenant:{tenant_id}"
+
+    @staticmethod
+    def acquire(key: str, timeout: int, token: Optional[str] = None) -> Optional[str]:
+        """
+        Toma el lock si está libre.
+
+        Si la caché no responde se continúa sin lock, como si se hubiera
+        tomado.
+
+        Args:
+            key: Clave del lock
+            timeout: Segundos tras los que caduca
+            token: Identificador del dueño (p. ej. el id de la tarea)
+
+        Returns:
+            str: Token con el que liberarlo, o None si lo tiene otro
+        """
+        token = token or uuid.uuid4().hex
+        try:
+            acquired = cache.add(key, token, timeout)
+        except Exception as e:
+            logger.warning(f"No se pudo tomar el lock {key}: {e}")
+            return token
+        return token if acquired else None
+
+    @staticmethod
+    def release(key: str, token: str) -> bool:
+        """
+        Libera el lock si todavía es de `token`.
+
+        Returns:
+            bool: True si se borró
+        """
+        try:
+            redis_cache = getattr(cache, "_cache", None)
+            if isinstance(redis_cache, RedisCacheClient):
+                cache_key = cache.make_and_validate_key(key)
+                client = redis_cache.get_client(cache_key, write=True)
+                release = client.register_script(RELEASE_SCRIPT)
+                value = redis_cache._serializer.dumps(token)
+                return bool(release(keys=[cache_key], args=[value]))
+            # Cachés sin scripts (locales): comprobación no atómica
+            if cache.get(key) != token:
+                return False
+            cache.delete(key)
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el lock {key}: {e}")
+            return False
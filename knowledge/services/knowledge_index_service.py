@@ -0,0 +1,473 @@
+"""
+Indexación incremental del conocimiento de un tenant.
+
+Cada vector guarda junto a él la huella de su fuente y la de su fragmento:
+`meta_data` lleva `knowledge_id`, `tenant_id` y `source_hash`, y el `id` de
+la fila es `{knowledge_id}:{sha256 del fragmento}`. Al reindexar se comparan esas
+huellas con las fuentes actuales y sólo se generan embeddings para los
+fragmentos nuevos.
+"""
+
+import hashlib
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from documents.models import DocumentModel
+from knowledge.services.document_service_factory import DocumentServiceFactory
+from knowledge.services.knowledge_parsing_service import KnowledgeParsingService
+from knowledge.services.pdf_document_service import PDFDocumentService
+from knowledge.services.plain_document_service import PlainDocumentService
+from knowledge.services.website_service import WebsiteService
+from main.settings import EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Filas por sentencia al borrar o actualizar vectores
+STATEMENT_BATCH_SIZE = 1000
+# Fragmentos que se embeben e insertan juntos: llena los lotes en vuelo
+INSERT_BATCH_SIZE = EMBEDDING_BATCH_SIZE * EMBEDDING_MAX_IN_FLIGHT
+
+
+class KnowledgeIndexError(Exception):
+    """Fuentes que no se pudieron indexar en una sincronización."""
+
+    def __init__(self, failures: dict):
+        self.failures = failures
+        details = "; ".join(
+            f"{knowledge_id}: {error}" for knowledge_id, error in failures.items()
+        )
+        super().__init__(f"No se pudieron indexar {len(failures)} fuentes ({details})")
+
+
+class KnowledgeIndexService:
+    """
+    Sincroniza la vector DB de un tenant con los KnowledgeModel vinculados a
+    sus agentes (`agent_model` es el agente que originó la indexación).
+
+    - Las fuentes cuya huella no cambió no se vuelven a leer.
+    - De las que cambiaron sólo se embeben los fragmentos nuevos y se borran
+      los que ya no existen; los demás se conservan.
+    - Se borran los vectores de conocimientos desvinculados y los que no
+      tienen huella (índices creados antes de la indexación incremental).
+    - Una fuente que falla no interrumpe las demás: se conservan sus filas,
+      se anota en `failures` (id -> excepción) y se vuelve a leer en la
+      siguiente sincronización.
+    """
+
+    def __init__(self, agent_model, vector_db):
+        self.agent_model = agent_model
+        self.vector_db = vector_db
+        self.failures = {}
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def chunk_id(knowledge_id: int, chunk_hash: str) -> str:
+        return f"{knowledge_id}:{chunk_hash}"
+
+    @staticmethod
+    def get_source_hash(knowledge) -> Optional[str]:
+        """
+        Huella de la fuente sin leer su contenido procesado.
+
+        Para los sitios web sólo se conocen la URL y los límites del crawl: su
+        contenido se vuelve a leer cuando el conocimiento se marca para recrear.
+
+        Returns:
+            str | None: Hash sha256 o None si la fuente no está disponible
+        """
+        digest = hashlib.sha256(f"{knowledge.category}:".encode())
+        if knowledge.category == "plain_document":
+            digest.update(knowledge.text.encode("utf-8"))
+        elif knowledge.category == "website":
+            crawl = f"{knowledge.url}|{knowledge.max_depth}|{knowledge.max_links}"
+            digest.update(crawl.encode("utf-8"))
+        elif knowledge.category == "document":
+            if not (knowledge.document and knowledge.document.file):
+                return None
+            digest.update(knowledge.document.file.name.encode("utf-8"))
+            try:
+                with knowledge.document.file.open("rb") as file:
+                    for block in iter(lambda: file.read(1024 * 1024), b""):
+                        digest.update(block)
+            except OSError as e:
+                logger.warning(f"No se pudo leer el documento de {knowledge}: {e}")
+                return None
+        else:
+            return None
+        return digest.hexdigest()
+
+    @staticmethod
+    def diff(indexed: dict, chunks: dict) -> tuple:
+        """
+        Compara los fragmentos indexados de una fuente con los actuales.
+
+        Args:
+            indexed: Hash de fragmento -> id de la fila en la vector DB
+            chunks: Hash de fragmento -> Document leído de la fuente
+
+        Returns:
+            tuple: (hashes a insertar, ids a borrar, ids que se conservan)
+        """
+        new = [chunk_hash for chunk_hash in chunks if chunk_hash not in indexed]
+        removed = [
+            row_id for chunk_hash, row_id in indexed.items() if chunk_hash not in chunks
+        ]
+        kept = [
+            row_id for chunk_hash, row_id in indexed.items() if chunk_hash in chunks
+        ]
+        return new, removed, kept
+
+    def get_sources(self, knowledge) -> list:
+        """Bases de conocimiento de agno que leen un único KnowledgeModel."""
+        ia_token = self.agent_model.tenant.ai_token
+        if knowledge.category == "plain_document":
+            return [
+                PlainDocumentService.get_knowledge_base(
+                    self.agent_model, [knowledge.text], ia_token
+                )
+            ]
+        if knowledge.category == "website":
+            source = WebsiteService.get_knowledge_base(
+                self.agent_model,
+                [knowledge.url],
+                ia_token,
+                max_depth=knowledge.max_depth,
+                max_links=knowledge.max_links,
+                knowledge=knowledge,
+            )
+            return [source] if source else []
+        if knowledge.category == "document":
+            file_ext = knowledge.document.file.name.split(".")[-1].lower()
+            return DocumentServiceFactory.process_files_by_type(
+                self.agent_model, {file_ext: [knowledge.document.file.path]}, ia_token
+            )
+        return []
+
+    def read_chunks(self, knowledge, source_hash: str) -> tuple:
+        """
+        Lee y fragmenta la fuente, etiquetando cada fragmento con sus huellas.
+
+        Returns:
+            tuple: (hash de fragmento -> Document, sin los repetidos; False si
+                la lectura quedó incompleta, como un crawl cortado por tiempo)
+        """
+        chunks = {}
+        sources = self.get_sources(knowledge)
+        for source in sources:
+            for documents in source.document_lists:
+                self.tag_chunks(knowledge.id, source_hash, documents, chunks)
+        complete = not any(getattr(source, "truncated", False) for source in sources)
+        return chunks, complete
+
+    @classmethod
+    def tag_chunks(
+        cls, knowledge_id: int, source_hash: str, documents, chunks=None
+    ) -> dict:
+        """
+        Asigna a cada fragmento su id y sus huellas y los agrupa por hash.
+
+        Returns:
+            dict: Hash de fragmento -> Document (los repetidos se descartan)
+        """
+        chunks = {} if chunks is None else chunks
+        for document in documents:
+            if not document.content:
+                continue
+            chunk_hash = cls.hash_content(document.content)
+            if chunk_hash in chunks:
+                continue
+            document.id = cls.chunk_id(knowledge_id, chunk_hash)
+            document.meta_data = {
+                **(document.meta_data or {}),
+                "knowledge_id": knowledge_id,
+                "source_hash": source_hash,
+            }
+            chunks[chunk_hash] = document
+        return chunks
+
+    @staticmethod
+    def is_pdf(knowledge) -> bool:
+        return (
+            knowledge.category == "document"
+            and knowledge.document is not None
+            and knowledge.document.file.name.lower().endswith(".pdf")
+        )
+
+    @classmethod
+    def is_pdf_pending(cls, knowledge, source_hash: str) -> bool:
+        """PDF con una ingesta de esta misma versión que no llegó al final."""
+        if not cls.is_pdf(knowledge):
+            return False
+        document = knowledge.document
+        return document.indexed_source_hash == source_hash and (
+            document.page_count is None or document.indexed_pages < document.page_count
+        )
+
+    def get_indexed(self) -> tuple:
+        """
+        Huellas guardadas en la vector DB.
+
+        Returns:
+            tuple: ({knowledge_id: {hash de fragmento: id}},
+                    {knowledge_id: {source_hash}}, [ids sin huella])
+        """
+        indexed, source_hashes, orphans = {}, {}, []
+        table = self.vector_db.table
+        query = select(
+            table.c.id,
+            table.c.meta_data["knowledge_id"].astext,
+            table.c.meta_data["source_hash"].astext,
+        )
+        with self.vector_db.Session() as sess:
+            for row_id, knowledge_id, source_hash in sess.execute(query):
+                prefix, _, chunk_hash = row_id.partition(":")
+                if not knowledge_id or prefix != knowledge_id or not chunk_hash:
+                    orphans.append(row_id)
+                    continue
+                knowledge_id = int(knowledge_id)
+                indexed.setdefault(knowledge_id, {})[chunk_hash] = row_id
+                source_hashes.setdefault(knowledge_id, set()).add(source_hash)
+        return indexed, source_hashes, orphans
+
+    def sync(self, knowledge_models: Iterable, refresh: Iterable = ()) -> dict:
+        """
+        Lleva la vector DB al estado de los conocimientos indicados.
+
+        Args:
+            knowledge_models: KnowledgeModel que deben estar indexados
+            refresh: Ids de conocimientos marcados para recrear; los sitios web
+                sólo se vuelven a leer si están aquí
+
+        Returns:
+            dict: Número de fragmentos insertados, borrados y conservados, y de
+                fuentes omitidas por no haber cambiado, leídas de forma
+                incompleta (sin borrar lo que no se vio) o fallidas (ver
+                `failures`)
+        """
+        refresh = set(refresh)
+        self.failures = {}
+        stats = {
+            "inserted": 0,
+            "deleted": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "incomplete": 0,
+            "failed": 0,
+        }
+
+        self.vector_db.create()
+        indexed, source_hashes, to_delete = self.get_indexed()
+        linked = set()
+
+        jobs, pdf_jobs = [], []
+        for knowledge in knowledge_models:
+            linked.add(knowledge.id)
+            current = indexed.get(knowledge.id, {})
+            source_hash = self.get_source_hash(knowledge)
+            if source_hash is None:
+                # Fuente no disponible: se eliminan sus vectores
+                to_delete.extend(current.values())
+                continue
+
+            # Un PDF interrumpido ya tiene todas sus filas con la huella nueva:
+            # se reanuda aunque la fuente no haya cambiado
+            unchanged_source = source_hashes.get(knowledge.id) == {source_hash}
+            if (
+                unchanged_source
+                and not (knowledge.category == "website" and knowledge.id in refresh)
+                and not self.is_pdf_pending(knowledge, source_hash)
+            ):
+                stats["skipped"] += 1
+                stats["unchanged"] += len(current)
+                continue
+            if self.is_pdf(knowledge):
+                pdf_jobs.append((knowledge, source_hash))
+            else:
+                jobs.append((knowledge, source_hash))
+
+        # Las fuentes se leen en paralelo y cada una se embebe al terminar
+        for (
+            knowledge,
+            source_hash,
+            result,
+            error,
+        ) in KnowledgeParsingService.read_chunks(self.agent_model, jobs):
+            if error is not None:
+                self._fail(knowledge, error, stats)
+                continue
+            chunks, complete = result
+            current = indexed.get(knowledge.id, {})
+            new, removed, kept = self.diff(current, chunks)
+            if not complete:
+                # Lo que no se leyó no ha desaparecido: se conserva
+                logger.warning(
+                    f"Lectura incompleta de {knowledge}: se conservan "
+                    f"{len(removed)} fragmentos no vistos"
+                )
+                kept, removed = kept + removed, []
+                stats["incomplete"] += 1
+            try:
+                if new:
+                    self._insert([chunks[chunk_hash] for chunk_hash in new])
+                if kept and source_hashes.get(knowledge.id) != {source_hash}:
+                    self._update_source_hash(kept, source_hash)
+            except Exception as e:
+                # Sin las filas insertadas de esta versión, la fuente no
+                # parece indexada y la siguiente sincronización la relee
+                to_delete.extend(chunks[chunk_hash].id for chunk_hash in new)
+                self._fail(knowledge, e, stats)
+                continue
+            to_delete.extend(removed)
+            stats["inserted"] += len(new)
+            stats["unchanged"] += len(kept)
+
+        # Los PDF se leen por páginas para acotar la memoria; uno que falla
+        # se reanuda en la siguiente sincronización desde su progreso
+        for knowledge, source_hash in pdf_jobs:
+            try:
+                removed = self._sync_pdf(
+                    knowledge, source_hash, indexed.get(knowledge.id, {}), stats
+                )
+            except Exception as e:
+                self._fail(knowledge, e, stats)
+                continue
+            to_delete.extend(removed)
+
+        for knowledge_id, rows in indexed.items():
+            if knowledge_id not in linked:
+                to_delete.extend(rows.values())
+
+        self._delete(to_delete)
+        stats["deleted"] = len(to_delete)
+        return stats
+
+    def _fail(self, knowledge, error: Exception, stats: dict) -> None:
+        logger.error(f"No se pudo indexar {knowledge}: {error}")
+        self.failures[knowledge.id] = error
+        stats["failed"] += 1
+
+    def _sync_pdf(self, knowledge, source_hash: str, current: dict, stats) -> list:
+        """
+        Indexa un PDF por ventanas de páginas y guarda el progreso.
+
+        Tras cada ventana se registra en el DocumentModel la última página
+        indexada; si la ingesta se interrumpe, la siguiente continúa desde
+        ahí mientras el archivo no cambie.
+
+        Returns:
+            list: Ids de las filas del PDF que ya no existen
+        """
+        document = knowledge.document
+        path = document.file.path
+        page_count = PDFDocumentService.count_pages(path)
+
+        start, seen = 0, set()
+        if document.indexed_source_hash == source_hash and document.indexed_pages:
+            resumed = self._get_ids_with_source_hash(knowledge.id, source_hash)
+            if resumed:
+                start = min(document.indexed_pages, page_count)
+                seen = {row_id.partition(":")[2] for row_id in resumed}
+                stats["unchanged"] += len(seen)
+                logger.info(f"📄 Reanudando {document} desde la página {start + 1}")
+        # Se marca la versión antes de insertar: si se interrumpe en la primera
+        # ventana, la siguiente ingesta también la reanuda
+        self._save_progress(document, start, page_count, source_hash)
+
+        for end, chunks in KnowledgeParsingService.read_pdf_pages(
+            knowledge.id, source_hash, path, start, page_count
+        ):
+            chunks = {h: doc for h, doc in chunks.items() if h not in seen}
+            new, _, kept = self.diff(current, chunks)
+            if new:
+                self._insert([chunks[chunk_hash] for chunk_hash in new])
+            if kept:
+                self._update_source_hash(kept, source_hash)
+            seen.update(chunks)
+            stats["inserted"] += len(new)
+            stats["unchanged"] += len(kept)
+            self._save_progress(document, end, page_count, source_hash)
+
+        self._save_progress(document, page_count, page_count, source_hash)
+        return [
+            row_id for chunk_hash, row_id in current.items() if chunk_hash not in seen
+        ]
+
+    @staticmethod
+    def _save_progress(document, indexed_pages, page_count, source_hash) -> None:
+        # update() no emite señales: guardar el documento lo marcaría para recrear
+        DocumentModel.objects.filter(pk=document.pk).update(
+            indexed_pages=indexed_pages,
+            page_count=page_count,
+            indexed_source_hash=source_hash,
+        )
+        document.indexed_pages = indexed_pages
+        document.page_count = page_count
+        document.indexed_source_hash = source_hash
+
+    def _get_ids_with_source_hash(self, knowledge_id: int, source_hash: str) -> list:
+        table = self.vector_db.table
+        query = select(table.c.id).where(
+            table.c.meta_data["knowledge_id"].astext == str(knowledge_id),
+            table.c.meta_data["source_hash"].astext == source_hash,
+        )
+        with self.vector_db.Session() as sess:
+            return list(sess.scalars(query))
+
+    def _insert(self, documents: list) -> None:
+        """
+        Embebe e inserta los fragmentos por lotes.
+
+        Si el embedder admite lotes (`CachedEmbedder`), cada lote se resuelve
+        antes con una sola búsqueda en la caché de embeddings y los que faltan
+        se piden al proveedor en lotes concurrentes. Si falta algún embedding
+        no se inserta el lote: `PgVector.insert` omitiría esos fragmentos sin
+        error y la fuente parecería indexada.
+
+        Raises:
+            ValueError: Si el proveedor no devolvió todos los embeddings
+        """
+        embedder = self.vector_db.embedder
+        for document in documents:
+            document.meta_data["tenant_id"] = self.agent_model.tenant_id
+        for i in range(0, len(documents), INSERT_BATCH_SIZE):
+            batch = documents[i : i + INSERT_BATCH_SIZE]
+            if hasattr(embedder, "get_embeddings"):
+                embeddings = embedder.get_embeddings(
+                    [document.content for document in batch]
+                )
+                missing = sum(1 for embedding in embeddings if not embedding)
+                if missing:
+                    raise ValueError(
+                        f"No se pudieron embeber {missing} de {len(batch)} fragmentos"
+                    )
+            self.vector_db.insert(batch)
+
+    def _delete(self, ids: list) -> None:
+        table = self.vector_db.table
+        with self.vector_db.Session() as sess:
+            for i in range(0, len(ids), STATEMENT_BATCH_SIZE):
+                batch = ids[i : i + STATEMENT_BATCH_SIZE]
+                sess.execute(delete(table).where(table.c.id.in_(batch)))
+            sess.commit()
+
+    def _update_source_hash(self, ids: list, source_hash: str) -> None:
+        """Actualiza la huella de fuente de fragmentos que se conservan."""
+        table = self.vector_db.table
+        patch = func.jsonb_build_object("source_hash", source_hash)
+        with self.vector_db.Session() as sess:
+            for i in range(0, len(ids), STATEMENT_BATCH_SIZE):
+                batch = ids[i : i + STATEMENT_BATCH_SIZE]
+                sess.execute(
+                    update(table)
+                    .where(table.c.id.in_(batch))
+                    .values(
+                        meta_data=table.c.meta_data.op("||", return_type=JSONB)(patch)
+                    )
+                )
+            sess.commit()
@@ -0,0 +1,219 @@
+"""
+Lectura y fragmentación de fuentes de conocimiento en un pool de procesos.
+
+La extracción de texto de PDF, DOCX, etc. es CPU-bound: cada fuente se
+procesa en un proceso del pool y sus fragmentos se entregan en cuanto
+termina, de modo que la generación de embeddings de una fuente se solapa
+con la lectura de las demás.
+
+Este módulo no importa modelos al cargarse: los procesos del pool se crean
+con `spawn` e inicializan Django antes de recibir trabajo.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from main.settings import (
+    KNOWLEDGE_PARSE_MEMORY_LIMIT_MB,
+    KNOWLEDGE_PARSE_WORKERS,
+    PDF_STREAM_PAGES_PER_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    import django
+
+    if KNOWLEDGE_PARSE_MEMORY_LIMIT_MB:
+        # Límite duro: una fuente que lo supere falla con MemoryError en el
+        # proceso del pool en lugar de hacer crecer el worker
+        limit = KNOWLEDGE_PARSE_MEMORY_LIMIT_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
+    django.setup()
+
+
+def _read_chunks(agent_model, knowledge, source_hash):
+    from knowledge.services.knowledge_index_service import KnowledgeIndexService
+
+    return KnowledgeIndexService(agent_model, None).read_chunks(knowledge, source_hash)
+
+
+def _read_pdf_pages(knowledge_id, source_hash, path, start, end):
+    from knowledge.services.knowledge_index_service import KnowledgeIndexService
+    from knowledge.services.pdf_document_service import PDFDocumentService
+
+    return KnowledgeIndexService.tag_chunks(
+        knowledge_id, source_hash, PDFDocumentService.read_pages(path, start, end)
+    )
+
+
+class KnowledgeParsingService:
+    """
+    Pool de procesos compartido por las ingestas de cada proceso.
+
+    La ingesta se encola en `KNOWLEDGE_INDEX_QUEUE`, cuyo worker usa
+    `--pool threads`: sus hilos comparten un pool de `KNOWLEDGE_PARSE_WORKERS`
+    procesos (por defecto, uno por núcleo). Con `KNOWLEDGE_PARSE_WORKERS`
+    <= 1, con una sola fuente o dentro de un proceso daemon (los workers
+    prefork de Celery, que no pueden tener hijos), se lee en el propio
+    proceso.
+
+    Los objetos pasados al pool deben tener precargadas sus relaciones
+    (tenant del agente, documento del conocimiento): los procesos del pool no
+    consultan la base de datos; sólo la lectura de un sitio web guarda sus
+    páginas de referencia (`WebsitePageModel`).
+    """
+
+    _executor = None
+    _lock = threading.Lock()
+    _warned_daemon = False
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=KNOWLEDGE_PARSE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                logger.info(
+                    f"🧵 Pool de lectura de conocimiento con "
+                    f"{KNOWLEDGE_PARSE_WORKERS} procesos"
+                )
+            return cls._executor
+
+    @classmethod
+    def get_pool_size(cls) -> int:
+        """Procesos de lectura en este proceso (1 = leer sin pool)."""
+        if KNOWLEDGE_PARSE_WORKERS > 1 and multiprocessing.current_process().daemon:
+            if not cls._warned_daemon:
+                cls._warned_daemon = True
+                logger.warning(
+                    "La ingesta se ejecuta en un proceso daemon (worker prefork): "
+                    "se lee sin pool. Usa un worker `--pool threads` para la cola "
+                    "de KNOWLEDGE_INDEX_QUEUE"
+                )
+            return 1
+        return KNOWLEDGE_PARSE_WORKERS
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+
+    @classmethod
+    def read_pdf_pages(
+        cls, knowledge_id: int, source_hash: str, path, start: int, page_count: int
+    ):
+        """
+        Lee un PDF por ventanas de `PDF_STREAM_PAGES_PER_WINDOW` páginas.
+
+        Las ventanas se entregan en orden y sólo hay tantas en lectura como
+        procesos tiene el pool: hasta que se consume (se embebe) una ventana
+        no se empieza a leer la siguiente, así que la memoria está acotada.
+
+        Yields:
+            tuple: (página final de la ventana, fragmentos etiquetados)
+        """
+        windows = [
+            (window_start, min(window_start + PDF_STREAM_PAGES_PER_WINDOW, page_count))
+            for window_start in range(start, page_count, PDF_STREAM_PAGES_PER_WINDOW)
+        ]
+        pool_size = cls.get_pool_size()
+        if pool_size <= 1:
+            for window_start, window_end in windows:
+                yield window_end, _read_pdf_pages(
+                    knowledge_id, source_hash, path, window_start, window_end
+                )
+            return
+
+        executor = cls.get_executor()
+        pending = deque()
+        for window_start, window_end in windows:
+            future = executor.submit(
+                _read_pdf_pages,
+                knowledge_id,
+                source_hash,
+                path,
+                window_start,
+                window_end,
+            )
+            pending.append((window_end, future))
+            if len(pending) >= pool_size:
+                window_end, future = pending.popleft()
+                yield window_end, cls._result(future)
+        while pending:
+            window_end, future = pending.popleft()
+            yield window_end, cls._result(future)
+
+    @classmethod
+    def _result(cls, future):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. por memoria): el pool no se reutiliza
+            cls.shutdown()
+            raise
+
+    @classmethod
+    def read_chunks(cls, agent_model, jobs: list):
+        """
+        Lee las fuentes y entrega sus fragmentos a medida que terminan.
+
+        Un error de lectura no interrumpe las demás fuentes: se entrega como
+        resultado de la fuente que falló.
+
+        Args:
+            agent_model: Agente cuyo conocimiento se indexa
+            jobs: Tuplas (KnowledgeModel, source_hash)
+
+        Yields:
+            tuple: (KnowledgeModel, source_hash, (fragmentos, completa) de
+                `KnowledgeIndexService.read_chunks` o None, excepción o None)
+        """
+        if cls.get_pool_size() <= 1 or len(jobs) <= 1:
+            for knowledge, source_hash in jobs:
+                try:
+                    result = _read_chunks(agent_model, knowledge, source_hash)
+                except Exception as e:
+                    logger.error(f"Error leyendo el conocimiento {knowledge}: {e}")
+                    yield knowledge, source_hash, None, e
+                    continue
+                yield knowledge, source_hash, result, None
+            return
+
+        futures = {
+            cls.get_executor().submit(
+                _read_chunks, agent_model, knowledge, source_hash
+            ): (knowledge, source_hash)
+            for knowledge, source_hash in jobs
+        }
+        for future in as_completed(futures):
+            knowledge, source_hash = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # Un proceso murió (p. ej. por memoria): el pool no se
+                    # reutiliza y las fuentes pendientes fallan igual
+                    cls.shutdown()
+                logger.error(f"Error leyendo el conocimiento {knowledge}: {e}")
+                yield knowledge, source_hash, None, e
+                continue
+            yield knowledge, source_hash, result, None
+
+
+atexit.register(KnowledgeParsingService.shutdown)
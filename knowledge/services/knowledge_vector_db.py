@@ -0,0 +1,354 @@
+"""
+Vector DB de conocimiento compartida por tenant.
+
+Todos los fragmentos de un tenant viven en una sola tabla
+(`ia_tenant_documents_{tenant_id}`) etiquetados con `knowledge_id` y
+`tenant_id`. Cada agente busca sólo entre los conocimientos que tiene
+vinculados, así que un conocimiento compartido por varios agentes se embebe
+y se guarda una única vez.
+
+Con `SearchType.hybrid` la búsqueda combina la similitud vectorial con una
+búsqueda de texto completo (`tsvector` con índice GIN) fusionadas por
+reciprocal rank fusion, para no perder términos exactos como los `ID:` de
+los catálogos que genera `ContentFormatterService`.
+
+Los índices ANN filtran después de recorrer el grafo o las listas: con el
+filtro por conocimiento la búsqueda puede devolver menos de `limit` filas.
+Con HNSW y pgvector >= 0.8 se activa el recorrido iterativo; si no, se
+amplían `ef_search` / `probes`.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from agno.document.base import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from agno.vectordb.search import SearchType
+from sqlalchemy import Text, bindparam, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import TSQUERY
+
+from main.engines import get_ia_engine
+from main.settings import (
+    HYBRID_SEARCH_CANDIDATES,
+    HYBRID_SEARCH_RRF_K,
+    KNOWLEDGE_SEARCH_LANGUAGE,
+    VECTOR_FILTERED_EF_SEARCH,
+    VECTOR_FILTERED_PROBES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeVectorDb(PgVector):
+    """
+    PgVector con búsqueda restringida a un conjunto de `knowledge_id`.
+
+    Con `knowledge_ids=None` no se restringe (ingesta); con una lista vacía
+    la búsqueda no devuelve nada.
+    """
+
+    # Versión de pgvector con `*.iterative_scan` (None = sin consultar)
+    _iterative_scan: Optional[bool] = None
+
+    def __init__(self, *args, knowledge_ids: Optional[List[int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.knowledge_ids = knowledge_ids
+
+    @staticmethod
+    def get_table_name(tenant) -> str:
+        return f"ia_tenant_documents_{tenant.id}"
+
+    @staticmethod
+    def get_vector_index(tenant, agent=None) -> Optional[Union[HNSW, Ivfflat]]:
+        """
+        Índice ANN configurado en el tenant.
+
+        Los parámetros de construcción (`m`, `ef_construction`, `lists`) son
+        del tenant porque la tabla es compartida; los de búsqueda
+        (`ef_search`, `probes`) son del agente que consulta.
+        """
+        index_type = tenant.vector_index_type
+        search_params = {}
+        if index_type == "hnsw":
+            if agent is not None:
+                search_params["ef_search"] = agent.vector_search_ef_search
+            return HNSW(
+                m=tenant.vector_index_m,
+                ef_construction=tenant.vector_index_ef_construction,
+                configuration={},
+                **search_params,
+            )
+        if index_type == "ivfflat":
+            if agent is not None:
+                search_params["probes"] = agent.vector_search_probes
+            return Ivfflat(
+                lists=tenant.vector_index_lists or 1,
+                dynamic_lists=not tenant.vector_index_lists,
+                configuration={},
+                **search_params,
+            )
+        return None
+
+    @classmethod
+    def for_tenant(
+        cls, tenant, embedder, knowledge_ids=None, agent=None
+    ) -> "KnowledgeVectorDb":
+        hybrid = agent is not None and agent.retrieval_mode == "hybrid"
+        return cls(
+            table_name=cls.get_table_name(tenant),
+            db_engine=get_ia_engine(),
+            embedder=embedder,
+            search_type=SearchType.hybrid if hybrid else SearchType.vector,
+            vector_index=cls.get_vector_index(tenant, agent),
+            content_language=KNOWLEDGE_SEARCH_LANGUAGE,
+            knowledge_ids=knowledge_ids,
+        )
+
+    @staticmethod
+    def fuse(rankings: List[list], limit: int, k: int = HYBRID_SEARCH_RRF_K) -> list:
+        """
+        Reciprocal rank fusion: cada fila suma 1 / (k + posición) por cada
+        ranking en el que aparece.
+
+        Args:
+            rankings: Listas de filas (con `id`) ordenadas por relevancia
+
+        Returns:
+            list: Las `limit` filas con mayor puntuación
+        """
+        scores, rows = {}, {}
+        for ranking in rankings:
+            for position, row in enumerate(ranking, start=1):
+                scores[row.id] = scores.get(row.id, 0.0) + 1.0 / (k + position)
+                rows.setdefault(row.id, row)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [rows[row_id] for row_id in ranked[:limit]]
+
+    def create(self) -> None:
+        super().create()
+        # Índice de expresión para filtrar por conocimiento
+        with self.Session() as sess, sess.begin():
+            sess.execute(
+                text(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{self.table_name}_knowledge_id" '
+                    f"ON {self.table.fullname} ((meta_data->>'knowledge_id'))"
+                )
+            )
+            # Índice GIN de texto completo; la expresión debe coincidir con
+            # la de `get_keyword_statement` para que se use
+            sess.execute(
+                text(
+                    f'CREATE INDEX IF NOT EXISTS "{self.table_name}_content_gin_index" '
+                    f"ON {self.table.fullname} "
+                    f"USING GIN (to_tsvector({self._ts_config()}, content))"
+                )
+            )
+
+    def vector_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Búsqueda vectorial entre los fragmentos de `knowledge_ids`."""
+        if self.knowledge_ids is not None and not self.knowledge_ids:
+            return []
+
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding:
+            logger.error(f"No se pudo obtener el embedding de la consulta: {query}")
+            return []
+
+        stmt = self.get_search_statement(query_embedding, limit, filters)
+        try:
+            with self.Session() as sess, sess.begin():
+                self.set_search_params(sess, filters)
+                rows = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error en la búsqueda vectorial: {e}")
+            return []
+
+        return self._to_documents(query, rows)
+
+    def keyword_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Búsqueda de texto completo entre los fragmentos de `knowledge_ids`."""
+        if self.knowledge_ids is not None and not self.knowledge_ids:
+            return []
+
+        try:
+            with self.Session() as sess, sess.begin():
+                rows = sess.execute(
+                    self.get_keyword_statement(query, limit, filters)
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"Error en la búsqueda por palabras clave: {e}")
+            return []
+        return self._to_documents(query, rows)
+
+    def hybrid_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """
+        Búsqueda vectorial y por palabras clave fusionadas por rango recíproco.
+
+        Cada búsqueda aporta hasta `HYBRID_SEARCH_CANDIDATES` candidatos. Si
+        no se puede obtener el embedding de la consulta se usan sólo las
+        palabras clave.
+        """
+        if self.knowledge_ids is not None and not self.knowledge_ids:
+            return []
+
+        candidates = max(limit, HYBRID_SEARCH_CANDIDATES)
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding:
+            logger.error(f"No se pudo obtener el embedding de la consulta: {query}")
+
+        try:
+            with self.Session() as sess, sess.begin():
+                keyword_rows = sess.execute(
+                    self.get_keyword_statement(query, candidates, filters)
+                ).fetchall()
+                vector_rows = []
+                if query_embedding:
+                    self.set_search_params(sess, filters)
+                    vector_rows = sess.execute(
+                        self.get_search_statement(query_embedding, candidates, filters)
+                    ).fetchall()
+        except Exception as e:
+            logger.error(f"Error en la búsqueda híbrida: {e}")
+            return []
+
+        return self._to_documents(query, self.fuse([vector_rows, keyword_rows], limit))
+
+    def get_search_statement(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ):
+        """Consulta de los `limit` fragmentos más cercanos al embedding."""
+        table = self.table
+        stmt = self._select_chunks(filters)
+        if self.distance == Distance.l2:
+            order = table.c.embedding.l2_distance(query_embedding)
+        elif self.distance == Distance.max_inner_product:
+            order = table.c.embedding.max_inner_product(query_embedding)
+        else:
+            order = table.c.embedding.cosine_distance(query_embedding)
+        return stmt.order_by(order).limit(limit)
+
+    def set_search_params(self, sess, filters: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Aplica `ef_search`/`probes` a la transacción en curso.
+
+        Si la búsqueda filtra (por conocimiento o `filters`), HNSW activa el
+        recorrido iterativo (pgvector >= 0.8) o, sin él, amplía `ef_search`
+        hasta `VECTOR_FILTERED_EF_SEARCH`; IVFFlat amplía `probes` hasta
+        `VECTOR_FILTERED_PROBES`.
+        """
+        if self.vector_index is None:
+            return
+        filtered = self.knowledge_ids is not None or bool(filters)
+        if isinstance(self.vector_index, Ivfflat):
+            # El recorrido iterativo de IVFFlat sólo admite `relaxed_order`,
+            # que puede desordenar los resultados: se amplían las listas
+            probes = int(self.vector_index.probes)
+            if filtered:
+                probes = max(probes, VECTOR_FILTERED_PROBES)
+            sess.execute(text(f"SET LOCAL ivfflat.probes = {probes}"))
+        elif isinstance(self.vector_index, HNSW):
+            iterative = filtered and self.supports_iterative_scan(sess)
+            ef_search = int(self.vector_index.ef_search)
+            if filtered and not iterative:
+                ef_search = max(ef_search, VECTOR_FILTERED_EF_SEARCH)
+            sess.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+            if iterative:
+                sess.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+
+    @classmethod
+    def supports_iterative_scan(cls, sess) -> bool:
+        """Si la extensión `vector` instalada es >= 0.8 (se consulta una vez)."""
+        if cls._iterative_scan is None:
+            version = sess.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar()
+            try:
+                major, minor = (int(part) for part in str(version).split(".")[:2])
+            except ValueError:
+                major, minor = 0, 0
+            cls._iterative_scan = (major, minor) >= (0, 8)
+        return cls._iterative_scan
+
+    def filter_knowledge(self, stmt):
+        """Restringe la consulta a los fragmentos de `knowledge_ids`."""
+        if self.knowledge_ids is None:
+            return stmt
+        return stmt.where(
+            self.table.c.meta_data["knowledge_id"].astext.in_(
+                [str(knowledge_id) for knowledge_id in self.knowledge_ids]
+            )
+        )
+
+    def get_keyword_statement(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Consulta de los `limit` fragmentos con más términos de la consulta.
+
+        Basta con que aparezca uno de los términos (`plainto_tsquery` exige
+        todos): una pregunta en lenguaje natural sobre un SKU sólo tiene en
+        común con su fragmento el propio identificador.
+        """
+        ts_vector = func.to_tsvector(
+            literal_column(self._ts_config()), self.table.c.content
+        )
+        all_terms = func.plainto_tsquery(
+            literal_column(self._ts_config()), bindparam("query", value=query)
+        )
+        ts_query = cast(func.replace(cast(all_terms, Text), " & ", " | "), TSQUERY)
+        return (
+            self._select_chunks(filters)
+            .where(ts_vector.op("@@")(ts_query))
+            .order_by(func.ts_rank_cd(ts_vector, ts_query).desc())
+            .limit(limit)
+        )
+
+    def _ts_config(self) -> str:
+        if not self.content_language.isidentifier():
+            raise ValueError(
+                f"Configuración de texto inválida: {self.content_language}"
+            )
+        return f"'{self.content_language}'::regconfig"
+
+    def _select_chunks(self, filters: Optional[Dict[str, Any]] = None):
+        table = self.table
+        stmt = select(
+            table.c.id,
+            table.c.name,
+            table.c.meta_data,
+            table.c.content,
+            table.c.embedding,
+            table.c.usage,
+        )
+        stmt = self.filter_knowledge(stmt)
+        if filters is not None:
+            stmt = stmt.where(table.c.meta_data.contains(filters))
+        return stmt
+
+    def _to_documents(self, query: str, rows) -> List[Document]:
+        documents = [
+            Document(
+                id=row.id,
+                name=row.name,
+                meta_data=row.meta_data,
+                content=row.content,
+                embedder=self.embedder,
+                embedding=row.embedding,
+                usage=row.usage,
+            )
+            for row in rows
+        ]
+        if self.reranker:
+            documents = self.reranker.rerank(query=query, documents=documents)
+        return documents
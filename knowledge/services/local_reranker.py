@@ -0,0 +1,104 @@
+"""
+Reranking local de los fragmentos recuperados.
+
+Puntúa los candidatos de la búsqueda con un scorer barato que corre en el
+proceso (TF-IDF o solapamiento de tokens) y sólo pasa al prompt los mejores
+dentro de un presupuesto de tokens: prompts más cortos generan antes.
+"""
+
+import logging
+from typing import List, Optional
+
+from agno.document.base import Document
+from agno.reranker.base import Reranker
+from rapidfuzz import fuzz, utils
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+logger = logging.getLogger(__name__)
+
+# Estimación de tokens por caracteres, suficiente para acotar el prompt
+CHARS_PER_TOKEN = 4
+
+SCORERS = ("tfidf", "rapidfuzz")
+
+
+class LocalReranker(Reranker):
+    """
+    Reordena por relevancia y recorta a `top_n` fragmentos y `token_budget`.
+
+    Los fragmentos se añaden en orden de puntuación mientras quepan en el
+    presupuesto; el mejor se conserva siempre aunque lo supere. A igual
+    puntuación se mantiene el orden de la búsqueda.
+    """
+
+    scorer: str = "tfidf"
+    top_n: int = 3
+    token_budget: Optional[int] = None
+
+    @classmethod
+    def for_agent(cls, agent_model) -> Optional["LocalReranker"]:
+        """Reranker configurado en el agente (None si no usa reranking)."""
+        if agent_model.rerank_scorer not in SCORERS:
+            return None
+        return cls(
+            scorer=agent_model.rerank_scorer,
+            top_n=agent_model.rerank_top_n,
+            token_budget=agent_model.rerank_token_budget or None,
+        )
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        return max(1, len(text or "") // CHARS_PER_TOKEN)
+
+    @staticmethod
+    def score_tfidf(query: str, contents: List[str]) -> List[float]:
+        """Similitud coseno TF-IDF entre la consulta y cada fragmento."""
+        vectorizer = TfidfVectorizer(strip_accents="unicode", sublinear_tf=True)
+        try:
+            matrix = vectorizer.fit_transform([query] + contents)
+        except ValueError:
+            # Ningún término (p. ej. consulta y fragmentos vacíos)
+            return [0.0] * len(contents)
+        # Los vectores de TF-IDF están normalizados: el producto es el coseno
+        return linear_kernel(matrix[0:1], matrix[1:]).ravel().tolist()
+
+    @staticmethod
+    def score_rapidfuzz(query: str, contents: List[str]) -> List[float]:
+        """Solapamiento de tokens (0-100) entre la consulta y cada fragmento."""
+        return [
+            fuzz.token_set_ratio(query, content, processor=utils.default_process)
+            for content in contents
+        ]
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        contents = [document.content or "" for document in documents]
+        if self.scorer == "rapidfuzz":
+            return self.score_rapidfuzz(query, contents)
+        return self.score_tfidf(query, contents)
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return documents
+        try:
+            scores = self.score(query, documents)
+        except Exception as e:
+            logger.warning(f"No se pudo reordenar con {self.scorer}: {e}")
+            scores = [0.0] * len(documents)
+
+        ranked = sorted(zip(scores, documents), key=lambda pair: pair[0], reverse=True)
+        selected, tokens = [], 0
+        for document_score, document in ranked:
+            if len(selected) >= self.top_n:
+                break
+            document_tokens = self.count_tokens(document.content)
+            if (
+                selected
+                and self.token_budget
+                and tokens + document_tokens > self.token_budget
+            ):
+                continue
+            document.reranking_score = float(document_score)
+            selected.append(document)
+            tokens += document_tokens
+        return selected
@@ -1,8 +1,13 @@
-from agno.embedder.google import GeminiEmbedder
+from pathlib import Path
+
+from agno.document.base import Document
+from agno.document.reader.pdf_reader import PDFReader
 from agno.knowledge.pdf import PDFKnowledgeBase
-from agno.vectordb.pgvector import PgVector
+from pypdf import PdfReader
 
-from main.settings import IA_DB, IA_MODEL
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from main.settings import IA_MODEL
 
 
 class PDFDocumentService:
@@ -30,12 +35,43 @@ class PDFDocumentService:
             knowledge_collection.append(
                 PDFKnowledgeBase(
                     path=path,
-                    vector_db=PgVector(
-                        table_name=f"ia_pdf_documents_{agent_model.name}",
-                        db_url=IA_DB,
-                        embedder=GeminiEmbedder(api_key=ia_token),
+                    vector_db=KnowledgeVectorDb.for_tenant(
+                        agent_model.tenant,
+                        EmbeddingCacheService.get_embedder(
+                            ia_token, agent_model.tenant
+                        ),
                     ),
                 )
             )
 
         return knowledge_collection
+
+    @staticmethod
+    def count_pages(path) -> int:
+        """Número de páginas del PDF sin extraer su contenido."""
+        return len(PdfReader(path).pages)
+
+    @staticmethod
+    def read_pages(path, start: int, end: int) -> list:
+        """
+        Lee y fragmenta las páginas [start, end) del PDF.
+
+        Produce los mismos fragmentos que `PDFKnowledgeBase` para esas páginas.
+        El lector se abre en cada llamada para que la caché de objetos de
+        pypdf no crezca con el tamaño del archivo.
+
+        Returns:
+            list: Documents fragmentados, con la página en `meta_data`
+        """
+        reader = PdfReader(path)
+        chunker = PDFReader()
+        doc_name = Path(path).name.split(".")[0]
+        documents = []
+        for page_number in range(start, min(end, len(reader.pages))):
+            page = Document(
+                name=doc_name,
+                meta_data={"page": page_number + 1},
+                content=reader.pages[page_number].extract_text(),
+            )
+            documents.extend(chunker.chunk_document(page))
+        return documents
@@ -1,9 +1,9 @@
 from agno.document.base import Document
-from agno.embedder.google import GeminiEmbedder
 from agno.knowledge.document import DocumentKnowledgeBase
-from agno.vectordb.pgvector import PgVector
 
-from main.settings import IA_DB, IA_MODEL
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from main.settings import IA_MODEL
 
 
 class PlainDocumentService:
@@ -26,9 +26,8 @@ class PlainDocumentService:
 
         return DocumentKnowledgeBase(
             documents=document_objects,
-            vector_db=PgVector(
-                table_name=f"ia_documents_{agent_model.name}",
-                db_url=IA_DB,
-                embedder=GeminiEmbedder(api_key=ia_token),
+            vector_db=KnowledgeVectorDb.for_tenant(
+                agent_model.tenant,
+                EmbeddingCacheService.get_embedder(ia_token, agent_model.tenant),
             ),
         )
@@ -0,0 +1,177 @@
+"""
+Caché de resultados de búsqueda en el conocimiento.
+
+Guarda en Redis (caché de Django) los fragmentos que devolvió la búsqueda de
+un agente para una consulta, de modo que las preguntas repetidas no vuelven
+a pedir el embedding de la consulta ni a recorrer el índice vectorial.
+"""
+
+import hashlib
+import json
+import logging
+import unicodedata
+import uuid
+from typing import Any, Dict, List, Optional
+
+from agno.document.base import Document
+from django.core.cache import cache
+
+from main.settings import RETRIEVAL_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalCacheService:
+    """
+    Resultados de búsqueda de un agente por consulta normalizada.
+
+    La clave combina el agente, la versión de su conocimiento al construir
+    la base de conocimiento y una generación por agente que se renueva
+    (`invalidate`) cuando cambia el contenido indexado de sus conocimientos.
+    Las entradas caducan a los `RETRIEVAL_CACHE_TTL` segundos.
+    """
+
+    def __init__(self, agent_id: int, version: str) -> None:
+        self.agent_id = agent_id
+        self.version = version
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        query = unicodedata.normalize("NFKC", query).lower()
+        return " ".join(query.split()).strip("¿?¡!.,;: ")
+
+    @staticmethod
+    def get_generation_key(agent_id: int) -> str:
+        return f"knowledge:retrieval:generation:{agent_id}"
+
+    def get_key(
+        self,
+        generation: str,
+        query: str,
+        num_documents: Optional[int],
+        filters: Optional[Dict[str, Any]],
+    ) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.normalize(query).encode("utf-8"))
+        digest.update(f"|{num_documents}|".encode())
+        digest.update(json.dumps(filters, sort_keys=True, default=str).encode())
+        return (
+            f"knowledge:retrieval:{self.agent_id}:{generation}:"
+            f"{self.version}:{digest.hexdigest()}"
+        )
+
+    @staticmethod
+    def serialize(documents: List[Document]) -> List[dict]:
+        return [
+            {
+                "id": document.id,
+                "name": document.name,
+                "meta_data": document.meta_data,
+                "content": document.content,
+            }
+            for document in documents
+        ]
+
+    @staticmethod
+    def deserialize(entries: List[dict]) -> List[Document]:
+        return [Document(**entry) for entry in entries]
+
+    def get(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[Document]]:
+        """
+        Fragmentos cacheados para la consulta.
+
+        Returns:
+            list | None: Documentos (sin embedding) o None si no hay entrada
+        """
+        try:
+            generation = cache.get(self.get_generation_key(self.agent_id), "0")
+            entries = cache.get(self.get_key(generation, query, num_documents, filters))
+        except Exception as e:
+            logger.warning(f"Caché de búsquedas no disponible: {e}")
+            return None
+        if entries is None:
+            return None
+        return self.deserialize(entries)
+
+    def set(
+        self,
+        query: str,
+        num_documents: Optional[int],
+        filters: Optional[Dict[str, Any]],
+        documents: List[Document],
+    ) -> None:
+        """Guarda los fragmentos encontrados (una búsqueda vacía no se guarda)."""
+        if not documents:
+            return
+        try:
+            generation = cache.get(self.get_generation_key(self.agent_id), "0")
+            cache.set(
+                self.get_key(generation, query, num_documents, filters),
+                self.serialize(documents),
+                RETRIEVAL_CACHE_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo cachear la búsqueda: {e}")
+
+    async def aget(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Optional[List[Document]]:
+        """Versión asíncrona de `get`."""
+        try:
+            generation = await cache.aget(self.get_generation_key(self.agent_id), "0")
+            entries = await cache.aget(
+                self.get_key(generation, query, num_documents, filters)
+            )
+        except Exception as e:
+            logger.warning(f"Caché de búsquedas no disponible: {e}")
+            return None
+        if entries is None:
+            return None
+        return self.deserialize(entries)
+
+    async def aset(
+        self,
+        query: str,
+        num_documents: Optional[int],
+        filters: Optional[Dict[str, Any]],
+        documents: List[Document],
+    ) -> None:
+        """Versión asíncrona de `set`."""
+        if not documents:
+            return
+        try:
+            generation = await cache.aget(self.get_generation_key(self.agent_id), "0")
+            await cache.aset(
+                self.get_key(generation, query, num_documents, filters),
+                self.serialize(documents),
+                RETRIEVAL_CACHE_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo cachear la búsqueda: {e}")
+
+    @classmethod
+    def invalidate(cls, agent_ids) -> None:
+        """
+        Descarta las búsquedas cacheadas de los agentes indicados.
+
+        Renueva su generación: las entradas anteriores dejan de leerse y
+        caducan por TTL.
+        """
+        generations = {
+            cls.get_generation_key(agent_id): uuid.uuid4().hex
+            for agent_id in set(agent_ids)
+        }
+        if not generations:
+            return
+        try:
+            cache.set_many(generations, None)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar la caché de búsquedas: {e}")
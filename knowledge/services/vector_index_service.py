@@ -0,0 +1,432 @@
+"""
+Gestión de los índices ANN (HNSW / IVFFlat) de las vector DB de conocimiento.
+
+Crea, reconstruye e informa del índice vectorial de la tabla de un tenant
+según su configuración (`TenantModel.vector_index_*`), y mide recall y
+latencia de la búsqueda aproximada frente a una búsqueda exacta.
+"""
+
+import copy
+import logging
+import statistics
+import time
+from math import sqrt
+from typing import List, Optional
+
+import numpy as np
+from agno.embedder.google import GeminiEmbedder
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from sqlalchemy import func, select, text
+
+from knowledge.services.index_lock_service import IndexLockService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from main.settings import VECTOR_INDEX_MAINTENANCE_WORK_MEM
+
+logger = logging.getLogger(__name__)
+
+# Una construcción de índice HNSW de una tabla grande puede durar horas
+VECTOR_INDEX_LOCK_TIMEOUT = 60 * 60 * 6
+
+
+class VectorIndexService:
+    """Índice ANN de una `KnowledgeVectorDb`."""
+
+    def __init__(self, vector_db: KnowledgeVectorDb):
+        self.vector_db = vector_db
+
+    @classmethod
+    def for_tenant(cls, tenant, agent=None) -> "VectorIndexService":
+        """
+        Servicio sobre la tabla del tenant.
+
+        Con `agent`, el benchmark usa sus parámetros de búsqueda y sólo
+        busca entre sus conocimientos, como en el chat.
+        """
+        knowledge_ids = None
+        if agent is not None:
+            knowledge_ids = list(
+                agent.knoledge_text_models.values_list("id", flat=True)
+            )
+        # El embedder sólo aporta las dimensiones de la tabla: no se llama
+        embedder = GeminiEmbedder(api_key=tenant.ai_token)
+        return cls(
+            KnowledgeVectorDb.for_tenant(
+                tenant, embedder, knowledge_ids=knowledge_ids, agent=agent
+            )
+        )
+
+    @staticmethod
+    def get_lists(ivfflat: Ivfflat, rows: int) -> int:
+        """Listas de IVFFlat: las fijadas o, si no, las recomendadas por pgvector."""
+        if not ivfflat.dynamic_lists:
+            return ivfflat.lists
+        if rows < 1000000:
+            return max(rows // 1000, 1)
+        return max(int(sqrt(rows)), 1)
+
+    @staticmethod
+    def parse_options(reloptions: Optional[List[str]]) -> dict:
+        """`['m=16', 'ef_construction=64']` -> `{'m': 16, 'ef_construction': 64}`"""
+        options = {}
+        for option in reloptions or []:
+            key, _, value = option.partition("=")
+            options[key] = int(value) if value.isdigit() else value
+        return options
+
+    def get_index_name(self, index_type: str) -> str:
+        # Mismo nombre que usa PgVector.optimize de agno
+        return f"{self.vector_db.table_name}_{index_type}_index"
+
+    def get_operator_class(self) -> str:
+        return {
+            Distance.l2: "vector_l2_ops",
+            Distance.max_inner_product: "vector_ip_ops",
+        }.get(self.vector_db.distance, "vector_cosine_ops")
+
+    def get_row_count(self) -> int:
+        with self.vector_db.Session() as sess:
+            return sess.execute(
+                select(func.count()).select_from(self.vector_db.table)
+            ).scalar()
+
+    def get_indexes(self) -> List[dict]:
+        """
+        Índices ANN existentes en la tabla.
+
+        Returns:
+            list: Dicts con `name`, `type`, `options` y `size` (bytes)
+        """
+        stmt = text("""
+            SELECT c.relname AS name, am.amname AS type, c.reloptions AS options,
+                   pg_relation_size(c.oid) AS size
+            FROM pg_index x
+            JOIN pg_class c ON c.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE n.nspname = :schema AND t.relname = :table
+              AND am.amname IN ('hnsw', 'ivfflat')
+            ORDER BY c.relname
+            """)
+        with self.vector_db.Session() as sess:
+            rows = sess.execute(
+                stmt,
+                {"schema": self.vector_db.schema, "table": self.vector_db.table_name},
+            ).fetchall()
+        return [
+            {
+                "name": row.name,
+                "type": row.type,
+                "options": self.parse_options(row.options),
+                "size": row.size,
+            }
+            for row in rows
+        ]
+
+    def get_expected(self, rows: int) -> Optional[dict]:
+        """Índice que corresponde a la configuración actual (None = sin índice)."""
+        vector_index = self.vector_db.vector_index
+        if isinstance(vector_index, HNSW):
+            return {
+                "name": self.get_index_name("hnsw"),
+                "type": "hnsw",
+                "options": {
+                    "m": vector_index.m,
+                    "ef_construction": vector_index.ef_construction,
+                },
+            }
+        if isinstance(vector_index, Ivfflat):
+            return {
+                "name": self.get_index_name("ivfflat"),
+                "type": "ivfflat",
+                "options": {"lists": self.get_lists(vector_index, rows)},
+            }
+        return None
+
+    def is_current(self, index: dict, expected: Optional[dict]) -> bool:
+        if expected is None or index["type"] != expected["type"]:
+            return False
+        if index["type"] == "ivfflat" and self.vector_db.vector_index.dynamic_lists:
+            # Las listas automáticas dependen de las filas: vale cualquier valor
+            return True
+        return index["options"] == expected["options"]
+
+    def create_exclusive(self, tenant_id, rebuild: bool = False) -> Optional[dict]:
+        """
+        `create` con el lock del índice del tenant, compartido por la ingesta
+        y la tarea `build_vector_index`.
+
+        Returns:
+            dict: Resultado de `create`, o None si ya hay una construcción en
+                curso para el tenant
+        """
+        lock_key = IndexLockService.vector_index_key(tenant_id)
+        token = IndexLockService.acquire(lock_key, VECTOR_INDEX_LOCK_TIMEOUT)
+        if token is None:
+            logger.info(f"Ya se está construyendo el índice del tenant {tenant_id}")
+            return None
+        try:
+            return self.create(rebuild=rebuild)
+        finally:
+            IndexLockService.release(lock_key, token)
+
+    def create(self, rebuild: bool = False) -> dict:
+        """
+        Crea el índice configurado si falta o, con `rebuild`, lo reconstruye.
+
+        Los índices de otro tipo que el configurado (p. ej. IVFFlat tras
+        pasar el tenant a HNSW) se borran siempre, aunque no se reconstruya.
+
+        El índice se construye con `CREATE INDEX CONCURRENTLY`, fuera de una
+        transacción: las escrituras y búsquedas siguen funcionando mientras
+        tanto. Al reconstruir se construye con un nombre temporal y sólo
+        después se borran los índices anteriores y se renombra, así que las
+        búsquedas nunca se quedan sin índice.
+
+        Returns:
+            dict: `action` (created, rebuilt, dropped, unchanged, skipped),
+                `index` y `seconds`
+        """
+        if not self.vector_db.table_exists():
+            return {"action": "skipped", "index": None, "reason": "no table"}
+
+        rows = self.get_row_count()
+        expected = self.get_expected(rows)
+        indexes = self.get_indexes()
+        stale = [
+            index
+            for index in indexes
+            if expected is None or index["type"] != expected["type"]
+        ]
+        exists = expected is not None and any(
+            index["name"] == expected["name"] for index in indexes
+        )
+        build = expected is not None and (rebuild or not exists)
+        if not build and not stale:
+            return {"action": "unchanged", "index": expected}
+        if build and expected["type"] == "ivfflat" and not rows:
+            # Las listas de IVFFlat se entrenan con las filas existentes
+            return {"action": "skipped", "index": expected, "reason": "empty table"}
+
+        started = time.perf_counter()
+        # CONCURRENTLY no admite transacciones: cada sentencia se confirma sola
+        with self.vector_db.db_engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                {"value": VECTOR_INDEX_MAINTENANCE_WORK_MEM},
+            )
+            name = None
+            if build:
+                name = expected["name"]
+                if exists:
+                    name = self.get_temporary_name(name)
+                # Un CONCURRENTLY interrumpido deja un índice inválido
+                conn.execute(text(self.get_drop_statement(name)))
+                conn.execute(text(self.get_create_statement(expected, name)))
+            dropped = [
+                index["name"]
+                for index in (indexes if rebuild else stale)
+                if index["name"] != name
+            ]
+            for index_name in dropped:
+                conn.execute(text(self.get_drop_statement(index_name)))
+            if name is not None and name != expected["name"]:
+                conn.execute(
+                    text(
+                        f'ALTER INDEX "{self.vector_db.schema}"."{name}" '
+                        f'RENAME TO "{expected["name"]}"'
+                    )
+                )
+        seconds = time.perf_counter() - started
+
+        if build:
+            action = "rebuilt" if dropped else "created"
+        else:
+            action = "dropped" if dropped else "unchanged"
+        logger.info(
+            f"🧭 Índice vectorial de {self.vector_db.table_name}: {action} "
+            f"{expected} en {seconds:.2f}s"
+        )
+        return {"action": action, "index": expected, "seconds": seconds}
+
+    @staticmethod
+    def get_temporary_name(name: str) -> str:
+        # Los identificadores de Postgres tienen como máximo 63 bytes
+        return f"{name[:59]}_new"
+
+    def get_drop_statement(self, name: str) -> str:
+        return f'DROP INDEX CONCURRENTLY IF EXISTS "{self.vector_db.schema}"."{name}"'
+
+    def get_create_statement(self, expected: dict, name: str) -> str:
+        options = ", ".join(
+            f"{key} = {int(value)}" for key, value in expected["options"].items()
+        )
+        return (
+            f'CREATE INDEX CONCURRENTLY "{name}" '
+            f"ON {self.vector_db.table.fullname} "
+            f'USING {expected["type"]} '
+            f"(embedding {self.get_operator_class()}) WITH ({options})"
+        )
+
+    def benchmark(
+        self, samples: int = 20, k: int = 5, filtered: bool = True
+    ) -> Optional[dict]:
+        """
+        Recall@k y latencia de la búsqueda ANN frente a la búsqueda exacta.
+
+        Las consultas son el punto medio de pares de embeddings de la tabla
+        elegidos al azar: no requieren llamar al proveedor y, a diferencia de
+        los propios embeddings, no coinciden con ninguna fila.
+
+        Los agentes siempre filtran por sus conocimientos y el índice filtra
+        después de buscar, así que con `filtered` (y sin agente) se mide
+        también la búsqueda restringida al conocimiento más pequeño, el
+        filtro más selectivo.
+
+        Returns:
+            dict: `recall` medio, latencias p50/p95 en ms de ambas búsquedas,
+                `speedup` (p50 exacta / p50 ANN), `knowledge_ids` y
+                `filtered` (el mismo resultado con filtro o None); None si la
+                tabla está vacía
+        """
+        if not self.vector_db.table_exists():
+            return None
+        result = self._benchmark(samples, k)
+        if result is None:
+            return None
+
+        result["filtered"] = None
+        if filtered and self.vector_db.knowledge_ids is None:
+            knowledge_id = self.get_smallest_knowledge_id(min_rows=max(k, 2))
+            if knowledge_id is not None:
+                vector_db = copy.copy(self.vector_db)
+                vector_db.knowledge_ids = [knowledge_id]
+                result["filtered"] = VectorIndexService(vector_db)._benchmark(
+                    samples, k
+                )
+        return result
+
+    def get_smallest_knowledge_id(self, min_rows: int) -> Optional[str]:
+        """Conocimiento con menos fragmentos (al menos `min_rows`)."""
+        knowledge_id = self.vector_db.table.c.meta_data["knowledge_id"].astext
+        with self.vector_db.Session() as sess:
+            return sess.execute(
+                select(knowledge_id)
+                .where(knowledge_id.is_not(None))
+                .group_by(knowledge_id)
+                .having(func.count() >= min_rows)
+                .order_by(func.count(), knowledge_id)
+                .limit(1)
+            ).scalar()
+
+    def report(
+        self,
+        benchmark: bool = False,
+        samples: int = 20,
+        k: int = 5,
+        filtered: bool = True,
+    ) -> dict:
+        """
+        Estado del índice de la tabla.
+
+        Returns:
+            dict: `table`, `exists`, `rows`, `expected`, `indexes` (cada uno
+                con `current`), `current` y, con `benchmark`, su resultado
+        """
+        report = {
+            "table": self.vector_db.table_name,
+            "exists": self.vector_db.table_exists(),
+            "rows": 0,
+            "expected": None,
+            "indexes": [],
+            "current": False,
+            "benchmark": None,
+        }
+        if not report["exists"]:
+            return report
+
+        report["rows"] = self.get_row_count()
+        report["expected"] = self.get_expected(report["rows"])
+        for index in self.get_indexes():
+            index["current"] = self.is_current(index, report["expected"])
+            report["indexes"].append(index)
+        if report["expected"] is None:
+            report["current"] = not report["indexes"]
+        else:
+            report["current"] = any(
+                index["current"] and index["name"] == report["expected"]["name"]
+                for index in report["indexes"]
+            )
+        if benchmark:
+            report["benchmark"] = self.benchmark(
+                samples=samples, k=k, filtered=filtered
+            )
+        return report
+
+    def _benchmark(self, samples: int, k: int) -> Optional[dict]:
+        with self.vector_db.Session() as sess:
+            vectors = (
+                sess.execute(
+                    self.vector_db.filter_knowledge(
+                        select(self.vector_db.table.c.embedding).where(
+                            self.vector_db.table.c.embedding.is_not(None)
+                        )
+                    )
+                    .order_by(func.random())
+                    .limit(samples * 2)
+                )
+                .scalars()
+                .all()
+            )
+        queries = [
+            ((np.asarray(first) + np.asarray(second)) / 2).tolist()
+            for first, second in zip(vectors[0::2], vectors[1::2])
+        ]
+        if not queries:
+            return None
+
+        recalls, ann_times, exact_times = [], [], []
+        for query in queries:
+            exact_ids, exact_time = self._search(query, k, exact=True)
+            ann_ids, ann_time = self._search(query, k, exact=False)
+            exact_times.append(exact_time)
+            ann_times.append(ann_time)
+            if exact_ids:
+                recalls.append(len(set(ann_ids) & set(exact_ids)) / len(exact_ids))
+
+        ann_p50 = statistics.median(ann_times)
+        exact_p50 = statistics.median(exact_times)
+        return {
+            "samples": len(queries),
+            "k": k,
+            "knowledge_ids": self.vector_db.knowledge_ids,
+            "recall": statistics.mean(recalls) if recalls else None,
+            "ann_p50_ms": ann_p50,
+            "ann_p95_ms": self._percentile(ann_times, 0.95),
+            "exact_p50_ms": exact_p50,
+            "exact_p95_ms": self._percentile(exact_times, 0.95),
+            "speedup": exact_p50 / ann_p50 if ann_p50 else None,
+        }
+
+    def _search(self, query: List[float], k: int, exact: bool):
+        """Ids de los `k` más cercanos y milisegundos que tardó la consulta."""
+        stmt = self.vector_db.get_search_statement(query, limit=k)
+        with self.vector_db.Session() as sess, sess.begin():
+            if exact:
+                # Sin índices de búsqueda: recorrido secuencial (fuerza bruta)
+                sess.execute(text("SET LOCAL enable_indexscan = off"))
+                sess.execute(text("SET LOCAL enable_bitmapscan = off"))
+            else:
+                self.vector_db.set_search_params(sess)
+            started = time.perf_counter()
+            rows = sess.execute(stmt).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+        return [row.id for row in rows], elapsed
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
@@ -0,0 +1,385 @@
+"""
+Crawler asíncrono de sitios web para el conocimiento de categoría website.
+
+Recorre el sitio en anchura con `httpx`: varias páginas en vuelo con un
+límite por host, una frontera de URLs sin repetidos, límites de profundidad y
+de páginas, robots.txt y un presupuesto de tiempo total. Las páginas se
+entregan a medida que se descargan, sin esperar al resto del sitio.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from bs4 import BeautifulSoup
+
+from main.settings import (
+    CRAWLER_HOST_CONCURRENCY,
+    CRAWLER_MAX_IN_FLIGHT,
+    CRAWLER_REQUEST_TIMEOUT,
+    CRAWLER_TIME_BUDGET,
+    CRAWLER_USER_AGENT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Enlaces que no se siguen: no son páginas HTML
+SKIPPED_EXTENSIONS = (
+    ".pdf",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".zip",
+    ".mp3",
+    ".mp4",
+    ".css",
+    ".js",
+)
+
+# Contenedores habituales del contenido principal de una página
+MAIN_CONTENT_CLASSES = ("content", "main-content", "post-content")
+
+
+@dataclass
+class CrawledPage:
+    """Página descargada por el crawler."""
+
+    url: str
+    depth: int
+    html: str
+    text: str
+    title: str = ""
+    links: List[str] = field(default_factory=list)
+    # Cabeceras de validación (ETag, Last-Modified) de la respuesta
+    headers: Dict[str, str] = field(default_factory=dict)
+    # 304: no cambió desde los validadores enviados; 404/410: ya no existe
+    status: int = 200
+    # URL pedida; `url` es la final tras las redirecciones
+    requested_url: str = ""
+
+
+class WebCrawlerService:
+    """
+    Crawl de un sitio a partir de `start_url`.
+
+    Igual que el `WebsiteReader` de agno, la página inicial tiene
+    profundidad 1, `max_links` es el máximo de páginas entregadas y sólo se
+    siguen enlaces del mismo dominio principal. A diferencia de él, no espera
+    entre páginas: la cortesía con el sitio la dan robots.txt y el límite de
+    peticiones simultáneas por host.
+    """
+
+    def __init__(
+        self,
+        start_url: str,
+        max_depth: int = 1,
+        max_links: int = 1,
+        time_budget: float = CRAWLER_TIME_BUDGET,
+        host_concurrency: int = CRAWLER_HOST_CONCURRENCY,
+        max_in_flight: int = CRAWLER_MAX_IN_FLIGHT,
+        user_agent: str = CRAWLER_USER_AGENT,
+        validators: Optional[Dict[str, Dict[str, str]]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.start_url = self.normalize_url(start_url)
+        self.max_depth = max_depth
+        self.max_links = max_links
+        self.time_budget = time_budget
+        self.host_concurrency = host_concurrency
+        self.max_in_flight = max_in_flight
+        self.user_agent = user_agent
+        # URL -> {"etag", "last-modified"} para pedir las páginas condicionalmente
+        self.validators = validators or {}
+        self.transport = transport
+        self.primary_domain = self.get_primary_domain(self.start_url)
+        # True si el último recorrido se cortó por `time_budget`
+        self.truncated = False
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._robots: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """URL sin fragmento y con esquema y host en minúsculas."""
+        url, _ = urldefrag(url)
+        parsed = urlparse(url)
+        return parsed._replace(
+            scheme=parsed.scheme.lower(),
+            netloc=parsed.netloc.lower(),
+            path=parsed.path or "/",
+        ).geturl()
+
+    @staticmethod
+    def get_primary_domain(url: str) -> str:
+        return ".".join((urlparse(url).hostname or "").split(".")[-2:])
+
+    def should_follow(self, url: str) -> bool:
+        parsed = urlparse(url)
+        host = parsed.hostname or ""
+        return (
+            parsed.scheme in ("http", "https")
+            and (
+                host == self.primary_domain or host.endswith(f".{self.primary_domain}")
+            )
+            and not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+        )
+
+    @staticmethod
+    def extract_text(soup: BeautifulSoup) -> str:
+        """Texto visible del contenido principal de la página."""
+        for tag in soup(["script", "style", "noscript", "template"]):
+            tag.decompose()
+        main_content = (
+            soup.find("main")
+            or soup.find("article")
+            or soup.find(class_=list(MAIN_CONTENT_CLASSES))
+            or soup.body
+            or soup
+        )
+        return main_content.get_text(" ", strip=True)
+
+    def extract_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+        links = []
+        for anchor in soup.find_all("a", href=True):
+            href = anchor["href"].strip()
+            if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+                continue
+            url = self.normalize_url(urljoin(base_url, href))
+            if self.should_follow(url):
+                links.append(url)
+        return links
+
+    async def _get_robots(self, client: httpx.AsyncClient, origin: str):
+        """
+        robots.txt de un origen, con el mismo criterio que `RobotFileParser.read`:
+        401/403 prohíben todo, el resto de 4xx lo permiten y cualquier otro
+        error (5xx, red) impide rastrear el origen.
+        """
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = await client.get(parser.url)
+        except httpx.HTTPError as e:
+            logger.warning(f"No se pudo leer {parser.url}: {e}")
+            parser.disallow_all = True
+            return parser
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= response.status_code < 500:
+            parser.allow_all = True
+        elif response.is_success:
+            parser.parse(response.text.splitlines())
+        else:
+            logger.warning(f"{parser.url} respondió {response.status_code}")
+            parser.disallow_all = True
+        return parser
+
+    async def is_allowed(self, client: httpx.AsyncClient, url: str) -> bool:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin not in self._robots:
+            # Las peticiones simultáneas al mismo origen esperan la misma lectura
+            self._robots[origin] = asyncio.ensure_future(
+                self._get_robots(client, origin)
+            )
+        parser = await asyncio.shield(self._robots[origin])
+        return parser.can_fetch(self.user_agent, url)
+
+    def get_conditional_headers(self, url: str) -> Dict[str, str]:
+        validators = self.validators.get(url, {})
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last-modified"):
+            headers["If-Modified-Since"] = validators["last-modified"]
+        return headers
+
+    async def fetch(
+        self, client: httpx.AsyncClient, url: str, depth: int
+    ) -> Optional[CrawledPage]:
+        """
+        Descarga y parsea una página (None si no se puede o no es HTML).
+
+        Si hay validadores para la URL se pide de forma condicional; un 304 y
+        un 404/410 se devuelven como página vacía con su `status`.
+        """
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.setdefault(
+            host, asyncio.Semaphore(self.host_concurrency)
+        )
+        async with semaphore:
+            if not await self.is_allowed(client, url):
+                logger.info(f"🤖 robots.txt no permite {url}")
+                return None
+            try:
+                response = await client.get(
+                    url, headers=self.get_conditional_headers(url)
+                )
+                if response.status_code in (304, 404, 410):
+                    return CrawledPage(
+                        url=url,
+                        depth=depth,
+                        html="",
+                        text="",
+                        headers=self.validators.get(url, {}),
+                        status=response.status_code,
+                        requested_url=url,
+                    )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"No se pudo descargar {url}: {e}")
+                return None
+
+        if "html" not in response.headers.get("content-type", "text/html"):
+            return None
+        final_url = self.normalize_url(str(response.url))
+        html = response.text
+        soup = BeautifulSoup(html, "html.parser")
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        links = self.extract_links(soup, final_url)
+        return CrawledPage(
+            url=final_url,
+            depth=depth,
+            html=html,
+            text=self.extract_text(soup),
+            title=title,
+            links=links,
+            headers={
+                name: response.headers[name]
+                for name in ("etag", "last-modified")
+                if name in response.headers
+            },
+            requested_url=url,
+        )
+
+    async def crawl(self) -> AsyncIterator[CrawledPage]:
+        """
+        Páginas del sitio en el orden en que terminan de descargarse.
+
+        Raises:
+            httpx.RequestError: Si no se pudo obtener ninguna página; así una
+                caída del sitio no borra el conocimiento ya indexado
+        """
+        delivered = 0
+        async for page in self._run([(self.start_url, 1)], self.max_links):
+            if page.status != 200:
+                continue
+            delivered += 1
+            yield page
+
+        if not delivered:
+            raise httpx.RequestError(
+                f"No se pudo extraer contenido de {self.start_url}"
+            )
+
+    async def recheck(self, urls: List[str]) -> AsyncIterator[CrawledPage]:
+        """
+        Vuelve a pedir URLs ya conocidas, con sus validadores y sin seguir
+        enlaces. Entrega también los 304 y 404/410; las que fallan se omiten.
+        """
+        seeds = [(self.normalize_url(url), self.max_depth) for url in urls]
+        async for page in self._run(seeds, len(seeds)):
+            yield page
+
+    async def _run(self, seeds, limit: int) -> AsyncIterator[CrawledPage]:
+        """
+        Recorre la frontera desde `seeds` (URL, profundidad).
+
+        Sólo las páginas descargadas (200) cuentan para `limit` y aportan
+        enlaces a la frontera.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        # Semáforos y lecturas de robots.txt pertenecen al loop de cada recorrido
+        self._host_semaphores, self._robots = {}, {}
+        self.truncated = False
+        frontier = deque(seeds)
+        seen = {url for url, _ in seeds}
+        pending = set()
+        delivered_urls = set()
+        delivered = 0
+
+        async with httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent},
+            timeout=CRAWLER_REQUEST_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_in_flight),
+            transport=self.transport,
+        ) as client:
+            try:
+                while frontier or pending:
+                    while (
+                        frontier
+                        and len(pending) < self.max_in_flight
+                        and delivered + len(pending) < limit
+                    ):
+                        url, depth = frontier.popleft()
+                        pending.add(
+                            asyncio.ensure_future(self.fetch(client, url, depth))
+                        )
+                    if not pending:
+                        break
+
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        self.truncated = True
+                        logger.warning(
+                            f"⏱️ Crawl de {self.start_url} cortado tras "
+                            f"{self.time_budget}s con {delivered} páginas"
+                        )
+                        break
+                    done, pending = await asyncio.wait(
+                        pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for task in done:
+                        page = task.result()
+                        if page is None:
+                            continue
+                        if page.status != 200:
+                            yield page
+                            continue
+                        # Varias URLs pueden redirigir a la misma página
+                        if delivered >= limit or page.url in delivered_urls:
+                            continue
+                        delivered_urls.add(page.url)
+                        seen.add(page.url)
+                        if page.depth < self.max_depth:
+                            for link in page.links:
+                                if link not in seen:
+                                    seen.add(link)
+                                    frontier.append((link, page.depth + 1))
+                        delivered += 1
+                        yield page
+            finally:
+                tasks = [*pending, *self._robots.values()]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def iter_pages(self) -> Iterator[CrawledPage]:
+        """Versión síncrona de `crawl` para la ingesta y las vistas del admin."""
+        return self._iter_sync(self.crawl())
+
+    def iter_recheck(self, urls: List[str]) -> Iterator[CrawledPage]:
+        """Versión síncrona de `recheck`."""
+        return self._iter_sync(self.recheck(urls))
+
+    @staticmethod
+    def _iter_sync(pages: AsyncIterator[CrawledPage]) -> Iterator[CrawledPage]:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.close()
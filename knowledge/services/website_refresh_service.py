@@ -0,0 +1,211 @@
+"""
+Refresco programado de los conocimientos de sitios web.
+
+Vuelve a pedir las páginas ya vistas de cada sitio con GET condicionales
+(ETag / Last-Modified) y compara el simhash de su texto visible con el
+guardado. Sólo si alguna página cambió de verdad, desapareció o apareció se
+marca el conocimiento para recrear; un sitio estático no cuesta más que las
+respuestas 304 y ningún embedding.
+"""
+
+import hashlib
+import logging
+import re
+from collections import Counter
+
+import httpx
+from django.db import transaction
+from django.utils import timezone
+
+from knowledge.models import KnowledgeModel, WebsitePageModel
+from knowledge.services.web_crawler_service import WebCrawlerService
+from main.settings import WEBSITE_REFRESH_SIMHASH_DISTANCE
+
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+# Palabras por shingle: el orden de las palabras también cuenta
+SHINGLE_SIZE = 3
+
+
+class WebsiteRefreshService:
+    """
+    Refresca un KnowledgeModel de categoría website.
+
+    La primera vez sólo se rastrea el sitio y se guardan sus páginas
+    (`WebsitePageModel`) como referencia. A partir de ahí se piden esas
+    páginas de forma condicional y se marca `recreate` si alguna cambió; la
+    reindexación vuelve a rastrear el sitio y sustituye la referencia por
+    las páginas que encontró (`replace_pages`), así que también se vigilan
+    las páginas nuevas enlazadas desde las que cambiaron.
+    """
+
+    def __init__(self, knowledge, transport=None) -> None:
+        self.knowledge = knowledge
+        self.transport = transport
+
+    @staticmethod
+    def simhash(text: str) -> int:
+        """Simhash de 64 bits de los shingles de palabras del texto."""
+        words = re.findall(r"\w+", (text or "").lower())
+        shingles = Counter(
+            " ".join(words[i : i + SHINGLE_SIZE])
+            for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+        )
+        weights = [0] * SIMHASH_BITS
+        for shingle, count in shingles.items():
+            digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "big")
+            for bit in range(SIMHASH_BITS):
+                weights[bit] += count if value >> bit & 1 else -count
+        return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+    @staticmethod
+    def distance(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    def get_crawler(self, validators=None) -> WebCrawlerService:
+        return WebCrawlerService(
+            self.knowledge.url,
+            max_depth=self.knowledge.max_depth,
+            max_links=self.knowledge.max_links,
+            validators=validators,
+            transport=self.transport,
+        )
+
+    @classmethod
+    def build_page(cls, knowledge, page, checked_at) -> WebsitePageModel:
+        """Referencia (sin guardar) de una página descargada."""
+        return WebsitePageModel(
+            knowledge=knowledge,
+            url=page.url,
+            requested_url=page.requested_url,
+            etag=page.headers.get("etag", "")[:255],
+            last_modified=page.headers.get("last-modified", "")[:64],
+            simhash=f"{cls.simhash(page.text):016x}",
+            checked_at=checked_at,
+        )
+
+    @staticmethod
+    def replace_pages(knowledge, pages) -> None:
+        """Sustituye las páginas de referencia por las de un crawl completo."""
+        with transaction.atomic():
+            knowledge.website_pages.all().delete()
+            WebsitePageModel.objects.bulk_create(pages, ignore_conflicts=True)
+
+    def is_baseline(self, pages) -> bool:
+        """
+        Si no hay referencia del sitio actual: la página inicial se busca por
+        la URL pedida, porque puede estar guardada con la URL final de una
+        redirección (http -> https, prefijo de idioma, barra final).
+        """
+        start_url = WebCrawlerService.normalize_url(self.knowledge.url)
+        return not any(start_url in (page.url, page.requested_url) for page in pages)
+
+    def refresh(self) -> dict:
+        """
+        Comprueba las páginas del sitio y marca `recreate` si cambiaron.
+
+        Returns:
+            dict: Páginas sin cambios (304 o texto parecido), cambiadas,
+                nuevas, desaparecidas y guardadas como referencia inicial, y
+                si el conocimiento quedó marcado
+        """
+        stats = {"not_modified": 0, "unchanged": 0, "changed": 0, "new": 0}
+        stats.update({"gone": 0, "baseline": 0, "recreate": False})
+        now = timezone.now()
+        pages = {page.url: page for page in self.knowledge.website_pages.all()}
+
+        if self.is_baseline(pages.values()):
+            # Primera pasada o URL cambiada: se toma el sitio actual como referencia
+            references = [
+                self.build_page(self.knowledge, page, now)
+                for page in self.get_crawler().iter_pages()
+            ]
+            self.replace_pages(self.knowledge, references)
+            stats["baseline"] = len(references)
+            return stats
+
+        validators = {
+            url: {"etag": page.etag, "last-modified": page.last_modified}
+            for url, page in pages.items()
+        }
+        results = self.get_crawler(validators).iter_recheck(list(pages))
+
+        to_create, to_update, gone = [], [], []
+        for result in results:
+            page = pages.get(result.url)
+            if result.status == 304:
+                if page is None:
+                    continue
+                stats["not_modified"] += 1
+                page.checked_at = now
+                to_update.append(page)
+                continue
+            if result.status != 200:
+                if page is not None:
+                    stats["gone"] += 1
+                    gone.append(page.pk)
+                continue
+
+            if page is None:
+                # Una página conocida que ahora redirige a otra URL
+                stats["new"] += 1
+                to_create.append(self.build_page(self.knowledge, result, now))
+                continue
+
+            fingerprint = self.simhash(result.text)
+            if (
+                self.distance(int(page.simhash, 16), fingerprint)
+                > WEBSITE_REFRESH_SIMHASH_DISTANCE
+            ):
+                stats["changed"] += 1
+                page.simhash = f"{fingerprint:016x}"
+            else:
+                stats["unchanged"] += 1
+            page.etag = result.headers.get("etag", "")[:255]
+            page.last_modified = result.headers.get("last-modified", "")[:64]
+            page.checked_at = now
+            to_update.append(page)
+
+        # Operaciones masivas: no pasan por las señales de guardado
+        WebsitePageModel.objects.bulk_create(to_create, ignore_conflicts=True)
+        WebsitePageModel.objects.bulk_update(
+            to_update, ["etag", "last_modified", "simhash", "checked_at"]
+        )
+        WebsitePageModel.objects.filter(pk__in=gone).delete()
+
+        if stats["changed"] or stats["new"] or stats["gone"]:
+            # save() dispara la señal que encola la reindexación
+            self.knowledge.recreate = True
+            self.knowledge.save(update_fields=["recreate", "updated_at"])
+            stats["recreate"] = True
+        return stats
+
+    @classmethod
+    def refresh_all(cls, knowledge_ids=None) -> dict:
+        """
+        Refresca los sitios web vinculados a algún agente.
+
+        Se omiten los que ya esperan reindexación. Un sitio que falla no
+        interrumpe el resto.
+
+        Returns:
+            dict: Estadísticas por id de conocimiento (None si falló)
+        """
+        queryset = KnowledgeModel.objects.filter(
+            category="website", recreate=False, agentmodel__isnull=False
+        ).distinct()
+        if knowledge_ids:
+            queryset = queryset.filter(id__in=knowledge_ids)
+
+        results = {}
+        for knowledge in queryset:
+            try:
+                results[knowledge.id] = cls(knowledge).refresh()
+            except httpx.HTTPError as e:
+                logger.warning(f"No se pudo refrescar {knowledge}: {e}")
+                results[knowledge.id] = None
+                continue
+            logger.info(f"🔄 {knowledge}: {results[knowledge.id]}")
+        return results
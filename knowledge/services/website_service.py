@@ -1,15 +1,73 @@
-from agno.embedder.google import GeminiEmbedder
-from agno.knowledge.website import WebsiteKnowledgeBase
-from agno.vectordb.pgvector import PgVector
+from typing import Any, Iterator, List, Optional
 
-from main.settings import IA_DB, IA_MODEL
+from agno.document import Document
+from agno.knowledge.agent import AgentKnowledge
+from django.utils import timezone
+
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from knowledge.services.web_crawler_service import WebCrawlerService
+from knowledge.services.website_refresh_service import WebsiteRefreshService
+from main.settings import IA_MODEL
+
+
+class CrawledWebsiteKnowledgeBase(AgentKnowledge):
+    """
+    Base de conocimiento de sitios web leída con `WebCrawlerService`.
+
+    Sustituye a la `WebsiteKnowledgeBase` de agno, que descarga las páginas
+    de una en una con pausas entre ellas: aquí `document_lists` entrega los
+    fragmentos de cada página en cuanto se descarga.
+
+    Tras recorrer `document_lists`, `truncated` indica si algún crawl se
+    cortó por `CRAWLER_TIME_BUDGET`: faltan páginas que no han desaparecido.
+    Con `knowledge`, las páginas de un crawl completo pasan a ser la
+    referencia del refresco programado (`WebsiteRefreshService`).
+    """
+
+    urls: List[str] = []
+    max_depth: int = 3
+    max_links: int = 10
+    truncated: bool = False
+    knowledge: Optional[Any] = None
+
+    @property
+    def document_lists(self) -> Iterator[List[Document]]:
+        self.truncated = False
+        for url in self.urls:
+            crawler = WebCrawlerService(
+                url, max_depth=self.max_depth, max_links=self.max_links
+            )
+            references = []
+            for page in crawler.iter_pages():
+                if self.knowledge is not None:
+                    references.append(
+                        WebsiteRefreshService.build_page(
+                            self.knowledge, page, timezone.now()
+                        )
+                    )
+                if not page.text:
+                    continue
+                yield self.chunking_strategy.chunk(
+                    Document(
+                        name=url,
+                        id=page.url,
+                        meta_data={"url": page.url},
+                        content=page.text,
+                    )
+                )
+            self.truncated = self.truncated or crawler.truncated
+            if self.knowledge is not None and not crawler.truncated:
+                WebsiteRefreshService.replace_pages(self.knowledge, references)
 
 
 class WebsiteService:
     """Servicio para gestionar documentos de sitios web."""
 
     @staticmethod
-    def get_knowledge_base(agent_model, urls, ai_token=None):
+    def get_knowledge_base(
+        agent_model, urls, ai_token=None, max_depth=3, max_links=10, knowledge=None
+    ):
         """
         Crea una base de conocimiento para sitios web.
 
@@ -17,18 +75,23 @@ class WebsiteService:
             agent_model: Modelo del agente
             urls: Lista de URLs
             ai_token: Token de IA para el embedder
+            max_depth: Profundidad máxima del crawl de cada URL
+            max_links: Páginas máximas por URL
+            knowledge: KnowledgeModel cuyas páginas de referencia se actualizan
 
         Returns:
-            WebsiteKnowledgeBase: Base de conocimiento para sitios web
+            CrawledWebsiteKnowledgeBase: Base de conocimiento para sitios web
         """
         if not urls:
             return None
 
-        return WebsiteKnowledgeBase(
+        return CrawledWebsiteKnowledgeBase(
             urls=urls,
-            vector_db=PgVector(
-                table_name=f"ia_website_documents_{agent_model.name}",
-                db_url=IA_DB,
-                embedder=GeminiEmbedder(api_key=ai_token),
+            max_depth=max_depth,
+            max_links=max_links,
+            knowledge=knowledge,
+            vector_db=KnowledgeVectorDb.for_tenant(
+                agent_model.tenant,
+                EmbeddingCacheService.get_embedder(ai_token, agent_model.tenant),
             ),
         )
@@ -4,7 +4,13 @@ Signals de la aplicación knowledge.
 
 # Importar signals para que se registren
 from .handle_document_changes import handle_document_changes
+from .handle_knowledge_indexing import (
+    handle_agent_knowledge_links,
+    handle_knowledge_indexing,
+)
 
 __all__ = [
     "handle_document_changes",
+    "handle_knowledge_indexing",
+    "handle_agent_knowledge_links",
 ]
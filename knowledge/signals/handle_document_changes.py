@@ -37,8 +37,14 @@ def handle_document_changes(
             count = related_knowledge_models.count()
             print(f"🧠 Encontrados {count} modelo(s) de conocimiento relacionados")
 
-            # Actualizar todos los modelos relacionados para que necesiten recreación
-            updated_count = related_knowledge_models.update(recreate=True)
+            # Actualizar todos los modelos relacionados para que necesiten recreación.
+            # Se guardan uno a uno para que se emitan las señales que encolan
+            # la indexación de los agentes vinculados.
+            updated_count = 0
+            for knowledge in related_knowledge_models.filter(recreate=False):
+                knowledge.recreate = True
+                knowledge.save()
+                updated_count += 1
 
             print(
                 f"✅ {updated_count} modelo(s) de conocimiento marcados para recreación"
@@ -0,0 +1,58 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from agents.models import AgentModel
+from knowledge.models import KnowledgeModel
+from knowledge.services.retrieval_cache_service import RetrievalCacheService
+from knowledge.tasks import schedule_agents_indexing
+from main.signals import track_model_changes
+
+
+@track_model_changes(KnowledgeModel)
+def handle_knowledge_indexing(
+    sender, instance, created, updated_fields, change_type, **kwargs
+):
+    """
+    Encola la indexación de los agentes vinculados cuando un
+    KnowledgeModel queda marcado con recreate=True.
+
+    Cualquier cambio de `recreate` (marcado o indexación terminada) invalida
+    las búsquedas cacheadas de esos agentes.
+    """
+    if created:
+        # Un conocimiento recién creado todavía no está vinculado a agentes
+        return
+
+    recreate_values = [
+        field_info["new_value"]
+        for field_info in updated_fields
+        if field_info["field"] == "recreate"
+    ]
+    if not recreate_values:
+        return
+
+    agent_ids = list(instance.agentmodel_set.values_list("id", flat=True))
+    RetrievalCacheService.invalidate(agent_ids)
+    if recreate_values[-1] is True:
+        schedule_agents_indexing(agent_ids)
+
+
+@receiver(m2m_changed, sender=AgentModel.knoledge_text_models.through)
+def handle_agent_knowledge_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Reindexa los agentes cuando cambian sus conocimientos vinculados.
+
+    La indexación incremental inserta los vectores de las fuentes nuevas y
+    borra los de las desvinculadas sin recrear el índice.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        agent_ids = [instance.pk]
+    elif pk_set:
+        agent_ids = pk_set
+    else:
+        return
+    RetrievalCacheService.invalidate(agent_ids)
+    schedule_agents_indexing(agent_ids)
@@ -0,0 +1,107 @@
+import logging
+
+from celery import shared_task
+
+from agents.models import AgentModel
+from knowledge.services.document_knowledge_base_service import (
+    DocumentKnowledgeBaseService,
+)
+from knowledge.services.embedding_cache_service import EmbeddingCacheService
+from knowledge.services.index_lock_service import IndexLockService
+from knowledge.services.vector_index_service import VectorIndexService
+from knowledge.services.website_refresh_service import WebsiteRefreshService
+from tenants.models import TenantModel
+
+logger = logging.getLogger(__name__)
+
+INDEX_LOCK_TIMEOUT = 60 * 30
+# Reintentos de una ingesta fallida (p. ej. una fuente que no se pudo leer)
+INDEX_MAX_FAILURES = 3
+INDEX_RETRY_COUNTDOWN = 60
+
+
+@shared_task(bind=True, max_retries=None)
+def index_agent_knowledge(self, agent_id, recreate=False, failures=0):
+    """
+    Indexa el conocimiento del tenant de un agente fuera del request de chat.
+
+    Los agentes de un tenant comparten vector DB, así que sólo se ejecuta una
+    ingesta por tenant a la vez; si ya hay una en curso, la tarea se
+    reprograma. El lock (`IndexLockService`) guarda el id de la tarea y sólo
+    ella lo libera. Si la ingesta falla se reintenta hasta
+    `INDEX_MAX_FAILURES` veces con espera creciente; las fuentes ya indexadas
+    no se vuelven a embeber.
+    """
+    try:
+        agent_model = AgentModel.objects.select_related("tenant").get(id=agent_id)
+    except AgentModel.DoesNotExist:
+        logger.warning(f"Agente {agent_id} no encontrado, se omite la indexación")
+        return
+
+    lock_key = IndexLockService.index_key(agent_model.tenant_id)
+    token = IndexLockService.acquire(lock_key, INDEX_LOCK_TIMEOUT, self.request.id)
+    if token is None:
+        raise self.retry(countdown=30)
+
+    try:
+        DocumentKnowledgeBaseService(agent_model).load_knowledge_base(recreate=recreate)
+    except Exception as e:
+        if failures >= INDEX_MAX_FAILURES:
+            raise
+        logger.warning(f"Falló la indexación del agente {agent_id}, se reintenta: {e}")
+        raise self.retry(
+            exc=e,
+            kwargs={
+                "agent_id": agent_id,
+                "recreate": recreate,
+                "failures": failures + 1,
+            },
+            countdown=INDEX_RETRY_COUNTDOWN * 2**failures,
+        )
+    finally:
+        IndexLockService.release(lock_key, token)
+
+
+@shared_task
+def build_vector_index(tenant_id, rebuild=False):
+    """
+    Crea o reconstruye el índice ANN de la vector DB de un tenant.
+
+    Se ejecuta fuera del request del admin porque la construcción puede
+    tardar mucho; si ya hay una en curso para el tenant, no se lanza otra.
+    """
+    try:
+        tenant = TenantModel.objects.get(id=tenant_id)
+    except TenantModel.DoesNotExist:
+        logger.warning(f"Tenant {tenant_id} no encontrado, se omite el índice")
+        return None
+
+    return VectorIndexService.for_tenant(tenant).create_exclusive(
+        tenant_id, rebuild=rebuild
+    )
+
+
+@shared_task
+def evict_embedding_cache():
+    """Aplica cada hora (celery beat) el límite de la caché de embeddings."""
+    deleted = EmbeddingCacheService.evict()
+    if deleted:
+        logger.info(f"🧹 Caché de embeddings: {deleted} entradas eliminadas")
+    return deleted
+
+
+@shared_task
+def refresh_website_knowledge(knowledge_ids=None):
+    """
+    Refresco periódico (celery beat) de los conocimientos de sitios web.
+
+    Sólo los sitios con páginas que cambiaron quedan marcados para recrear,
+    y es esa marca la que encola su reindexación.
+    """
+    return WebsiteRefreshService.refresh_all(knowledge_ids)
+
+
+def schedule_agents_indexing(agent_ids, recreate=False):
+    """Encola la indexación de cada agente indicado."""
+    for agent_id in set(agent_ids):
+        index_agent_knowledge.delay(agent_id, recreate=recreate)
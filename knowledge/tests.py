@@ -1,3 +1,1028 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+import httpx
+import numpy as np
+import redis
+from agno.document.base import Document
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from sqlalchemy.dialects import postgresql
+
+from knowledge.checks import check_index_lock_cache
+from knowledge.services.content_formatter_service import ContentFormatterService
+from knowledge.services.document_knowledge_base_service import (
+    TimedCombinedKnowledgeBase,
+)
+from knowledge.services.embedding_cache_service import (
+    CachedEmbedder,
+    EmbeddingCacheService,
+)
+from knowledge.services.embedding_scheduler_service import (
+    EmbeddingScheduler,
+    TokenBucket,
+)
+from knowledge.services.index_lock_service import IndexLockService
+from knowledge.services.knowledge_index_service import KnowledgeIndexService
+from knowledge.services.knowledge_parsing_service import KnowledgeParsingService
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from knowledge.services.local_reranker import LocalReranker
+from knowledge.services.retrieval_cache_service import RetrievalCacheService
+from knowledge.services.vector_index_service import (
+    VECTOR_INDEX_LOCK_TIMEOUT,
+    VectorIndexService,
+)
+from knowledge.services.web_crawler_service import WebCrawlerService
+from knowledge.services.website_refresh_service import WebsiteRefreshService
+from main.settings import EMBEDDING_TENANT_RATE_PER_MINUTE
+
+
+class StubEmbedder:
+    id = "stub"
+    dimensions = 2
+
+    def __init__(self):
+        self.calls = []
+
+    def get_embedding(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 1.0]
+
+    def get_embedding_and_usage(self, text):
+        return self.get_embedding(text), {"calls": 1}
+
+
+class FlakyEmbedder(StubEmbedder):
+    """Falla sólo en la primera petición."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def get_embeddings(self, texts):
+        self.batches.append(list(texts))
+        if len(self.batches) == 1:
+            raise ConnectionError("429")
+        return [self.get_embedding(text) for text in texts]
+
+
+class KnowledgeIndexServiceTests(SimpleTestCase):
+    def test_diff_only_inserts_new_and_deletes_removed_chunks(self):
+        indexed = {"a": "1:a", "b": "1:b"}
+        chunks = {"b": Document(content="b"), "c": Document(content="c")}
+
+        new, removed, kept = KnowledgeIndexService.diff(indexed, chunks)
+
+        self.assertEqual(new, ["c"])
+        self.assertEqual(removed, ["1:a"])
+        self.assertEqual(kept, ["1:b"])
+
+    def test_source_hash_changes_with_plain_text(self):
+        knowledge = SimpleNamespace(category="plain_document", text="hola")
+        first = KnowledgeIndexService.get_source_hash(knowledge)
+
+        self.assertEqual(first, KnowledgeIndexService.get_source_hash(knowledge))
+        knowledge.text = "adiós"
+        self.assertNotEqual(first, KnowledgeIndexService.get_source_hash(knowledge))
+
+    def test_incomplete_source_keeps_unseen_rows(self):
+        knowledge = SimpleNamespace(id=5, category="website")
+        service = KnowledgeIndexService(agent_model=None, vector_db=MagicMock())
+        chunks = KnowledgeIndexService.tag_chunks(5, "web", [Document(content="a")])
+        seen = KnowledgeIndexService.hash_content("a")
+        indexed = ({5: {seen: f"5:{seen}", "b": "5:b"}}, {5: {"vieja"}}, [])
+
+        module = "knowledge.services.knowledge_index_service"
+        patch(
+            f"{module}.KnowledgeParsingService.read_chunks",
+            return_value=[(knowledge, "web", (chunks, False), None)],
+        ).start()
+        patch.object(service, "get_indexed", return_value=indexed).start()
+        patch.object(service, "get_source_hash", return_value="web").start()
+        update_source_hash = patch.object(service, "_update_source_hash").start()
+        delete = patch.object(service, "_delete").start()
+        self.addCleanup(patch.stopall)
+
+        stats = service.sync([knowledge], refresh={5})
+
+        delete.assert_called_once_with([])
+        update_source_hash.assert_called_once_with([f"5:{seen}", "5:b"], "web")
+        self.assertEqual(stats["incomplete"], 1)
+
+    def test_failed_source_does_not_block_other_sources(self):
+        failed = SimpleNamespace(id=5, category="website")
+        pdf_document = SimpleNamespace(
+            file=SimpleNamespace(name="catalogo.pdf"),
+            indexed_source_hash="pdf",
+            indexed_pages=0,
+            page_count=None,
+        )
+        pdf = SimpleNamespace(id=6, category="document", document=pdf_document)
+        ok = SimpleNamespace(id=7, category="plain_document")
+        service = KnowledgeIndexService(agent_model=None, vector_db=MagicMock())
+        chunks = KnowledgeIndexService.tag_chunks(7, "txt", [Document(content="a")])
+        indexed = ({5: {"w": "5:w"}, 7: {"b": "7:b"}}, {5: {"web"}}, ["9:x"])
+
+        module = "knowledge.services.knowledge_index_service"
+        patch(
+            f"{module}.KnowledgeParsingService.read_chunks",
+            return_value=[
+                (failed, "web2", None, ConnectionError("timeout")),
+                (ok, "txt", (chunks, True), None),
+            ],
+        ).start()
+        patch.object(service, "get_indexed", return_value=indexed).start()
+        patch.object(
+            service, "get_source_hash", side_effect=lambda knowledge: knowledge.category
+        ).start()
+        patch.object(service, "_sync_pdf", side_effect=OSError("pdf")).start()
+        insert = patch.object(service, "_insert").start()
+        delete = patch.object(service, "_delete").start()
+        self.addCleanup(patch.stopall)
+
+        stats = service.sync([failed, pdf, ok])
+
+        self.assertEqual([doc.content for doc in insert.call_args[0][0]], ["a"])
+        delete.assert_called_once_with(["9:x", "7:b"])
+        self.assertEqual(set(service.failures), {5, 6})
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["inserted"], 1)
+
+    def test_failed_insert_removes_partial_rows(self):
+        knowledge = SimpleNamespace(id=7, category="plain_document")
+        service = KnowledgeIndexService(agent_model=None, vector_db=MagicMock())
+        chunks = KnowledgeIndexService.tag_chunks(7, "txt", [Document(content="a")])
+        new_hash = KnowledgeIndexService.hash_content("a")
+        indexed = ({7: {"b": "7:b"}}, {7: {"vieja"}}, [])
+
+        module = "knowledge.services.knowledge_index_service"
+        patch(
+            f"{module}.KnowledgeParsingService.read_chunks",
+            return_value=[(knowledge, "txt", (chunks, True), None)],
+        ).start()
+        patch.object(service, "get_indexed", return_value=indexed).start()
+        patch.object(service, "get_source_hash", return_value="txt").start()
+        patch.object(
+            service, "_insert", side_effect=ValueError("sin embedding")
+        ).start()
+        delete = patch.object(service, "_delete").start()
+        self.addCleanup(patch.stopall)
+
+        stats = service.sync([knowledge])
+
+        # Se conservan las filas anteriores y se quitan las de la versión nueva
+        delete.assert_called_once_with([f"7:{new_hash}"])
+        self.assertIn(7, service.failures)
+        self.assertEqual(stats["inserted"], 0)
+
+    def test_read_chunks_tags_documents_and_drops_duplicates(self):
+        knowledge = SimpleNamespace(id=7, category="plain_document", text="")
+        source = SimpleNamespace(
+            document_lists=[
+                [Document(content="uno", meta_data={"page": 1})],
+                [Document(content="uno"), Document(content="dos")],
+            ]
+        )
+        service = KnowledgeIndexService(agent_model=None, vector_db=None)
+
+        with patch.object(service, "get_sources", return_value=[source]):
+            chunks, complete = service.read_chunks(knowledge, "fuente")
+
+        self.assertTrue(complete)
+        self.assertEqual(len(chunks), 2)
+        document = chunks[KnowledgeIndexService.hash_content("uno")]
+        self.assertEqual(document.id, f"7:{KnowledgeIndexService.hash_content('uno')}")
+        self.assertEqual(
+            document.meta_data, {"page": 1, "knowledge_id": 7, "source_hash": "fuente"}
+        )
+
+
+class KnowledgeParsingServiceTests(SimpleTestCase):
+    module = "knowledge.services.knowledge_parsing_service"
+
+    def test_daemon_workers_read_without_pool(self):
+        with patch(f"{self.module}.KNOWLEDGE_PARSE_WORKERS", 4), patch(
+            f"{self.module}.multiprocessing.current_process",
+            return_value=SimpleNamespace(daemon=True),
+        ), patch(f"{self.module}._read_chunks", return_value={}), patch.object(
+            KnowledgeParsingService, "get_executor"
+        ) as get_executor:
+            jobs = [("a", "1"), ("b", "2")]
+            results = list(KnowledgeParsingService.read_chunks(None, jobs))
+
+        get_executor.assert_not_called()
+        self.assertEqual(results, [("a", "1", {}, None), ("b", "2", {}, None)])
+
+    def test_read_error_is_reported_per_source(self):
+        error = OSError("no existe")
+        with patch(f"{self.module}.KNOWLEDGE_PARSE_WORKERS", 1), patch(
+            f"{self.module}._read_chunks", side_effect=[error, {}]
+        ):
+            jobs = [("a", "1"), ("b", "2")]
+            results = list(KnowledgeParsingService.read_chunks(None, jobs))
+
+        self.assertEqual(results, [("a", "1", None, error), ("b", "2", {}, None)])
+
+
+class PDFStreamingIndexTests(SimpleTestCase):
+    def test_resumes_from_saved_page_and_deletes_unseen_rows(self):
+        document = SimpleNamespace(
+            pk=3,
+            file=SimpleNamespace(path="/tmp/catalogo.pdf"),
+            indexed_pages=20,
+            indexed_source_hash="nueva",
+        )
+        knowledge = SimpleNamespace(id=5, document=document)
+        service = KnowledgeIndexService(agent_model=None, vector_db=None)
+        resumed_hash = KnowledgeIndexService.hash_content("p1")
+        window = KnowledgeIndexService.tag_chunks(
+            5, "nueva", [Document(content="p21"), Document(content="vieja")]
+        )
+        old_hash = KnowledgeIndexService.hash_content("vieja")
+        current = {old_hash: f"5:{old_hash}", "borrada": "5:borrada"}
+        stats = {"inserted": 0, "unchanged": 0}
+
+        module = "knowledge.services.knowledge_index_service"
+        patch(f"{module}.PDFDocumentService.count_pages", return_value=30).start()
+        patch(f"{module}.DocumentModel").start()
+        read_pdf_pages = patch(
+            f"{module}.KnowledgeParsingService.read_pdf_pages",
+            return_value=[(30, window)],
+        ).start()
+        resumed = [f"5:{resumed_hash}"]
+        patch.object(service, "_get_ids_with_source_hash", return_value=resumed).start()
+        insert = patch.object(service, "_insert").start()
+        update_source_hash = patch.object(service, "_update_source_hash").start()
+        self.addCleanup(patch.stopall)
+
+        removed = service._sync_pdf(knowledge, "nueva", current, stats)
+
+        read_pdf_pages.assert_called_once_with(5, "nueva", "/tmp/catalogo.pdf", 20, 30)
+        self.assertEqual([doc.content for doc in insert.call_args[0][0]], ["p21"])
+        update_source_hash.assert_called_once_with([f"5:{old_hash}"], "nueva")
+        self.assertEqual(removed, ["5:borrada"])
+        self.assertEqual(stats, {"inserted": 1, "unchanged": 2})
+        self.assertEqual(document.indexed_pages, 30)
+
+    def test_interrupted_first_ingest_is_resumed_by_sync(self):
+        document = SimpleNamespace(
+            file=SimpleNamespace(name="catalogo.pdf"),
+            indexed_source_hash="nueva",
+            indexed_pages=20,
+            page_count=30,
+        )
+        knowledge = SimpleNamespace(id=5, category="document", document=document)
+        service = KnowledgeIndexService(agent_model=None, vector_db=MagicMock())
+        # Todas las filas ya tienen la huella nueva: la fuente parece sin cambios
+        indexed = ({5: {"p1": "5:p1"}}, {5: {"nueva"}}, [])
+
+        module = "knowledge.services.knowledge_index_service"
+        patch(f"{module}.KnowledgeParsingService.read_chunks", return_value=[]).start()
+        patch.object(service, "get_indexed", return_value=indexed).start()
+        patch.object(service, "get_source_hash", return_value="nueva").start()
+        patch.object(service, "_delete").start()
+        sync_pdf = patch.object(service, "_sync_pdf", return_value=[]).start()
+        self.addCleanup(patch.stopall)
+
+        stats = service.sync([knowledge])
+
+        sync_pdf.assert_called_once_with(knowledge, "nueva", {"p1": "5:p1"}, stats)
+        self.assertEqual(stats["skipped"], 0)
+
+        document.indexed_pages = 30
+        stats = service.sync([knowledge])
+
+        self.assertEqual(sync_pdf.call_count, 1)
+        self.assertEqual(stats["skipped"], 1)
+
+
+class CachedEmbedderTests(SimpleTestCase):
+    def setUp(self):
+        self.stored = {}
+        get_many = patch.object(
+            EmbeddingCacheService,
+            "get_many",
+            side_effect=lambda embedder_id, dimensions, hashes: {
+                h: self.stored[h] for h in hashes if h in self.stored
+            },
+        )
+        set_many = patch.object(
+            EmbeddingCacheService,
+            "set_many",
+            side_effect=lambda embedder_id, dimensions, values: self.stored.update(
+                values
+            ),
+        )
+        get_many.start()
+        set_many.start()
+        self.addCleanup(patch.stopall)
+
+    def test_only_misses_reach_the_provider(self):
+        stub = StubEmbedder()
+        embedder = CachedEmbedder(embedder=stub)
+        self.stored[EmbeddingCacheService.hash_text("hola")] = [9.0, 9.0]
+
+        result = embedder.get_embeddings(["hola", "mundo", "mundo"])
+
+        self.assertEqual(result, [[9.0, 9.0], [5.0, 1.0], [5.0, 1.0]])
+        self.assertEqual(stub.calls, ["mundo"])
+        self.assertEqual(embedder.id, "StubEmbedder:stub")
+        self.assertEqual(embedder.dimensions, 2)
+
+    def test_prefetched_embeddings_are_used_by_document_embed(self):
+        stub = StubEmbedder()
+        embedder = CachedEmbedder(embedder=stub)
+        embedder.get_embeddings(["uno"])
+        document = Document(content="uno")
+
+        document.embed(embedder=embedder)
+
+        self.assertEqual(document.embedding, [3.0, 1.0])
+        self.assertEqual(stub.calls, ["uno"])
+
+    def test_single_embedding_goes_through_the_scheduler(self):
+        embedder = CachedEmbedder(
+            embedder=FlakyEmbedder(),
+            scheduler=EmbeddingScheduler(
+                FlakyEmbedder(), max_in_flight=1, attempts=1, backoff=0
+            ),
+        )
+
+        with self.assertRaises(ValueError):
+            embedder.get_embedding_and_usage("uno")
+        self.assertEqual(embedder.get_embedding_and_usage("uno"), ([3.0, 1.0], None))
+        self.assertIn(EmbeddingCacheService.hash_text("uno"), self.stored)
+
+    def test_insert_fails_before_dropping_chunks_without_embedding(self):
+        vector_db = MagicMock()
+        vector_db.embedder = CachedEmbedder(
+            embedder=FlakyEmbedder(),
+            scheduler=EmbeddingScheduler(
+                FlakyEmbedder(), max_in_flight=1, attempts=1, backoff=0
+            ),
+        )
+        service = KnowledgeIndexService(
+            agent_model=SimpleNamespace(tenant_id=1), vector_db=vector_db
+        )
+
+        with self.assertRaises(ValueError):
+            service._insert([Document(content="uno")])
+        vector_db.insert.assert_not_called()
+
+
+class EmbeddingCacheServiceTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch(
+            "knowledge.services.embedding_cache_service.EmbeddingCacheModel"
+        )
+        self.model = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookups_only_touch_entries_not_used_recently(self):
+        now = timezone.now()
+        vector = np.asarray([1.0, 2.0], dtype=np.float32).tobytes()
+        self.model.objects.filter.return_value.values_list.return_value = [
+            (1, "fresco", vector, now - timedelta(minutes=5)),
+            (2, "viejo", vector, now - timedelta(days=3)),
+        ]
+
+        found = EmbeddingCacheService.get_many("stub", 2, ["fresco", "viejo"])
+
+        self.assertEqual(found, {"fresco": [1.0, 2.0], "viejo": [1.0, 2.0]})
+        self.model.objects.filter.assert_called_with(id__in=[2])
+
+    def test_eviction_skips_the_scan_below_the_limit(self):
+        self.model.objects.count.return_value = 10
+
+        self.assertEqual(EmbeddingCacheService.evict(max_entries=10), 0)
+        self.model.objects.order_by.assert_not_called()
+
+    def test_eviction_deletes_only_the_excess(self):
+        self.model.objects.count.return_value = 13
+        oldest = self.model.objects.order_by.return_value.values_list.return_value
+        oldest.__getitem__.return_value = [4, 5, 6]
+        self.model.objects.filter.return_value.delete.return_value = (3, {})
+
+        self.assertEqual(EmbeddingCacheService.evict(max_entries=10), 3)
+        self.model.objects.order_by.assert_called_once_with("last_used_at")
+        oldest.__getitem__.assert_called_once_with(slice(None, 3))
+        self.model.objects.filter.assert_called_once_with(id__in=[4, 5, 6])
+
+
+class EmbeddingSchedulerTests(SimpleTestCase):
+    def test_batches_keep_order_and_retry_failures(self):
+        embedder = FlakyEmbedder()
+        scheduler = EmbeddingScheduler(
+            embedder, batch_size=2, max_in_flight=1, attempts=3, backoff=0
+        )
+
+        result = scheduler.embed(["a", "bb", "ccc"])
+
+        self.assertEqual(result, [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]])
+        self.assertEqual(embedder.batches, [["a", "bb"], ["a", "bb"], ["ccc"]])
+
+    def test_concurrent_batches_keep_order(self):
+        texts = ["x" * n for n in range(1, 11)]
+        scheduler = EmbeddingScheduler(StubEmbedder(), batch_size=3, max_in_flight=4)
+
+        result = scheduler.embed(texts)
+
+        self.assertEqual([vector[0] for vector in result], list(range(1, 11)))
+
+    def test_failed_batch_returns_empty_embeddings(self):
+        embedder = FlakyEmbedder()
+        scheduler = EmbeddingScheduler(
+            embedder, batch_size=5, max_in_flight=1, attempts=1, backoff=0
+        )
+
+        self.assertEqual(scheduler.embed(["a", "b"]), [[], []])
+
+    def test_token_bucket_waits_when_empty(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+
+        self.assertEqual(bucket.acquire(10), 0.0)
+        self.assertGreater(bucket.acquire(5), 0.0)
+
+    def test_tenant_bucket_lives_in_redis_with_tenant_rate(self):
+        client = MagicMock()
+        script = client.register_script.return_value
+        script.return_value = b"0"
+        tenant = SimpleNamespace(id=4, embedding_rate_per_minute=600)
+
+        with patch.object(EmbeddingScheduler, "get_redis", return_value=client):
+            bucket = EmbeddingScheduler.get_bucket(tenant)
+            self.assertEqual(bucket.acquire(3), 0.0)
+
+        script.assert_called_once_with(
+            keys=["embeddings:rate:tenant:4"], args=[10.0, bucket.capacity, 3]
+        )
+
+    def test_tenant_bucket_falls_back_to_process_without_redis(self):
+        client = MagicMock()
+        client.register_script.return_value.side_effect = redis.ConnectionError()
+        tenant = SimpleNamespace(id=5, embedding_rate_per_minute=None)
+
+        with patch.object(EmbeddingScheduler, "get_redis", return_value=client):
+            bucket = EmbeddingScheduler.get_bucket(tenant)
+            with patch.object(bucket.fallback, "acquire", return_value=0.0) as acquire:
+                bucket.acquire(2)
+
+        acquire.assert_called_once_with(2)
+        self.assertEqual(bucket.rate, EMBEDDING_TENANT_RATE_PER_MINUTE / 60)
+
+
+class KnowledgeVectorDbTests(SimpleTestCase):
+    def get_vector_db(self, knowledge_ids):
+        return KnowledgeVectorDb(
+            table_name="ia_tenant_documents_1",
+            db_url="postgresql+psycopg://ai:ai@localhost:5532/ai",
+            embedder=StubEmbedder(),
+            knowledge_ids=knowledge_ids,
+        )
+
+    def test_search_is_limited_to_linked_knowledge(self):
+        vector_db = self.get_vector_db([3, 8])
+        session = MagicMock()
+        vector_db.Session = MagicMock(return_value=session)
+        session.__enter__.return_value = session
+
+        self.assertEqual(vector_db.vector_search("hola"), [])
+
+        statement = session.execute.call_args_list[-1][0][0]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.assertIn("meta_data ->>", str(compiled))
+        self.assertIn(["3", "8"], list(compiled.params.values()))
+
+    def test_agent_without_knowledge_does_not_search(self):
+        embedder = StubEmbedder()
+        vector_db = self.get_vector_db([])
+        vector_db.embedder = embedder
+
+        self.assertEqual(vector_db.vector_search("hola"), [])
+        self.assertEqual(embedder.calls, [])
+
+    def test_keyword_search_matches_any_term_with_the_gin_expression(self):
+        vector_db = self.get_vector_db([3])
+
+        statement = vector_db.get_keyword_statement("precio del SKU-12345")
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        self.assertIn("to_tsvector('english'::regconfig, ", sql)
+        self.assertIn("@@ CAST(replace(CAST(plainto_tsquery(", sql)
+
+    def test_hybrid_search_fuses_vector_and_keyword_rankings(self):
+        vector_db = self.get_vector_db([3])
+
+        def row(row_id):
+            return SimpleNamespace(
+                id=row_id,
+                name="catalogo",
+                meta_data={},
+                content=row_id,
+                embedding=None,
+                usage=None,
+            )
+
+        session = MagicMock()
+        session.__enter__.return_value = session
+        session.execute.return_value.fetchall.side_effect = [
+            [row("sku-12345")],
+            [row("a"), row("b"), row("sku-12345")],
+        ]
+        vector_db.Session = MagicMock(return_value=session)
+
+        documents = vector_db.hybrid_search("¿precio del SKU-12345?", limit=2)
+
+        self.assertEqual([doc.id for doc in documents], ["sku-12345", "a"])
+
+
+class VectorIndexServiceTests(SimpleTestCase):
+    def get_service(self, index_type, lists=None):
+        tenant = SimpleNamespace(
+            id=1,
+            vector_index_type=index_type,
+            vector_index_m=24,
+            vector_index_ef_construction=100,
+            vector_index_lists=lists,
+        )
+        agent = SimpleNamespace(vector_search_ef_search=80, vector_search_probes=7)
+        vector_db = KnowledgeVectorDb(
+            table_name=KnowledgeVectorDb.get_table_name(tenant),
+            db_url="postgresql+psycopg://ai:ai@localhost:5532/ai",
+            embedder=StubEmbedder(),
+            vector_index=KnowledgeVectorDb.get_vector_index(tenant, agent),
+        )
+        return VectorIndexService(vector_db)
+
+    def test_index_uses_tenant_build_and_agent_search_params(self):
+        hnsw = self.get_service("hnsw").vector_db.vector_index
+        ivfflat = self.get_service("ivfflat").vector_db.vector_index
+
+        self.assertIsInstance(hnsw, HNSW)
+        self.assertEqual((hnsw.m, hnsw.ef_construction, hnsw.ef_search), (24, 100, 80))
+        self.assertIsInstance(ivfflat, Ivfflat)
+        self.assertTrue(ivfflat.dynamic_lists)
+        self.assertEqual(ivfflat.probes, 7)
+        self.assertIsNone(self.get_service("none").vector_db.vector_index)
+
+    def test_existing_index_is_stale_when_params_change(self):
+        service = self.get_service("hnsw")
+        expected = service.get_expected(rows=10)
+        index = {
+            "name": "ia_tenant_documents_1_hnsw_index",
+            "type": "hnsw",
+            "options": VectorIndexService.parse_options(["m=16", "ef_construction=64"]),
+        }
+
+        self.assertEqual(expected["name"], index["name"])
+        self.assertFalse(service.is_current(index, expected))
+        index["options"] = {"m": 24, "ef_construction": 100}
+        self.assertTrue(service.is_current(index, expected))
+
+    def test_rebuild_builds_concurrently_before_dropping_old_index(self):
+        service = self.get_service("hnsw")
+        old_index = {"name": "ia_tenant_documents_1_hnsw_index", "type": "hnsw"}
+        conn = MagicMock()
+        engine = MagicMock()
+        engine.connect.return_value.execution_options.return_value = conn
+        conn.__enter__.return_value = conn
+        service.vector_db.db_engine = engine
+
+        with patch.object(
+            service.vector_db, "table_exists", return_value=True
+        ), patch.object(service, "get_row_count", return_value=10), patch.object(
+            service, "get_indexes", return_value=[old_index]
+        ):
+            result = service.create(rebuild=True)
+
+        statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+        self.assertEqual(result["action"], "rebuilt")
+        engine.connect.return_value.execution_options.assert_called_once_with(
+            isolation_level="AUTOCOMMIT"
+        )
+        self.assertIn("maintenance_work_mem", statements[0])
+        self.assertIn(
+            'IF EXISTS "ai"."ia_tenant_documents_1_hnsw_index_new"', statements[1]
+        )
+        self.assertTrue(
+            statements[2].startswith(
+                'CREATE INDEX CONCURRENTLY "ia_tenant_documents_1_hnsw_index_new"'
+            )
+        )
+        self.assertIn(
+            'CONCURRENTLY IF EXISTS "ai"."ia_tenant_documents_1_hnsw_index"',
+            statements[3],
+        )
+        self.assertTrue(
+            statements[4].endswith('RENAME TO "ia_tenant_documents_1_hnsw_index"')
+        )
+
+    def test_index_of_another_type_is_dropped_without_rebuild(self):
+        service = self.get_service("hnsw")
+        old_index = {"name": "ia_tenant_documents_1_ivfflat_index", "type": "ivfflat"}
+        conn = MagicMock()
+        engine = MagicMock()
+        engine.connect.return_value.execution_options.return_value = conn
+        conn.__enter__.return_value = conn
+        service.vector_db.db_engine = engine
+
+        with patch.object(
+            service.vector_db, "table_exists", return_value=True
+        ), patch.object(service, "get_row_count", return_value=10), patch.object(
+            service, "get_indexes", return_value=[old_index]
+        ):
+            result = service.create()
+
+        statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+        self.assertEqual(result["action"], "rebuilt")
+        self.assertTrue(
+            statements[2].startswith(
+                'CREATE INDEX CONCURRENTLY "ia_tenant_documents_1_hnsw_index"'
+            )
+        )
+        self.assertIn(
+            'IF EXISTS "ai"."ia_tenant_documents_1_ivfflat_index"', statements[3]
+        )
+        self.assertEqual(len(statements), 4)
+
+    def test_ingestion_skips_the_index_while_it_is_being_built(self):
+        service = self.get_service("hnsw")
+        module = "knowledge.services.vector_index_service"
+        with patch(
+            f"{module}.IndexLockService.acquire", return_value=None
+        ) as acquire, patch.object(service, "create") as create:
+            self.assertIsNone(service.create_exclusive(1))
+
+        acquire.assert_called_once_with(
+            "knowledge:vector_index:tenant:1", VECTOR_INDEX_LOCK_TIMEOUT
+        )
+        create.assert_not_called()
+
+    def test_filtered_search_widens_or_iterates_hnsw_scan(self):
+        vector_db = self.get_service("hnsw").vector_db
+        sess = MagicMock()
+
+        def executed():
+            statements = [str(call.args[0]) for call in sess.execute.call_args_list]
+            sess.reset_mock()
+            return statements
+
+        with patch.object(KnowledgeVectorDb, "_iterative_scan", True):
+            vector_db.set_search_params(sess)
+            self.assertEqual(executed(), ["SET LOCAL hnsw.ef_search = 80"])
+
+            vector_db.knowledge_ids = [3]
+            vector_db.set_search_params(sess)
+            self.assertEqual(
+                executed(),
+                [
+                    "SET LOCAL hnsw.ef_search = 80",
+                    "SET LOCAL hnsw.iterative_scan = strict_order",
+                ],
+            )
+
+        with patch.object(KnowledgeVectorDb, "_iterative_scan", False):
+            vector_db.set_search_params(sess)
+            self.assertEqual(executed(), ["SET LOCAL hnsw.ef_search = 200"])
+
+    def test_ivfflat_lists_follow_pgvector_recommendation(self):
+        dynamic = self.get_service("ivfflat").vector_db.vector_index
+        fixed = self.get_service("ivfflat", lists=50).vector_db.vector_index
+
+        self.assertEqual(VectorIndexService.get_lists(dynamic, 500), 1)
+        self.assertEqual(VectorIndexService.get_lists(dynamic, 200000), 200)
+        self.assertEqual(VectorIndexService.get_lists(dynamic, 4000000), 2000)
+        self.assertEqual(VectorIndexService.get_lists(fixed, 200000), 50)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class RetrievalCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.vector_db = MagicMock(spec=KnowledgeVectorDb)
+        self.vector_db.search.return_value = [
+            Document(id="7:abc", name="catalogo", content="SKU-1", meta_data={})
+        ]
+        self.knowledge_base = TimedCombinedKnowledgeBase(
+            sources=[],
+            vector_db=self.vector_db,
+            retrieval_cache=RetrievalCacheService(agent_id=1, version="v1"),
+        )
+
+    def test_repeated_query_skips_the_vector_db(self):
+        first = self.knowledge_base.search("¿Precio del  SKU-1?")
+        second = self.knowledge_base.search("precio del sku-1")
+
+        self.assertEqual(self.vector_db.search.call_count, 1)
+        self.assertEqual([doc.id for doc in second], [doc.id for doc in first])
+        self.assertEqual(second[0].content, "SKU-1")
+
+    def test_invalidation_forces_a_new_search(self):
+        self.knowledge_base.search("precio del sku-1")
+
+        RetrievalCacheService.invalidate([1])
+        self.knowledge_base.search("precio del sku-1")
+
+        self.assertEqual(self.vector_db.search.call_count, 2)
+
+
+class LocalRerankerTests(SimpleTestCase):
+    def setUp(self):
+        self.documents = [
+            Document(id="1", content="Horario de atención de lunes a viernes " * 20),
+            Document(id="2", content="ID: SKU-12345 | Precio: 19.90 | Stock: 4"),
+            Document(id="3", content="Política de devoluciones y garantía"),
+        ]
+
+    def test_scorers_promote_the_matching_chunk(self):
+        for scorer in ("tfidf", "rapidfuzz"):
+            reranker = LocalReranker(scorer=scorer, top_n=1)
+
+            selected = reranker.rerank("precio del SKU-12345", list(self.documents))
+
+            self.assertEqual([doc.id for doc in selected], ["2"], scorer)
+
+    def test_token_budget_skips_chunks_that_do_not_fit(self):
+        reranker = LocalReranker(scorer="tfidf", top_n=3, token_budget=30)
+
+        selected = reranker.rerank("precio y devoluciones", list(self.documents))
+
+        self.assertEqual({doc.id for doc in selected}, {"2", "3"})
+        self.assertLessEqual(
+            sum(LocalReranker.count_tokens(doc.content) for doc in selected), 30
+        )
+
+
+class CSVMarkdownTests(SimpleTestCase):
+    def test_rows_are_streamed_with_resolved_id_column(self):
+        source = io.StringIO('nombre,ID,precio\na,7,"1,5"\nb,,2\n')
+        output = io.StringIO()
+
+        stats = ContentFormatterService.write_csv_markdown(source, "Precios", output)
+
+        self.assertEqual(stats, {"rows": 2, "columns": 3})
+        markdown = output.getvalue()
+        self.assertIn("### ID:7\n- nombre: a\n- precio: 1,5\n\n", markdown)
+        self.assertIn("### ID:2\n- nombre: b\n- precio: 2\n\n", markdown)
+        self.assertIn("- **Total de filas:** 2\n", markdown)
+        self.assertEqual(
+            ContentFormatterService.csv_to_markdown(source.getvalue(), "Precios"),
+            markdown,
+        )
+
+
+class JSONMarkdownTests(SimpleTestCase):
+    def test_array_is_parsed_item_by_item_without_raw_copy(self):
+        items = [{"id": 7, "nombre": "Agua", "precio": 800}, {"nombre": "Té"}]
+        stream = io.StringIO(json.dumps(items, ensure_ascii=False))
+        output = io.StringIO()
+
+        parsed = ContentFormatterService.parse_json_stream(stream, chunk_size=4)
+        stats = ContentFormatterService.write_json_markdown(parsed, "Bebidas", output)
+
+        self.assertEqual(stats, {"items": 2})
+        self.assertEqual(
+            output.getvalue(),
+            "# Bebidas\n\n### ID:7\n- nombre: Agua\n- precio: 800\n\n"
+            "### ID:2\n- nombre: Té\n\n",
+        )
+        self.assertIn(
+            "Datos originales en JSON",
+            ContentFormatterService.json_to_markdown(items, "Bebidas", True),
+        )
+
+    def test_values_split_across_chunks_are_not_truncated(self):
+        text = '[1.5, 2.25, -3e2, true, null, "a,b", {"x": [10, 20]}, 123456]'
+        for chunk_size in range(1, len(text) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                parsed = ContentFormatterService.parse_json_stream(
+                    io.StringIO(text), chunk_size=chunk_size
+                )
+                self.assertEqual(list(parsed), json.loads(text))
+
+
+class WebCrawlerTests(SimpleTestCase):
+    PAGES = {
+        "/": '<a href="/a">a</a><a href="/b#x">b</a><a href="/privado">p</a>'
+        '<a href="https://otro.com/">fuera</a><main>Inicio</main>',
+        "/a": '<a href="/">inicio</a><a href="/a/profunda">p</a><main>A</main>',
+        "/b": '<a href="/a">a</a><main>B</main>',
+        "/a/profunda": "<main>Profunda</main>",
+        "/privado": "<main>Privado</main>",
+    }
+
+    def setUp(self):
+        self.requested = []
+
+    def handler(self, request):
+        path = request.url.path
+        self.requested.append(path)
+        if path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nDisallow: /privado\n")
+        if path not in self.PAGES:
+            return httpx.Response(404)
+        return httpx.Response(
+            200,
+            html=self.PAGES[path],
+            headers={"ETag": f'"{path}"'},
+        )
+
+    def crawl(self, max_depth, max_links):
+        crawler = WebCrawlerService(
+            "https://ayuda.ejemplo.com",
+            max_depth=max_depth,
+            max_links=max_links,
+            transport=httpx.MockTransport(self.handler),
+        )
+        return {page.url: page for page in crawler.iter_pages()}
+
+    def test_depth_robots_and_dedup(self):
+        pages = self.crawl(max_depth=2, max_links=10)
+
+        self.assertEqual(
+            sorted(pages),
+            [
+                "https://ayuda.ejemplo.com/",
+                "https://ayuda.ejemplo.com/a",
+                "https://ayuda.ejemplo.com/b",
+            ],
+        )
+        self.assertEqual(pages["https://ayuda.ejemplo.com/b"].text, "B")
+        self.assertEqual(pages["https://ayuda.ejemplo.com/a"].headers["etag"], '"/a"')
+        self.assertEqual(self.requested.count("/robots.txt"), 1)
+        self.assertNotIn("/privado", self.requested)
+        self.assertEqual(self.requested.count("/a"), 1)
+
+    def test_max_links_limits_delivered_pages(self):
+        self.assertEqual(len(self.crawl(max_depth=3, max_links=2)), 2)
+
+    def test_time_budget_marks_the_crawl_as_truncated(self):
+        async def handler(request):
+            if request.url.path not in ("/", "/robots.txt"):
+                await asyncio.sleep(1)
+            return self.handler(request)
+
+        crawler = WebCrawlerService(
+            "https://ayuda.ejemplo.com",
+            max_depth=3,
+            max_links=10,
+            time_budget=0.2,
+            transport=httpx.MockTransport(handler),
+        )
+        pages = list(crawler.iter_pages())
+
+        self.assertEqual([page.url for page in pages], ["https://ayuda.ejemplo.com/"])
+        self.assertTrue(crawler.truncated)
+
+
+class WebsiteRefreshTests(SimpleTestCase):
+    TEXT = " ".join(f"palabra{i}" for i in range(300))
+
+    def test_simhash_ignores_small_edits(self):
+        base = WebsiteRefreshService.simhash(self.TEXT)
+        edited = WebsiteRefreshService.simhash(self.TEXT + "actualizado")
+        other = WebsiteRefreshService.simhash("Nueva carta de postres y bebidas")
+
+        self.assertLessEqual(WebsiteRefreshService.distance(base, edited), 3)
+        self.assertGreater(WebsiteRefreshService.distance(base, other), 3)
+
+    @patch("knowledge.services.website_refresh_service.WebsitePageModel.objects")
+    def test_only_changed_pages_mark_recreate(self, objects):
+        simhash = f"{WebsiteRefreshService.simhash(self.TEXT):016x}"
+        pages = [
+            SimpleNamespace(
+                pk=pk,
+                url=url,
+                requested_url=url,
+                etag=etag,
+                last_modified="",
+                simhash=simhash,
+            )
+            for pk, url, etag in [
+                (1, "https://ejemplo.com/", '"1"'),
+                (2, "https://ejemplo.com/b", ""),
+            ]
+        ]
+        knowledge = MagicMock(url="https://ejemplo.com", max_depth=2, max_links=10)
+        knowledge.website_pages.all.return_value = pages
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.url.path == "/robots.txt":
+                return httpx.Response(404)
+            if request.headers.get("If-None-Match") == '"1"':
+                return httpx.Response(304)
+            return httpx.Response(200, html=f"<main>{self.TEXT} postres</main>")
+
+        service = WebsiteRefreshService(knowledge, httpx.MockTransport(handler))
+        stats = service.refresh()
+
+        self.assertEqual((stats["not_modified"], stats["unchanged"]), (1, 1))
+        self.assertFalse(stats["recreate"])
+        knowledge.save.assert_not_called()
+        self.assertEqual(len(requests), 3)
+
+        changed = "<main>Nueva carta de postres y bebidas</main>"
+        service.transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, html=changed)
+        )
+        self.assertTrue(service.refresh()["recreate"])
+        self.assertTrue(knowledge.recreate)
+
+    @patch("knowledge.services.website_refresh_service.transaction")
+    @patch("knowledge.services.website_refresh_service.WebsitePageModel")
+    def test_redirected_start_url_is_only_a_baseline_once(self, model, _):
+        stored = []
+
+        class Pages(list):
+            def delete(self):
+                stored.clear()
+
+        model.side_effect = lambda **fields: SimpleNamespace(pk=None, **fields)
+        model.objects.bulk_create.side_effect = lambda pages, **_: stored.extend(pages)
+        knowledge = MagicMock(url="https://ejemplo.com", max_depth=1, max_links=5)
+        knowledge.website_pages.all.side_effect = lambda: Pages(stored)
+
+        def handler(request):
+            if request.url.path == "/":
+                return httpx.Response(301, headers={"Location": "/es/"})
+            if request.url.path == "/es/":
+                return httpx.Response(200, html=f"<main>{self.TEXT}</main>")
+            return httpx.Response(404)
+
+        service = WebsiteRefreshService(knowledge, httpx.MockTransport(handler))
+
+        self.assertEqual(service.refresh()["baseline"], 1)
+        self.assertEqual(
+            [(page.url, page.requested_url) for page in stored],
+            [("https://ejemplo.com/es/", "https://ejemplo.com/")],
+        )
+        stats = service.refresh()
+        self.assertEqual((stats["baseline"], stats["unchanged"]), (0, 1))
+        self.assertFalse(stats["recreate"])
+
+
+class IndexLockCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_reported(self):
+        with override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            }
+        ):
+            warnings = check_index_lock_cache(None)
+        self.assertEqual([warning.id for warning in warnings], ["knowledge.W001"])
+
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                    "LOCATION": "redis://localhost:6379/1",
+                }
+            }
+        ):
+            self.assertEqual(check_index_lock_cache(None), [])
+
+
+class IndexLockServiceTests(SimpleTestCase):
+    module = "knowledge.services.index_lock_service"
+
+    def test_expired_lock_taken_by_another_worker_is_not_released(self):
+        local_cache = LocMemCache("locks", {})
+        with patch(f"{self.module}.cache", local_cache):
+            first = IndexLockService.acquire("lock", 60, "tarea-1")
+            self.assertIsNone(IndexLockService.acquire("lock", 60, "tarea-2"))
+            # El lock de la primera tarea caduca y lo toma la segunda
+            local_cache.delete("lock")
+            second = IndexLockService.acquire("lock", 60, "tarea-2")
+
+            self.assertFalse(IndexLockService.release("lock", first))
+            self.assertEqual(local_cache.get("lock"), "tarea-2")
+            self.assertTrue(IndexLockService.release("lock", second))
+            self.assertIsNone(local_cache.get("lock"))
+
+    def test_redis_release_compares_and_deletes_atomically(self):
+        redis_cache = RedisCache("redis://localhost:6379/1", {})
+        client = MagicMock()
+        client.register_script.return_value.return_value = 1
+        with patch(f"{self.module}.cache", redis_cache), patch.object(
+            redis_cache._cache, "get_client", return_value=client
+        ):
+            released = IndexLockService.release("lock", "tarea-1")
+
+        self.assertTrue(released)
+        release = client.register_script.return_value
+        release.assert_called_once_with(
+            keys=[redis_cache.make_and_validate_key("lock")],
+            args=[redis_cache._cache._serializer.dumps("tarea-1")],
+        )
@@ -1,4 +1,3 @@
-import csv
 import io
 import json
 
@@ -24,26 +23,32 @@ def upload_file_view(request):
                 uploaded_file = form.cleaned_data["file"]
                 description = form.cleaned_data.get("description", "")
 
-                # Leer el contenido del archivo
-                file_content = uploaded_file.read().decode("utf-8")
-
                 # Procesar según el tipo de contenido
                 markdown_content = ""
 
                 if content_type == "json":
                     # Validar y procesar JSON
                     try:
-                        json_data = json.loads(file_content)
-                        markdown_content = ContentFormatterService.json_to_markdown(
-                            json_data, name
+                        # Parsear los arrays elemento a elemento e ir escribiendo
+                        json_file = io.TextIOWrapper(
+                            uploaded_file.file, encoding="utf-8"
                         )
+                        output = io.StringIO()
+                        try:
+                            stats = ContentFormatterService.write_json_markdown(
+                                json_file, name, output
+                            )
+                        finally:
+                            # No cerrar el archivo subido junto con el wrapper
+                            json_file.detach()
+                        markdown_content = output.getvalue()
                         category = "plain_document"
 
-                        # Validar si es una lista con más de 1000 elementos
-                        if isinstance(json_data, list) and len(json_data) > 1000:
+                        # Validar si hay más de 1000 elementos
+                        if stats["items"] > 1000:
                             messages.warning(
                                 request,
-                                f"⚠️ El archivo JSON contiene {len(json_data)} elementos. "
+                                f"⚠️ El archivo JSON contiene {stats['items']} elementos. "
                                 f"Se recomienda usar archivos con menos de 1000 elementos para mejor rendimiento.",
                             )
 
@@ -58,12 +63,20 @@ def upload_file_view(request):
                 elif content_type == "csv":
                     # Validar y procesar CSV
                     try:
-                        # Validar formato CSV
-                        csv_file = io.StringIO(file_content)
-                        reader = csv.reader(csv_file)
-                        rows = list(reader)
+                        # Leer y convertir el CSV fila a fila, sin cargarlo entero
+                        csv_file = io.TextIOWrapper(
+                            uploaded_file.file, encoding="utf-8", newline=""
+                        )
+                        output = io.StringIO()
+                        try:
+                            stats = ContentFormatterService.write_csv_markdown(
+                                csv_file, name, output
+                            )
+                        finally:
+                            # No cerrar el archivo subido junto con el wrapper
+                            csv_file.detach()
 
-                        if len(rows) < 2:
+                        if stats["rows"] < 1:
                             messages.error(
                                 request,
                                 "❌ El archivo CSV debe tener al menos una fila de encabezados y una fila de datos.",
@@ -75,16 +88,14 @@ def upload_file_view(request):
                             )
 
                         # Validar límite de filas
-                        if len(rows) > 1001:  # 1 header + 1000 data rows
+                        if stats["rows"] > 1000:
                             messages.warning(
                                 request,
-                                f"⚠️ El archivo CSV contiene {len(rows)-1} filas de datos. "
+                                f"⚠️ El archivo CSV contiene {stats['rows']} filas de datos. "
                                 f"Se recomienda usar archivos con menos de 1000 filas para mejor rendimiento.",
                             )
 
-                        markdown_content = ContentFormatterService.csv_to_markdown(
-                            file_content, name
-                        )
+                        markdown_content = output.getvalue()
                         category = "plain_document"
 
                     except Exception as e:
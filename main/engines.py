@@ -0,0 +1,83 @@
+"""
+Registro de engines de SQLAlchemy compartidos por proceso.
+
+Los vector stores (PgVector), la memoria y el storage de sesiones de agno
+crean su propio engine (y su propio pool de conexiones) cuando reciben sólo
+un `db_url`. Este registro mantiene un único engine por URL para que todos
+reutilicen el mismo pool contra la base de datos de IA.
+"""
+
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from main.settings import (
+    IA_DB,
+    IA_DB_MAX_OVERFLOW,
+    IA_DB_POOL_PRE_PING,
+    IA_DB_POOL_RECYCLE,
+    IA_DB_POOL_SIZE,
+    IA_DB_POOL_TIMEOUT,
+)
+
+
+class EngineRegistry:
+    """Engines de SQLAlchemy compartidos, indexados por URL de conexión."""
+
+    _engines: dict = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_engine(cls, db_url: str = IA_DB) -> Engine:
+        """
+        Obtiene el engine compartido para una URL, creándolo si no existe.
+
+        Args:
+            db_url: URL de conexión de SQLAlchemy (por defecto `IA_DB`)
+
+        Returns:
+            Engine: Engine con el pool configurado en settings
+        """
+        engine = cls._engines.get(db_url)
+        if engine is not None:
+            return engine
+
+        with cls._lock:
+            engine = cls._engines.get(db_url)
+            if engine is None:
+                engine = create_engine(
+                    db_url,
+                    pool_size=IA_DB_POOL_SIZE,
+                    max_overflow=IA_DB_MAX_OVERFLOW,
+                    pool_timeout=IA_DB_POOL_TIMEOUT,
+                    pool_recycle=IA_DB_POOL_RECYCLE,
+                    pool_pre_ping=IA_DB_POOL_PRE_PING,
+                )
+                cls._engines[db_url] = engine
+        return engine
+
+    @classmethod
+    def dispose_all(cls, close: bool = True) -> None:
+        """Libera los pools de todos los engines registrados."""
+        with cls._lock:
+            for engine in cls._engines.values():
+                engine.dispose(close=close)
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # Las conexiones heredadas del proceso padre (gunicorn --preload,
+        # workers prefork de Celery) no deben usarse en el hijo
+        cls._lock = threading.Lock()
+        for engine in cls._engines.values():
+            engine.dispose(close=False)
+
+
+def get_ia_engine() -> Engine:
+    """Engine compartido para la base de datos de IA (`IA_DB`)."""
+    return EngineRegistry.get_engine(IA_DB)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=EngineRegistry._after_fork)
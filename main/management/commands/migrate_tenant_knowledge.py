@@ -0,0 +1,152 @@
+"""
+Comando de Django para pasar el conocimiento de las tablas por agente
+(`ia_*_documents_{agente}`) a la vector DB compartida de cada tenant
+(`ia_tenant_documents_{tenant_id}`).
+
+Las búsquedas sólo leen la tabla del tenant: hay que ejecutarlo una vez tras
+desplegar, antes de que los agentes vuelvan a atender chats.
+"""
+
+import re
+
+from django.core.management.base import BaseCommand
+from sqlalchemy import inspect, text
+
+from agents.models import AgentModel
+from knowledge.services.document_knowledge_base_service import (
+    DocumentKnowledgeBaseService,
+)
+from knowledge.services.knowledge_index_service import KnowledgeIndexError
+from knowledge.services.knowledge_vector_db import KnowledgeVectorDb
+from knowledge.tasks import index_agent_knowledge
+from main.engines import get_ia_engine
+
+# Esquema por defecto de PgVector, donde están también las tablas antiguas
+SCHEMA = "ai"
+LEGACY_TABLE = re.compile(
+    r"^ia_(?:(?:combined|csv|docx|json|markdown|pdf|website)_)?"
+    r"documents_(?P<agent>.+)$"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexa el conocimiento de cada tenant en su vector DB compartida y "
+        "elimina las tablas antiguas por agente"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tenant",
+            type=int,
+            action="append",
+            help="ID del tenant (repetible; por defecto todos)",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Indexa en este proceso en lugar de encolar la tarea de Celery",
+        )
+        parser.add_argument(
+            "--drop-legacy",
+            action="store_true",
+            help="Elimina las tablas por agente de los tenants ya indexados",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Mostrar qué se haría sin hacer cambios reales",
+        )
+
+    def handle(self, *args, **options):
+        agents = AgentModel.objects.select_related("tenant").filter(
+            tenant__isnull=False
+        )
+        if options["tenant"]:
+            agents = agents.filter(tenant_id__in=options["tenant"])
+
+        if options["drop_legacy"]:
+            self.drop_legacy_tables(agents, bool(options["tenant"]), options["dry_run"])
+            return
+
+        # La ingesta indexa todo el conocimiento del tenant: basta un agente
+        indexed = set()
+        for agent in agents.filter(knoledge_text_models__isnull=False).distinct():
+            if agent.tenant_id in indexed:
+                continue
+            indexed.add(agent.tenant_id)
+            if options["dry_run"]:
+                self.stdout.write(f"  🔍 {agent.tenant}: se indexaría con {agent}")
+            elif options["sync"]:
+                try:
+                    DocumentKnowledgeBaseService(agent).load_knowledge_base()
+                except KnowledgeIndexError as e:
+                    self.stderr.write(f"  ❌ {agent.tenant}: {e}")
+                    continue
+                self.stdout.write(f"  ✅ {agent.tenant}: indexado con {agent}")
+            else:
+                index_agent_knowledge.delay(agent.id)
+                self.stdout.write(f"  📨 {agent.tenant}: encolado con {agent}")
+
+        if not indexed:
+            self.stdout.write("No hay tenants con conocimiento vinculado a agentes")
+        elif not options["sync"] and not options["dry_run"]:
+            self.stdout.write(
+                "Cuando terminen las tareas, ejecuta de nuevo con --drop-legacy"
+            )
+
+    def drop_legacy_tables(self, agents, by_tenant, dry_run):
+        """
+        Elimina las tablas por agente.
+
+        Se conservan las de agentes con conocimiento vinculado cuyo tenant
+        aún no tiene filas en su tabla compartida. Las de agentes que ya no
+        existen sólo se eliminan si no se filtró por tenant.
+        """
+        engine = get_ia_engine()
+        inspector = inspect(engine)
+        by_name = {agent.name: agent for agent in agents}
+        with_knowledge = set(
+            agents.filter(knoledge_text_models__isnull=False).values_list(
+                "name", flat=True
+            )
+        )
+
+        dropped = 0
+        for table in inspector.get_table_names(schema=SCHEMA):
+            match = LEGACY_TABLE.match(table)
+            if match is None:
+                continue
+            agent = by_name.get(match.group("agent"))
+            if agent is None and by_tenant:
+                continue
+            if agent is not None and agent.name in with_knowledge:
+                tenant_table = KnowledgeVectorDb.get_table_name(agent.tenant)
+                if not self.has_rows(engine, inspector, tenant_table):
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"  ⏳ {table}: {agent.tenant} aún no está indexado"
+                        )
+                    )
+                    continue
+
+            if not dry_run:
+                with engine.begin() as conn:
+                    conn.execute(text(f'DROP TABLE IF EXISTS "{SCHEMA}"."{table}"'))
+            dropped += 1
+            self.stdout.write(f"  🗑️ {table}")
+
+        verb = "Se eliminarían" if dry_run else "Eliminadas"
+        self.stdout.write(f"{verb} {dropped} tablas antiguas")
+
+    @staticmethod
+    def has_rows(engine, inspector, table) -> bool:
+        if not inspector.has_table(table, schema=SCHEMA):
+            return False
+        with engine.connect() as conn:
+            return (
+                conn.execute(
+                    text(f'SELECT 1 FROM "{SCHEMA}"."{table}" LIMIT 1')
+                ).first()
+                is not None
+            )
@@ -0,0 +1,43 @@
+"""
+Comando de Django para refrescar a mano los conocimientos de sitios web
+(el refresco periódico lo lanza celery beat).
+"""
+
+from django.core.management.base import BaseCommand
+
+from knowledge.services.website_refresh_service import WebsiteRefreshService
+
+
+class Command(BaseCommand):
+    help = (
+        "Pide de forma condicional las páginas de los conocimientos website y "
+        "marca para recrear sólo los que cambiaron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--knowledge",
+            type=int,
+            action="append",
+            help="ID del conocimiento (repetible; por defecto todos)",
+        )
+
+    def handle(self, *args, **options):
+        results = WebsiteRefreshService.refresh_all(options["knowledge"])
+        if not results:
+            self.stdout.write("No hay conocimientos website vinculados a agentes")
+        for knowledge_id, stats in results.items():
+            if stats is None:
+                self.stdout.write(self.style.WARNING(f"  ⚠️ {knowledge_id}: falló"))
+                continue
+            if stats["baseline"]:
+                self.stdout.write(
+                    f"  📌 {knowledge_id}: {stats['baseline']} páginas de referencia"
+                )
+                continue
+            status = "🔁 recrear" if stats["recreate"] else "✅ sin cambios"
+            self.stdout.write(
+                f"  {status} {knowledge_id}: {stats['not_modified']} sin modificar (304), "
+                f"{stats['unchanged']} iguales, {stats['changed']} cambiadas, "
+                f"{stats['new']} nuevas, {stats['gone']} desaparecidas"
+            )
@@ -0,0 +1,127 @@
+"""
+Comando de Django para comparar el reranking local frente al top-k sin
+reordenar: calidad del contexto recuperado frente a tamaño del prompt.
+"""
+
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.models import AgentModel
+from knowledge.services.document_knowledge_base_service import (
+    DocumentKnowledgeBaseService,
+)
+from knowledge.services.local_reranker import SCORERS, LocalReranker
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los scorers de reranking con el top-k sin reordenar: "
+        "aciertos del contexto frente a tokens del prompt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agent", required=True, help="Nombre del agente")
+        parser.add_argument(
+            "--questions",
+            required=True,
+            help=(
+                'JSON con [{"question": "...", "expected": "texto" | ["textos"]}]: '
+                "una respuesta es posible si el contexto contiene todos los esperados"
+            ),
+        )
+        parser.add_argument(
+            "--baseline-k",
+            type=int,
+            default=5,
+            help="Fragmentos del top-k sin reordenar (por defecto el de agno)",
+        )
+        parser.add_argument(
+            "--top-n", type=int, help="Por defecto el `rerank_top_n` del agente"
+        )
+        parser.add_argument(
+            "--token-budget",
+            type=int,
+            help="Por defecto el `rerank_token_budget` del agente",
+        )
+        parser.add_argument(
+            "--candidates",
+            type=int,
+            help="Por defecto el `rerank_candidates` del agente",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            agent = AgentModel.objects.select_related("tenant").get(
+                name=options["agent"]
+            )
+        except AgentModel.DoesNotExist:
+            raise CommandError(f"No existe el agente '{options['agent']}'")
+        try:
+            with open(options["questions"], encoding="utf-8") as file:
+                questions = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudieron leer las preguntas: {e}")
+
+        top_n = options["top_n"] or agent.rerank_top_n
+        token_budget = options["token_budget"]
+        if token_budget is None:
+            token_budget = agent.rerank_token_budget
+        candidates = max(options["candidates"] or agent.rerank_candidates, top_n)
+
+        vector_db = DocumentKnowledgeBaseService(agent).get_knowledge_base().vector_db
+        vector_db.reranker = None
+        rerankers = {
+            scorer: LocalReranker(
+                scorer=scorer, top_n=top_n, token_budget=token_budget or None
+            )
+            for scorer in SCORERS
+        }
+        results = {name: [] for name in ["top-k", *rerankers]}
+
+        for item in questions:
+            question = item["question"]
+            expected = item["expected"]
+            if isinstance(expected, str):
+                expected = [expected]
+            retrieved = vector_db.search(question, limit=candidates)
+            results["top-k"].append(
+                self.evaluate(retrieved[: options["baseline_k"]], expected, 0.0)
+            )
+            for name, reranker in rerankers.items():
+                started = time.perf_counter()
+                selected = reranker.rerank(question, list(retrieved))
+                elapsed = (time.perf_counter() - started) * 1000
+                results[name].append(self.evaluate(selected, expected, elapsed))
+
+        self.stdout.write(
+            f"\n🏅 {agent} — {len(questions)} preguntas, {candidates} candidatos, "
+            f"top-k={options['baseline_k']}, top_n={top_n}, "
+            f"presupuesto={token_budget or 'sin límite'}"
+        )
+        self.stdout.write(
+            f"{'estrategia':<12}{'aciertos':>10}{'tokens':>10}"
+            f"{'fragmentos':>12}{'ms rerank':>11}"
+        )
+        for name, rows in results.items():
+            if not rows:
+                continue
+            self.stdout.write(
+                f"{name:<12}"
+                f"{statistics.mean(row['hit'] for row in rows):>10.1%}"
+                f"{statistics.mean(row['tokens'] for row in rows):>10.0f}"
+                f"{statistics.mean(row['chunks'] for row in rows):>12.1f}"
+                f"{statistics.mean(row['ms'] for row in rows):>11.2f}"
+            )
+
+    @staticmethod
+    def evaluate(documents, expected, elapsed):
+        context = "\n".join(document.content or "" for document in documents).lower()
+        return {
+            "hit": all(text.lower() in context for text in expected),
+            "tokens": sum(LocalReranker.count_tokens(d.content) for d in documents),
+            "chunks": len(documents),
+            "ms": elapsed,
+        }
@@ -0,0 +1,141 @@
+"""
+Comando de Django para crear, reconstruir e informar de los índices ANN
+(HNSW / IVFFlat) de las vector DB de conocimiento.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.models import AgentModel
+from knowledge.services.vector_index_service import VectorIndexService
+from tenants.models import TenantModel
+
+
+class Command(BaseCommand):
+    help = "Crea, reconstruye o informa de los índices vectoriales por tenant"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action",
+            choices=["report", "create", "rebuild"],
+            help="report: estado; create: crea los que falten; rebuild: reconstruye",
+        )
+        parser.add_argument(
+            "--tenant",
+            type=int,
+            action="append",
+            help="ID del tenant (repetible; por defecto todos)",
+        )
+        parser.add_argument(
+            "--agent",
+            help="Nombre del agente: el benchmark usa sus parámetros y conocimientos",
+        )
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Mide recall y latencia frente a la búsqueda exacta",
+        )
+        parser.add_argument(
+            "--no-filtered",
+            dest="filtered",
+            action="store_false",
+            help="El benchmark no mide la búsqueda filtrada por conocimiento",
+        )
+        parser.add_argument(
+            "--samples", type=int, default=20, help="Consultas del benchmark"
+        )
+        parser.add_argument(
+            "--k", type=int, default=5, help="Resultados por consulta del benchmark"
+        )
+
+    def handle(self, *args, **options):
+        agent = None
+        if options["agent"]:
+            try:
+                agent = AgentModel.objects.select_related("tenant").get(
+                    name=options["agent"]
+                )
+            except AgentModel.DoesNotExist:
+                raise CommandError(f"No existe el agente '{options['agent']}'")
+            if agent.tenant is None:
+                raise CommandError(f"El agente '{agent}' no tiene tenant")
+            tenants = [agent.tenant]
+        else:
+            tenants = TenantModel.objects.all()
+            if options["tenant"]:
+                tenants = tenants.filter(id__in=options["tenant"])
+
+        for tenant in tenants:
+            service = VectorIndexService.for_tenant(tenant, agent=agent)
+            self.stdout.write(f"\n🧭 {tenant} ({service.vector_db.table_name})")
+            if options["action"] != "report":
+                result = service.create_exclusive(
+                    tenant.id, rebuild=options["action"] == "rebuild"
+                )
+                if result is None:
+                    self.stdout.write("  ⏳ Ya hay una construcción en curso")
+                else:
+                    self.stdout.write(f"  ⚙️ {self.format_action(result)}")
+            self.write_report(
+                service.report(
+                    benchmark=options["benchmark"],
+                    samples=options["samples"],
+                    k=options["k"],
+                    filtered=options["filtered"],
+                )
+            )
+
+    @staticmethod
+    def format_action(result):
+        message = result["action"]
+        if result.get("reason"):
+            message += f" ({result['reason']})"
+        if result.get("seconds") is not None:
+            message += f" en {result['seconds']:.2f}s"
+        return message
+
+    def write_report(self, report):
+        if not report["exists"]:
+            self.stdout.write("  ⚪ Tabla sin crear")
+            return
+
+        self.stdout.write(f"  📊 Filas: {report['rows']}")
+        expected = report["expected"]
+        if expected:
+            self.stdout.write(
+                f"  🎯 Configurado: {expected['type']} {expected['options']}"
+            )
+        else:
+            self.stdout.write("  🎯 Configurado: sin índice (búsqueda exacta)")
+        for index in report["indexes"]:
+            status = "✅" if index["current"] else "⚠️ desactualizado"
+            self.stdout.write(
+                f"  {status} {index['name']}: {index['type']} {index['options']} "
+                f"({index['size'] / 1024 / 1024:.1f} MB)"
+            )
+        if not report["current"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "  ⚠️ El índice no coincide con la configuración: ejecuta rebuild"
+                )
+            )
+
+        benchmark = report["benchmark"]
+        if benchmark:
+            self.write_benchmark(benchmark)
+            if benchmark["filtered"]:
+                self.write_benchmark(benchmark["filtered"])
+
+    def write_benchmark(self, benchmark):
+        recall = benchmark["recall"]
+        recall = "-" if recall is None else f"{recall:.3f}"
+        scope = "todos los conocimientos"
+        if benchmark["knowledge_ids"] is not None:
+            ids = ", ".join(str(i) for i in benchmark["knowledge_ids"])
+            scope = f"conocimientos {ids}"
+        self.stdout.write(f"  🧪 recall@{benchmark['k']} ({scope}): {recall}")
+        self.stdout.write(
+            f"  ⏱️ ANN p50/p95: {benchmark['ann_p50_ms']:.2f}/"
+            f"{benchmark['ann_p95_ms']:.2f} ms | exacta p50/p95: "
+            f"{benchmark['exact_p50_ms']:.2f}/{benchmark['exact_p95_ms']:.2f} ms "
+            f"({benchmark['samples']} consultas)"
+        )
@@ -0,0 +1,100 @@
+"""
+Métricas de latencia por fase del chat.
+
+Cada fase medida con `timed` se registra en un histograma de Prometheus
+etiquetado por tenant, agente y proveedor de IA, y se acumula en la request
+en curso para que `ServerTimingMiddleware` la publique en la cabecera
+`Server-Timing`. Tenant y agente se etiquetan por ID, no por nombre, para no
+exponer nombres de clientes. Las etiquetas y las mediciones viven en
+`contextvars`, así que funcionan igual en vistas síncronas, asíncronas y
+tareas de Celery.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Histogram
+
+CHAT_PHASE_SECONDS = Histogram(
+    "chat_phase_duration_seconds",
+    "Duración de cada fase del procesamiento de un chat",
+    ["phase", "tenant", "agent", "provider"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+LABELS = ("tenant", "agent", "provider")
+
+_labels: ContextVar[dict] = ContextVar("chat_metrics_labels", default={})
+_timings: ContextVar[Optional[list]] = ContextVar("chat_metrics_timings", default=None)
+
+
+def set_labels(**labels) -> None:
+    """Fija etiquetas (tenant, agent, provider) para las fases siguientes."""
+    current = dict(_labels.get())
+    current.update({key: str(value) for key, value in labels.items() if value})
+    _labels.set(current)
+
+
+def begin_request():
+    """
+    Inicia la recolección de fases de una request con etiquetas vacías.
+
+    Returns:
+        Token: Token para `end_request`
+    """
+    _labels.set({})
+    return _timings.set([])
+
+
+def end_request(token) -> list:
+    """
+    Termina la recolección y devuelve las fases medidas.
+
+    Las etiquetas se conservan: el cuerpo de una respuesta en streaming se
+    genera después y sus fases deben seguir asociadas al tenant y al agente.
+
+    Returns:
+        list: Tuplas (fase, segundos) en orden de finalización
+    """
+    timings = _timings.get() or []
+    _timings.reset(token)
+    return timings
+
+
+@contextmanager
+def timed(phase: str, **labels):
+    """
+    Mide la duración del bloque como la fase `phase`.
+
+    Uso:
+        with timed("model"):
+            agent.run(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        values = {**_labels.get(), **{k: str(v) for k, v in labels.items() if v}}
+        CHAT_PHASE_SECONDS.labels(
+            phase=phase, **{label: values.get(label, "") for label in LABELS}
+        ).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((phase, elapsed))
+
+
+def server_timing_header(timings: list) -> str:
+    """
+    Formatea las fases como cabecera `Server-Timing` (en milisegundos).
+
+    Las fases repetidas en la misma request se suman.
+    """
+    totals = {}
+    for phase, elapsed in timings:
+        totals[phase] = totals.get(phase, 0.0) + elapsed
+    return ", ".join(
+        f"{phase};dur={elapsed * 1000:.1f}" for phase, elapsed in totals.items()
+    )
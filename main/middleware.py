@@ -0,0 +1,55 @@
+"""
+Middlewares del proyecto.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from main import metrics
+
+
+def _add_server_timing(response, timings, start) -> None:
+    total = time.perf_counter() - start
+    header = metrics.server_timing_header(timings + [("total", total)])
+    if response.has_header("Server-Timing"):
+        header = f"{response['Server-Timing']}, {header}"
+    response["Server-Timing"] = header
+
+
+@sync_and_async_middleware
+def ServerTimingMiddleware(get_response):
+    """
+    Publica en la cabecera `Server-Timing` las fases medidas con
+    `main.metrics.timed` durante la request.
+
+    En las respuestas en streaming sólo se incluyen las fases terminadas
+    antes de empezar a enviar el cuerpo; el resto se registra igualmente en
+    Prometheus.
+    """
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            start = time.perf_counter()
+            token = metrics.begin_request()
+            try:
+                response = await get_response(request)
+            finally:
+                timings = metrics.end_request(token)
+            _add_server_timing(response, timings, start)
+            return response
+
+    else:
+
+        def middleware(request):
+            start = time.perf_counter()
+            token = metrics.begin_request()
+            try:
+                response = get_response(request)
+            finally:
+                timings = metrics.end_request(token)
+            _add_server_timing(response, timings, start)
+            return response
+
+    return middleware
@@ -6,6 +6,8 @@ Contains common settings used across all environments.
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -35,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.ServerTimingMiddleware",  # Primero: mide la request completa
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # Debe ir antes de CommonMiddleware
@@ -109,11 +112,99 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # AI Configuration
 IA_MODEL = os.environ.get("IA_MODEL", "llama3.2:3b")
 IA_DB = os.environ.get("IA_DB", "postgresql+psycopg://ai:ai@localhost:5532/ai")
+
+# Pool de conexiones compartido contra IA_DB (ver main/engines.py)
+IA_DB_POOL_SIZE = int(os.environ.get("IA_DB_POOL_SIZE", 5))
+IA_DB_MAX_OVERFLOW = int(os.environ.get("IA_DB_MAX_OVERFLOW", 10))
+IA_DB_POOL_TIMEOUT = int(os.environ.get("IA_DB_POOL_TIMEOUT", 30))
+IA_DB_POOL_RECYCLE = int(os.environ.get("IA_DB_POOL_RECYCLE", 1800))
+IA_DB_POOL_PRE_PING = os.environ.get("IA_DB_POOL_PRE_PING", "True") == "True"
 IA_MODEL_EMBEDDING = os.environ.get("IA_MODEL_EMBEDDING", "llama3.2:3b")
 
+# Pool de agentes: número máximo de instancias ociosas por proceso
+AGENT_POOL_MAX_SIZE = int(os.environ.get("AGENT_POOL_MAX_SIZE", 32))
+
+# Caché compartida entre procesos (locks de indexación, tokens de tenant)
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/1")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+# Caché de resolución de tenants por cwu_token: nivel local (TTL LRU por
+# proceso) delante de Redis. Los TTL están en segundos.
+TENANT_CACHE_LOCAL_MAXSIZE = int(os.environ.get("TENANT_CACHE_LOCAL_MAXSIZE", 1024))
+TENANT_CACHE_LOCAL_TTL = int(os.environ.get("TENANT_CACHE_LOCAL_TTL", 10))
+TENANT_CACHE_TTL = int(os.environ.get("TENANT_CACHE_TTL", 300))
+TENANT_CACHE_NEGATIVE_TTL = int(os.environ.get("TENANT_CACHE_NEGATIVE_TTL", 30))
+
+# Escritura diferida de transcripciones de chat (ver chats/transcript_writer.py)
+CHAT_TRANSCRIPT_BATCH_SIZE = int(os.environ.get("CHAT_TRANSCRIPT_BATCH_SIZE", 50))
+CHAT_TRANSCRIPT_FLUSH_INTERVAL = float(
+    os.environ.get("CHAT_TRANSCRIPT_FLUSH_INTERVAL", 2.0)
+)
+CHAT_TRANSCRIPT_MAX_BUFFER = int(os.environ.get("CHAT_TRANSCRIPT_MAX_BUFFER", 10000))
+# Spool en Redis de los turnos aún no escritos (vacío = sólo en memoria) y
+# segundos tras los que otro proceso recupera los turnos abandonados
+CHAT_TRANSCRIPT_SPOOL_URL = os.environ.get("CHAT_TRANSCRIPT_SPOOL_URL", REDIS_URL)
+CHAT_TRANSCRIPT_SPOOL_GRACE = int(os.environ.get("CHAT_TRANSCRIPT_SPOOL_GRACE", 60))
+
+# Chat por lotes (/api/v1/chat/batch)
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get("CHAT_BATCH_MAX_ITEMS", 100))
+# Ejecuciones simultáneas por tenant en cada proceso
+CHAT_BATCH_TENANT_CONCURRENCY = int(os.environ.get("CHAT_BATCH_TENANT_CONCURRENCY", 4))
+
+# Caché persistente de embeddings (ver knowledge/services/embedding_cache_service.py)
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "True") == "True"
+# Máximo de embeddings guardados; se eliminan los usados hace más tiempo
+# (lo aplica la tarea periódica evict_embedding_cache)
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 1000000)
+)
+# Segundos mínimos entre dos actualizaciones de last_used_at de una entrada
+EMBEDDING_CACHE_TOUCH_INTERVAL = int(
+    os.environ.get("EMBEDDING_CACHE_TOUCH_INTERVAL", 60 * 60 * 24)
+)
+
+# Peticiones de embeddings (ver knowledge/services/embedding_scheduler_service.py)
+# Textos por petición y peticiones simultáneas por ingesta
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 100))
+EMBEDDING_MAX_IN_FLIGHT = int(os.environ.get("EMBEDDING_MAX_IN_FLIGHT", 4))
+EMBEDDING_RETRY_ATTEMPTS = int(os.environ.get("EMBEDDING_RETRY_ATTEMPTS", 5))
+# Multiplicador en segundos del backoff exponencial entre reintentos
+EMBEDDING_RETRY_BACKOFF = float(os.environ.get("EMBEDDING_RETRY_BACKOFF", 1.0))
+# Textos por minuto que puede embeber cada tenant entre todos los procesos
+# (por defecto; cada tenant puede fijar el suyo en embedding_rate_per_minute)
+EMBEDDING_TENANT_RATE_PER_MINUTE = int(
+    os.environ.get("EMBEDDING_TENANT_RATE_PER_MINUTE", 3000)
+)
+# Redis donde se comparten los token buckets (vacío = uno por proceso)
+EMBEDDING_RATE_LIMIT_URL = os.environ.get("EMBEDDING_RATE_LIMIT_URL", REDIS_URL)
+
+# Procesos que leen y fragmentan fuentes durante la ingesta (1 = sin pool).
+# Los comparten los hilos del worker de `KNOWLEDGE_INDEX_QUEUE`; en workers
+# prefork (procesos daemon) no se puede crear el pool y se lee sin él
+KNOWLEDGE_PARSE_WORKERS = int(
+    os.environ.get("KNOWLEDGE_PARSE_WORKERS", os.cpu_count() or 1)
+)
+# Memoria virtual máxima de cada proceso del pool de lectura (0 = sin límite)
+KNOWLEDGE_PARSE_MEMORY_LIMIT_MB = int(
+    os.environ.get("KNOWLEDGE_PARSE_MEMORY_LIMIT_MB", 4096)
+)
+# Páginas de PDF que se leen y embeben juntas; el progreso se guarda por ventana
+PDF_STREAM_PAGES_PER_WINDOW = int(os.environ.get("PDF_STREAM_PAGES_PER_WINDOW", 20))
+
 # Celery Configuration
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
+# Cola de la ingesta de conocimiento. Su worker debe usar `--pool threads`
+# (no daemon) para poder leer las fuentes en el pool de procesos
+KNOWLEDGE_INDEX_QUEUE = os.environ.get("KNOWLEDGE_INDEX_QUEUE", "knowledge")
+CELERY_TASK_ROUTES = {
+    "knowledge.tasks.index_agent_knowledge": {"queue": KNOWLEDGE_INDEX_QUEUE},
+}
 
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
@@ -139,6 +230,46 @@ REST_FRAMEWORK = {
 
 KNOWKEDGE_TEXT_MAX_CHARS = 14400000
 KNOWKEDGE_CSV_MAX_ROWS = 10000
+# Añadir al Markdown de los JSON importados una copia del JSON original
+KNOWLEDGE_JSON_INCLUDE_RAW = (
+    os.environ.get("KNOWLEDGE_JSON_INCLUDE_RAW", "False") == "True"
+)
+# Caracteres leídos por vez al importar JSON en streaming
+KNOWLEDGE_JSON_CHUNK_SIZE = int(os.environ.get("KNOWLEDGE_JSON_CHUNK_SIZE", 65536))
+
+# Crawler de sitios web (ver knowledge/services/web_crawler_service.py)
+CRAWLER_USER_AGENT = os.environ.get(
+    "CRAWLER_USER_AGENT", "Mozilla/5.0 (compatible; KnowledgeCrawler/1.0)"
+)
+# Peticiones simultáneas por crawl y por host
+CRAWLER_MAX_IN_FLIGHT = int(os.environ.get("CRAWLER_MAX_IN_FLIGHT", 16))
+CRAWLER_HOST_CONCURRENCY = int(os.environ.get("CRAWLER_HOST_CONCURRENCY", 4))
+# Segundos por petición y segundos máximos por crawl
+CRAWLER_REQUEST_TIMEOUT = float(os.environ.get("CRAWLER_REQUEST_TIMEOUT", 15))
+CRAWLER_TIME_BUDGET = float(os.environ.get("CRAWLER_TIME_BUDGET", 120))
+# Máximos de max_depth / max_links que aceptan la API y el admin
+CRAWLER_MAX_DEPTH = int(os.environ.get("CRAWLER_MAX_DEPTH", 10))
+CRAWLER_MAX_LINKS = int(os.environ.get("CRAWLER_MAX_LINKS", 1000))
+
+# Refresco programado de los conocimientos de sitios web
+# (ver knowledge/services/website_refresh_service.py)
+# Bits de simhash que pueden diferir sin considerar que la página cambió
+WEBSITE_REFRESH_SIMHASH_DISTANCE = int(
+    os.environ.get("WEBSITE_REFRESH_SIMHASH_DISTANCE", 3)
+)
+# Hora (UTC) del refresco diario
+WEBSITE_REFRESH_HOUR = int(os.environ.get("WEBSITE_REFRESH_HOUR", 3))
+# Tareas periódicas de celery beat
+CELERY_BEAT_SCHEDULE = {
+    "refresh-website-knowledge": {
+        "task": "knowledge.tasks.refresh_website_knowledge",
+        "schedule": crontab(hour=WEBSITE_REFRESH_HOUR, minute=0),
+    },
+    "evict-embedding-cache": {
+        "task": "knowledge.tasks.evict_embedding_cache",
+        "schedule": crontab(minute=30),
+    },
+}
 
 # Logging Configuration
 LOGGING = {
@@ -258,3 +389,35 @@ LOGGING = {
         },
     },
 }
+
+# Índices ANN de las vector DB (ver knowledge/services/vector_index_service.py)
+# Memoria de trabajo de la conexión que construye el índice
+VECTOR_INDEX_MAINTENANCE_WORK_MEM = os.environ.get(
+    "VECTOR_INDEX_MAINTENANCE_WORK_MEM", "1GB"
+)
+# Candidatos mínimos de las búsquedas filtradas por conocimiento cuando
+# pgvector no tiene recorrido iterativo (< 0.8) o el índice es IVFFlat
+VECTOR_FILTERED_EF_SEARCH = int(os.environ.get("VECTOR_FILTERED_EF_SEARCH", 200))
+VECTOR_FILTERED_PROBES = int(os.environ.get("VECTOR_FILTERED_PROBES", 20))
+
+# Búsqueda híbrida (vectorial + texto completo) de los agentes que la activan
+# Configuración de texto de Postgres del índice GIN; cambiarla requiere
+# recrear las tablas de conocimiento
+KNOWLEDGE_SEARCH_LANGUAGE = os.environ.get("KNOWLEDGE_SEARCH_LANGUAGE", "spanish")
+# Candidatos que aporta cada búsqueda antes de la fusión
+HYBRID_SEARCH_CANDIDATES = int(os.environ.get("HYBRID_SEARCH_CANDIDATES", 20))
+# Constante k de reciprocal rank fusion
+HYBRID_SEARCH_RRF_K = int(os.environ.get("HYBRID_SEARCH_RRF_K", 60))
+
+# Caché de búsquedas en el conocimiento por agente y consulta (Redis)
+RETRIEVAL_CACHE_ENABLED = os.environ.get("RETRIEVAL_CACHE_ENABLED", "True") == "True"
+RETRIEVAL_CACHE_TTL = int(os.environ.get("RETRIEVAL_CACHE_TTL", 600))
+
+# Acceso a /metrics: token Bearer o IPs/redes permitidas (por defecto sólo
+# loopback). Prometheus en docker-compose llega desde la red de docker
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [
+    ip.strip()
+    for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if ip.strip()
+]
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from main import metrics, views
+
+
+class ChatMetricsTestCase(SimpleTestCase):
+    """Tests de la medición de fases y la cabecera Server-Timing."""
+
+    def test_timed_collects_phases_for_current_request(self):
+        token = metrics.begin_request()
+        metrics.set_labels(tenant="acme", agent="menu")
+        with metrics.timed("model"):
+            pass
+        with metrics.timed("persist"):
+            pass
+        timings = metrics.end_request(token)
+
+        self.assertEqual([phase for phase, _ in timings], ["model", "persist"])
+
+    def test_timed_outside_request_only_records_histogram(self):
+        with metrics.timed("knowledge_load"):
+            pass
+        self.assertIsNone(metrics._timings.get())
+
+    def test_server_timing_header_sums_repeated_phases(self):
+        header = metrics.server_timing_header(
+            [("retrieval", 0.010), ("model", 0.5), ("retrieval", 0.005)]
+        )
+        self.assertEqual(header, "retrieval;dur=15.0, model;dur=500.0")
+
+    def test_labels_are_stored_as_strings(self):
+        token = metrics.begin_request()
+        metrics.set_labels(tenant=7, agent=12)
+        self.assertEqual(metrics._labels.get(), {"tenant": "7", "agent": "12"})
+        metrics.end_request(token)
+
+
+class MetricsViewTestCase(SimpleTestCase):
+    """Tests del control de acceso de /metrics."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_loopback_is_allowed_by_default(self):
+        request = self.factory.get("/metrics", REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(views.metrics_view(request).status_code, 200)
+
+    def test_other_addresses_are_rejected(self):
+        request = self.factory.get("/metrics", REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(views.metrics_view(request).status_code, 403)
+
+    def test_allowed_network(self):
+        request = self.factory.get("/metrics", REMOTE_ADDR="172.18.0.1")
+        with patch.object(views, "METRICS_ALLOWED_IPS", ["172.16.0.0/12"]):
+            self.assertEqual(views.metrics_view(request).status_code, 200)
+
+    def test_bearer_token(self):
+        with patch.object(views, "METRICS_TOKEN", "secret"):
+            request = self.factory.get(
+                "/metrics",
+                REMOTE_ADDR="203.0.113.5",
+                HTTP_AUTHORIZATION="Bearer secret",
+            )
+            self.assertEqual(views.metrics_view(request).status_code, 200)
+            request = self.factory.get(
+                "/metrics",
+                REMOTE_ADDR="203.0.113.5",
+                HTTP_AUTHORIZATION="Bearer wrong",
+            )
+            self.assertEqual(views.metrics_view(request).status_code, 403)
@@ -0,0 +1,57 @@
+import hmac
+import ipaddress
+import os
+
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+from main.settings import METRICS_ALLOWED_IPS, METRICS_TOKEN
+
+
+def is_metrics_client(request) -> bool:
+    """
+    Comprueba si la request puede leer las métricas.
+
+    Se acepta un `Authorization: Bearer <METRICS_TOKEN>` o una IP de origen
+    incluida en METRICS_ALLOWED_IPS (admite redes, p. ej. `172.16.0.0/12`).
+    """
+    if METRICS_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+            return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    for allowed in METRICS_ALLOWED_IPS:
+        try:
+            if address in ipaddress.ip_network(allowed, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def metrics_view(request):
+    """
+    Exposición de métricas para Prometheus.
+
+    Sólo responde a los clientes autorizados (ver `is_metrics_client`).
+    Con varios workers (gunicorn) se debe definir PROMETHEUS_MULTIPROC_DIR
+    para agregar las métricas de todos los procesos.
+    """
+    if not is_metrics_client(request):
+        return HttpResponseForbidden()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
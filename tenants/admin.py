@@ -2,16 +2,26 @@
 
 from django.contrib import admin, messages
 from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
 from django.urls import path, reverse
 from django.utils.html import format_html
 
+from knowledge.services.vector_index_service import VectorIndexService
+from knowledge.tasks import build_vector_index
 from tenants.helpers import generate_cwu_token
 from tenants.models import TenantModel, UserProfile
 
 
 @admin.register(TenantModel)
 class TenantAdmin(admin.ModelAdmin):
-    list_display = ("name", "model", "view_token_button", "regenerate_token_button")
+    list_display = (
+        "name",
+        "model",
+        "vector_index_type",
+        "view_token_button",
+        "regenerate_token_button",
+        "vector_index_button",
+    )
     readonly_fields = ("cwu_token",)
     search_fields = ("name", "description")  # Para el autocomplete
 
@@ -24,9 +34,50 @@ class TenantAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.regenerate_token),
                 name="tenant_regenerate_token",
             ),
+            path(
+                "vector-index/<int:tenant_id>/",
+                self.admin_site.admin_view(self.vector_index),
+                name="tenant_vector_index",
+            ),
         ]
         return custom_urls + urls
 
+    def vector_index(self, request, tenant_id):
+        """Estado, creación y reconstrucción del índice vectorial del tenant."""
+        tenant = get_object_or_404(TenantModel, pk=tenant_id)
+        service = VectorIndexService.for_tenant(tenant)
+
+        if request.method == "POST":
+            action = request.POST.get("action")
+            try:
+                # La construcción puede tardar: la ejecuta un worker de Celery
+                build_vector_index.delay(tenant.pk, rebuild=action == "rebuild")
+                messages.success(
+                    request,
+                    f"Índice vectorial de {tenant.name}: encolado, recarga la "
+                    "página para ver el estado",
+                )
+            except Exception as e:
+                messages.error(request, f"No se pudo encolar el índice vectorial: {e}")
+            return HttpResponseRedirect(
+                reverse("admin:tenant_vector_index", args=[tenant.pk])
+            )
+
+        report = None
+        try:
+            report = service.report(benchmark=request.GET.get("benchmark") == "1")
+        except Exception as e:
+            messages.error(request, f"No se pudo consultar el índice vectorial: {e}")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": f"Índice vectorial de {tenant.name}",
+            "opts": self.model._meta,
+            "tenant": tenant,
+            "report": report,
+        }
+        return render(request, "admin/tenants/vector_index.html", context)
+
     def regenerate_token(self, request, tenant_id):
         """Vista para regenerar el token de un tenant."""
         try:
@@ -69,6 +120,13 @@ class TenantAdmin(admin.ModelAdmin):
     regenerate_token_button.short_description = "Regenerar Token"
     regenerate_token_button.allow_tags = True
 
+    def vector_index_button(self, obj):
+        """Enlace al estado del índice vectorial."""
+        url = reverse("admin:tenant_vector_index", args=[obj.pk])
+        return format_html('<a href="{}" class="button">Índice vectorial</a>', url)
+
+    vector_index_button.short_description = "Índice vectorial"
+
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
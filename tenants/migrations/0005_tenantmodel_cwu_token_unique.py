@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+import tenants.helpers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0004_alter_tenantmodel_model"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tenantmodel",
+            name="cwu_token",
+            field=models.CharField(
+                default=tenants.helpers.generate_cwu_token,
+                help_text="Token único del tenant que comienza con 'cwu_'",
+                max_length=36,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.21 on 2026-10-17 03:30
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0005_tenantmodel_cwu_token_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantmodel",
+            name="vector_index_ef_construction",
+            field=models.PositiveIntegerField(
+                default=64,
+                help_text="HNSW: candidatos evaluados al construir (al menos 2 × m)",
+                validators=[
+                    django.core.validators.MinValueValidator(4),
+                    django.core.validators.MaxValueValidator(1000),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenantmodel",
+            name="vector_index_lists",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=None,
+                help_text="IVFFlat: número de listas (vacío = filas / 1000, o √filas por encima del millón)",
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(32768),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenantmodel",
+            name="vector_index_m",
+            field=models.PositiveIntegerField(
+                default=16,
+                help_text="HNSW: conexiones por nodo del grafo",
+                validators=[
+                    django.core.validators.MinValueValidator(2),
+                    django.core.validators.MaxValueValidator(100),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenantmodel",
+            name="vector_index_type",
+            field=models.CharField(
+                choices=[
+                    ("hnsw", "HNSW"),
+                    ("ivfflat", "IVFFlat"),
+                    ("none", "Sin índice (búsqueda exacta)"),
+                ],
+                default="hnsw",
+                help_text="Tipo de índice vectorial de la tabla de conocimiento del tenant",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-17 04:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0006_tenant_vector_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantmodel",
+            name="embedding_rate_per_minute",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=None,
+                help_text="Textos por minuto que puede embeber el tenant entre todos los workers (vacío = EMBEDDING_TENANT_RATE_PER_MINUTE)",
+                null=True,
+                validators=[django.core.validators.MinValueValidator(1)],
+            ),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from main.models import AppModel
@@ -31,13 +33,64 @@ class TenantModel(AppModel):
     )
     cwu_token = models.CharField(
         max_length=36,
+        unique=True,
         default=generate_cwu_token,
         help_text="Token único del tenant que comienza con 'cwu_'",
     )
 
+    # Índice ANN de la vector DB del tenant (ver VectorIndexService)
+    vector_index_type = models.CharField(
+        max_length=10,
+        choices=[
+            ("hnsw", "HNSW"),
+            ("ivfflat", "IVFFlat"),
+            ("none", "Sin índice (búsqueda exacta)"),
+        ],
+        default="hnsw",
+        help_text="Tipo de índice vectorial de la tabla de conocimiento del tenant",
+    )
+    vector_index_m = models.PositiveIntegerField(
+        default=16,
+        validators=[MinValueValidator(2), MaxValueValidator(100)],
+        help_text="HNSW: conexiones por nodo del grafo",
+    )
+    vector_index_ef_construction = models.PositiveIntegerField(
+        default=64,
+        validators=[MinValueValidator(4), MaxValueValidator(1000)],
+        help_text="HNSW: candidatos evaluados al construir (al menos 2 × m)",
+    )
+    vector_index_lists = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        default=None,
+        validators=[MinValueValidator(1), MaxValueValidator(32768)],
+        help_text="IVFFlat: número de listas (vacío = filas / 1000, o √filas por encima del millón)",
+    )
+
+    # Límite de embeddings del tenant (ver EmbeddingScheduler)
+    embedding_rate_per_minute = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        default=None,
+        validators=[MinValueValidator(1)],
+        help_text="Textos por minuto que puede embeber el tenant entre todos los workers (vacío = EMBEDDING_TENANT_RATE_PER_MINUTE)",
+    )
+
     def __str__(self):
         return self.name
 
+    def clean(self):
+        super().clean()
+        if (
+            self.vector_index_type == "hnsw"
+            and self.vector_index_ef_construction < 2 * self.vector_index_m
+        ):
+            raise ValidationError(
+                {
+                    "vector_index_ef_construction": "Debe ser al menos el doble de m en índices HNSW"
+                }
+            )
+
     class Meta:
         verbose_name = "Tenant"
         verbose_name_plural = "Tenants"
@@ -1,5 +1,22 @@
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from cachetools import TTLCache
+from django.core.cache import cache
+
+from main.settings import (
+    TENANT_CACHE_LOCAL_MAXSIZE,
+    TENANT_CACHE_LOCAL_TTL,
+    TENANT_CACHE_NEGATIVE_TTL,
+    TENANT_CACHE_TTL,
+)
 from tenants.models import TenantModel
 
+logger = logging.getLogger(__name__)
+
 
 class TenantService:
 
@@ -8,3 +25,124 @@ class TenantService:
         tenant = TenantModel(**tenant_data)
         tenant.save()
         return tenant
+
+
+class TenantTokenCacheService:
+    """
+    Resolución de tenants por `cwu_token` con caché de dos niveles.
+
+    El primer nivel es un TTL LRU en memoria del proceso y el segundo la
+    caché de Django (Redis), compartida entre workers. Los tokens inválidos
+    también se cachean, con un TTL más corto, para que un cliente con un
+    token erróneo no genere una consulta por request. Si Redis no responde,
+    se consulta directamente la base de datos.
+
+    En Redis sólo se guardan los campos no secretos de `SHARED_FIELDS`, no el
+    modelo entero (`ai_token`). Un tenant que llega de Redis tiene diferidos
+    los demás campos, que se leen de la base de datos al usarlos.
+    """
+
+    _MISSING = "__missing__"
+    # Campos que leen la autenticación y las métricas
+    SHARED_FIELDS = ("id", "name", "model")
+
+    _local = TTLCache(maxsize=TENANT_CACHE_LOCAL_MAXSIZE, ttl=TENANT_CACHE_LOCAL_TTL)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(cwu_token: str) -> str:
+        # No se guardan tokens en claro como claves de Redis
+        digest = hashlib.sha256(cwu_token.encode("utf-8")).hexdigest()
+        return f"tenants:token:v2:{digest}"
+
+    @classmethod
+    def _get_local(cls, key: str):
+        with cls._lock:
+            return cls._local.get(key)
+
+    @classmethod
+    def _set_local(cls, key: str, value) -> None:
+        with cls._lock:
+            cls._local[key] = value
+
+    @classmethod
+    def _unpack(cls, value) -> Optional[TenantModel]:
+        return None if value == cls._MISSING else value
+
+    @classmethod
+    def _from_shared(cls, value) -> Optional[TenantModel]:
+        """Tenant (o `_MISSING`) a partir del valor guardado en Redis."""
+        if value == cls._MISSING:
+            return value
+        return TenantModel.from_db("default", list(value), list(value.values()))
+
+    @classmethod
+    def resolve(cls, cwu_token: str) -> Optional[TenantModel]:
+        """
+        Obtiene el tenant asociado a un token.
+
+        Returns:
+            TenantModel | None: Tenant encontrado o None si el token no existe
+        """
+        key = cls._key(cwu_token)
+        value = cls._get_local(key)
+        if value is not None:
+            return cls._unpack(value)
+
+        try:
+            value = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Caché de tenants no disponible: {e}")
+            value = None
+
+        if value is None:
+            tenant = TenantModel.objects.filter(cwu_token=cwu_token).first()
+            value = tenant if tenant is not None else cls._MISSING
+            if tenant is not None:
+                shared = {field: getattr(tenant, field) for field in cls.SHARED_FIELDS}
+                timeout = TENANT_CACHE_TTL
+            else:
+                shared, timeout = cls._MISSING, TENANT_CACHE_NEGATIVE_TTL
+            try:
+                cache.set(key, shared, timeout)
+            except Exception as e:
+                logger.warning(f"No se pudo cachear el tenant: {e}")
+        else:
+            value = cls._from_shared(value)
+
+        cls._set_local(key, value)
+        return cls._unpack(value)
+
+    @classmethod
+    async def aresolve(cls, cwu_token: str) -> Optional[TenantModel]:
+        """Versión asíncrona de `resolve`; un acierto local no cambia de hilo."""
+        value = cls._get_local(cls._key(cwu_token))
+        if value is not None:
+            return cls._unpack(value)
+        return await sync_to_async(cls.resolve)(cwu_token)
+
+    @classmethod
+    def invalidate(cls, *cwu_tokens: str) -> None:
+        """
+        Elimina los tokens indicados de ambos niveles de caché.
+
+        El nivel local de otros procesos expira por TTL
+        (`TENANT_CACHE_LOCAL_TTL`).
+        """
+        keys = [cls._key(token) for token in cwu_tokens if token]
+        if not keys:
+            return
+
+        with cls._lock:
+            for key in keys:
+                cls._local.pop(key, None)
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar la caché de tenants: {e}")
+
+    @classmethod
+    def clear_local(cls) -> None:
+        """Vacía el nivel local de este proceso."""
+        with cls._lock:
+            cls._local.clear()
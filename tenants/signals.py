@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from main.signals import track_model_changes
+from tenants.models import TenantModel
+from tenants.services import TenantTokenCacheService
+
+
+@track_model_changes(TenantModel)
+def invalidate_tenant_token_cache(sender, instance, created, updated_fields, **kwargs):
+    """
+    Invalida la caché de tokens al crear o guardar un tenant.
+
+    Al regenerar el token (acción `regenerate_token` del admin) se invalidan
+    tanto el token anterior como el nuevo; al crear un tenant se descarta un
+    posible resultado negativo cacheado para su token.
+    """
+    tokens = {instance.cwu_token}
+    for field in updated_fields:
+        if field["field"] == "cwu_token":
+            tokens.add(field["old_value"])
+    TenantTokenCacheService.invalidate(*tokens)
+
+
+@receiver(post_delete, sender=TenantModel)
+def invalidate_deleted_tenant_token(sender, instance, **kwargs):
+    """Invalida el token de un tenant eliminado."""
+    TenantTokenCacheService.invalidate(instance.cwu_token)
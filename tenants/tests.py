@@ -1,3 +1,75 @@
 """Test module for tenants app."""
 
-# Add test cases when needed
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from tenants.models import TenantModel
+from tenants.services import TenantTokenCacheService
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TenantTokenCacheServiceTestCase(SimpleTestCase):
+    """Tests de la caché de resolución de tenants por token."""
+
+    def setUp(self):
+        cache.clear()
+        TenantTokenCacheService.clear_local()
+        self.tenant = TenantModel(id=1, name="acme", cwu_token="cwu_valid")
+        patcher = patch.object(TenantModel.objects, "filter")
+        self.mock_filter = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        TenantTokenCacheService.clear_local()
+
+    def test_valid_token_hits_database_once(self):
+        self.mock_filter.return_value.first.return_value = self.tenant
+
+        self.assertEqual(TenantTokenCacheService.resolve("cwu_valid"), self.tenant)
+        self.assertEqual(TenantTokenCacheService.resolve("cwu_valid"), self.tenant)
+        self.assertEqual(self.mock_filter.call_count, 1)
+
+    def test_shared_level_serves_other_processes(self):
+        self.mock_filter.return_value.first.return_value = self.tenant
+        TenantTokenCacheService.resolve("cwu_valid")
+
+        # Simula otro proceso: nivel local vacío, Redis con el tenant
+        TenantTokenCacheService.clear_local()
+        self.assertEqual(TenantTokenCacheService.resolve("cwu_valid").pk, 1)
+        self.assertEqual(self.mock_filter.call_count, 1)
+
+    def test_shared_level_does_not_store_secrets(self):
+        self.tenant.ai_token = "secreto"
+        self.mock_filter.return_value.first.return_value = self.tenant
+        TenantTokenCacheService.resolve("cwu_valid")
+
+        shared = cache.get(TenantTokenCacheService._key("cwu_valid"))
+        self.assertEqual(shared, {"id": 1, "name": "acme", "model": "ollama"})
+
+        TenantTokenCacheService.clear_local()
+        tenant = TenantTokenCacheService.resolve("cwu_valid")
+        self.assertEqual((tenant.pk, tenant.name, tenant.model), (1, "acme", "ollama"))
+        self.assertIn("ai_token", tenant.get_deferred_fields())
+
+    def test_invalid_token_is_cached_negatively(self):
+        self.mock_filter.return_value.first.return_value = None
+
+        self.assertIsNone(TenantTokenCacheService.resolve("cwu_bad"))
+        self.assertIsNone(TenantTokenCacheService.resolve("cwu_bad"))
+        self.assertEqual(self.mock_filter.call_count, 1)
+
+    def test_invalidate_forces_new_lookup(self):
+        self.mock_filter.return_value.first.return_value = self.tenant
+        TenantTokenCacheService.resolve("cwu_valid")
+
+        TenantTokenCacheService.invalidate("cwu_valid")
+        self.mock_filter.return_value.first.return_value = None
+
+        self.assertIsNone(TenantTokenCacheService.resolve("cwu_valid"))
+        self.assertEqual(self.mock_filter.call_count, 2)